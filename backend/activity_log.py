@@ -0,0 +1,203 @@
+"""
+Append-only activity event stream for the admin activity log.
+
+Handlers call ``activity_log.emit(...)`` with a typed event; events are queued
+in memory and a background thread writes them to ``db.activity_events`` in
+batches, so request handlers never wait on the insert. The admin feed then
+reads the collection with ordinary index-backed pagination and filters.
+
+Backfill events for data created before the stream existed with:
+    python activity_log.py --backfill
+"""
+
+import argparse
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+logger = logging.getLogger(__name__)
+
+# Event type -> icon shown in the admin dashboard
+ACTIVITY_EVENT_TYPES = {
+    "user_registration": "user-plus",
+    "job_posted": "briefcase",
+    "proposal_accepted": "handshake",
+    "escrow_released": "wallet",
+    "user_verification": "shield-check",
+    "user_suspension": "user-x",
+    "support_ticket": "help-circle",
+    "support_ticket_updated": "message-square",
+    "data_export": "download"
+}
+
+
+def ensure_activity_indexes(db) -> None:
+    """Indexes for the newest-first feed, type filters and per-entity lookups"""
+    db.activity_events.create_index("id", unique=True)
+    db.activity_events.create_index([("timestamp", -1)])
+    db.activity_events.create_index([("type", 1), ("timestamp", -1)])
+    db.activity_events.create_index([("user_id", 1), ("timestamp", -1)])
+    db.activity_events.create_index([("actor_id", 1), ("timestamp", -1)])
+
+
+def build_event(event_type: str, description: str, actor_id: Optional[str] = None,
+                timestamp: Optional[datetime] = None, **refs) -> dict:
+    """Build an activity event document; ``refs`` are ids such as user_id, job_id, ticket_id"""
+    if event_type not in ACTIVITY_EVENT_TYPES:
+        raise ValueError(f"Unknown activity event type: {event_type}")
+
+    return {
+        "id": str(uuid.uuid4()),
+        "type": event_type,
+        "description": description,
+        "icon": ACTIVITY_EVENT_TYPES[event_type],
+        "actor_id": actor_id,
+        "timestamp": timestamp or datetime.utcnow(),
+        **{name: value for name, value in refs.items() if value is not None}
+    }
+
+
+class ActivityLogWriter:
+    """Buffers activity events and inserts them in batches from a background thread"""
+
+    def __init__(self, db=None, batch_size: int = 100, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.dropped = 0
+        self.written = 0
+
+    def start(self, db=None) -> None:
+        """Start the writer thread; ``db`` replaces the target database (one per worker process)"""
+        if db is not None:
+            self.db = db
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="activity-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the writer after draining queued events"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def emit(self, event_type: str, description: str, actor_id: Optional[str] = None, **refs) -> None:
+        """Queue an event without blocking the caller; events are dropped if the buffer is full"""
+        event = build_event(event_type, description, actor_id=actor_id, **refs)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Activity log buffer full, dropped %s event", event_type)
+
+    def _next_batch(self) -> list:
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch: list) -> None:
+        try:
+            self.db.activity_events.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            logger.error("Failed to write %d activity events: %s", len(batch), e)
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+        # Drain whatever was queued before shutdown
+        self.flush()
+
+    def _next_batch_nowait(self) -> list:
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self) -> None:
+        """Write everything queued so far from the calling thread"""
+        while True:
+            batch = self._next_batch_nowait()
+            if not batch:
+                break
+            self._write(batch)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+
+def backfill_activity_events(db) -> int:
+    """Create events for registrations, jobs and tickets that predate the event stream"""
+    ensure_activity_indexes(db)
+    count = 0
+
+    def insert_if_missing(event: dict, match: dict) -> None:
+        nonlocal count
+        if not db.activity_events.find_one({"type": event["type"], **match}, {"_id": 1}):
+            db.activity_events.insert_one(event)
+            count += 1
+
+    for user in db.users.find({}, {"id": 1, "full_name": 1, "role": 1, "created_at": 1}):
+        insert_if_missing(build_event(
+            "user_registration", f"New {user['role']} registered: {user['full_name']}",
+            actor_id=user["id"], timestamp=user.get("created_at"), user_id=user["id"]
+        ), {"user_id": user["id"]})
+
+    client_names = {}
+    for job in db.jobs.find({}, {"id": 1, "title": 1, "client_id": 1, "created_at": 1}):
+        if job["client_id"] not in client_names:
+            client = db.users.find_one({"id": job["client_id"]}, {"full_name": 1})
+            client_names[job["client_id"]] = client["full_name"] if client else "Unknown"
+        insert_if_missing(build_event(
+            "job_posted", f"New job posted: {job['title']} by {client_names[job['client_id']]}",
+            actor_id=job["client_id"], timestamp=job.get("created_at"), job_id=job["id"]
+        ), {"job_id": job["id"]})
+
+    for ticket in db.support_tickets.find({}, {"id": 1, "name": 1, "status": 1, "created_at": 1}):
+        insert_if_missing(build_event(
+            "support_ticket", f"Support ticket from {ticket['name']} - Status: {ticket['status']}",
+            timestamp=ticket.get("created_at"), ticket_id=ticket["id"]
+        ), {"ticket_id": ticket["id"]})
+
+    return count
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Activity event stream maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Create events for existing users, jobs and tickets")
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    if args.backfill:
+        created = backfill_activity_events(client[os.environ.get('MONGO_DB_NAME', 'afrilance')])
+        print(f"✅ Created {created} activity events")
+    else:
+        parser.print_help()
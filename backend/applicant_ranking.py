@@ -0,0 +1,74 @@
+"""
+Ranking of the applications to a job.
+
+Every application carries a copy of the freelancer's profile, rating, review
+count and verification status (see denormalize.py), so a job's applications can
+be scored from one projected read of the applications collection. Scores are
+computed for all applicants at once with NumPy; only the requested page is then
+read in full.
+"""
+
+from typing import List
+
+import numpy as np
+
+from denormalize import APPLICATION_FREELANCER_FIELDS
+from recommendations import normalize_term
+
+# Share of the score coming from each signal; every signal is scaled to 0..1
+APPLICANT_SCORE_WEIGHTS = {
+    "skills": 0.4,
+    "rating": 0.25,
+    "reviews": 0.1,
+    "verified": 0.15,
+    "bid": 0.1
+}
+
+# Ratings are shrunk towards this prior by this many pseudo-reviews, so one 5-star review doesn't outrank fifty 4.8s
+RATING_PRIOR = 3.0
+RATING_PRIOR_WEIGHT = 3
+
+# Copied freelancer fields the scores are computed from, and the projection that reads them
+APPLICANT_SCORE_COPIES = {
+    copy: APPLICATION_FREELANCER_FIELDS[copy]
+    for copy in ("freelancer_profile", "freelancer_rating", "freelancer_reviews", "freelancer_verified")
+}
+APPLICANT_SCORE_FIELDS = {
+    "_id": 0, "id": 1, "freelancer_id": 1, "bid_amount": 1, "freelancer_profile.skills": 1,
+    "freelancer_rating": 1, "freelancer_reviews": 1, "freelancer_verified": 1
+}
+
+
+def score_applicants(job: dict, applications: List[dict]) -> dict:
+    """Per-signal scores and their weighted total for each application, as arrays in ``applications`` order"""
+    count = len(applications)
+    requirements = {normalize_term(requirement) for requirement in job.get("requirements") or []} - {""}
+
+    skills = np.zeros(count)
+    if requirements:
+        for position, application in enumerate(applications):
+            profile_skills = (application.get("freelancer_profile") or {}).get("skills") or []
+            skills[position] = len(requirements & {normalize_term(skill) for skill in profile_skills})
+        skills /= len(requirements)
+
+    ratings = np.array([float(application.get("freelancer_rating") or 0) for application in applications])
+    reviews = np.array([float(application.get("freelancer_reviews") or 0) for application in applications])
+    rating = (ratings * reviews + RATING_PRIOR * RATING_PRIOR_WEIGHT) / (reviews + RATING_PRIOR_WEIGHT) / 5
+    most_reviews = reviews.max() if count else 0
+    review_count = np.log1p(reviews) / np.log1p(most_reviews) if most_reviews > 0 else np.zeros(count)
+
+    verified = np.array([bool(application.get("freelancer_verified")) for application in applications], dtype=float)
+
+    # Bids at or under budget score 1, falling to 0 at twice the budget
+    bids = np.array([float(application.get("bid_amount") or 0) for application in applications])
+    budget = float(job.get("budget") or 0)
+    bid = np.clip(2 - bids / budget, 0, 1) if budget > 0 else np.ones(count)
+
+    signals = {"skills": skills, "rating": rating, "reviews": review_count, "verified": verified, "bid": bid}
+    signals["score"] = sum(APPLICANT_SCORE_WEIGHTS[name] * values for name, values in signals.items())
+    return signals
+
+
+def ranked_positions(scores: np.ndarray) -> List[int]:
+    """Positions of the applications, best score first; equal scores keep their original order"""
+    return np.argsort(-scores, kind="stable").tolist()
@@ -0,0 +1,236 @@
+"""
+Write-time copies of user display fields.
+
+Jobs, applications, contracts, messages and conversations store the name,
+role, picture and profile of the users they reference when they are written, so
+the endpoints that list them don't look up the users collection. When a user
+changes one of these fields, ``UserFanout`` rewrites the copies from a
+background thread in bounded batches; the request that made the change returns
+immediately.
+
+Documents written before the copies existed are filled in at read time by
+``fill_user_fields`` (one batched lookup per page) until they are backfilled with:
+    python denormalize.py --backfill
+"""
+
+import argparse
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+logger = logging.getLogger(__name__)
+
+# Copied field -> user field, per referencing collection and id field
+JOB_CLIENT_FIELDS = {"client_name": "full_name", "client_rating": "rating"}
+# Rating, reviews and verification feed applicant ranking (applicant_ranking.py)
+APPLICATION_FREELANCER_FIELDS = {
+    "freelancer_name": "full_name",
+    "freelancer_profile": "profile",
+    "freelancer_rating": "rating",
+    "freelancer_reviews": "total_reviews",
+    "freelancer_verified": "is_verified"
+}
+CONTRACT_FREELANCER_FIELDS = {"freelancer_name": "full_name", "freelancer_profile": "profile"}
+CONTRACT_CLIENT_FIELDS = {"client_name": "full_name"}
+MESSAGE_SENDER_FIELDS = {
+    "sender_name": "full_name",
+    "sender_role": "role",
+    "sender_profile_picture": "profile_picture"
+}
+# Stored per participant under conversations.participant_info.<user id>
+PARTICIPANT_FIELDS = {
+    "id": "id",
+    "full_name": "full_name",
+    "role": "role",
+    "is_verified": "is_verified",
+    "profile_picture": "profile_picture"
+}
+
+USER_FIELD_DEFAULTS = {"rating": 0, "total_reviews": 0, "profile": {}, "is_verified": False}
+
+USER_COPIES = [
+    ("jobs", "client_id", JOB_CLIENT_FIELDS),
+    ("applications", "freelancer_id", APPLICATION_FREELANCER_FIELDS),
+    ("contracts", "freelancer_id", CONTRACT_FREELANCER_FIELDS),
+    ("contracts", "client_id", CONTRACT_CLIENT_FIELDS),
+    ("messages", "sender_id", MESSAGE_SENDER_FIELDS)
+]
+
+# Every user field that is copied somewhere
+COPIED_USER_FIELDS = sorted(
+    {field for _, _, fields in USER_COPIES for field in fields.values()} | set(PARTICIPANT_FIELDS.values())
+)
+
+
+def user_fields(user: Optional[dict], fields: Dict[str, str]) -> dict:
+    """The copies of ``user``'s fields to store on a referencing document"""
+    user = user or {}
+    return {copy: user.get(field, USER_FIELD_DEFAULTS.get(field)) for copy, field in fields.items()}
+
+
+def fill_user_fields(database, docs: List[dict], id_field: str, fields: Dict[str, str]) -> None:
+    """Fill copies missing on legacy documents with a single lookup for the whole page"""
+    def is_missing(doc: dict) -> bool:
+        return bool(doc.get(id_field)) and any(copy not in doc for copy in fields)
+
+    missing = {doc[id_field] for doc in docs if is_missing(doc)}
+    if not missing:
+        return
+    users = {
+        user["id"]: user
+        for user in database.users.find({"id": {"$in": list(missing)}}, {"_id": 0, **{f: 1 for f in COPIED_USER_FIELDS}})
+    }
+    for doc in docs:
+        if is_missing(doc) and doc[id_field] in users:
+            doc.update(user_fields(users[doc[id_field]], fields))
+
+
+def ensure_copy_indexes(db) -> None:
+    """Indexes on the user ids that copies are found by, so a fan-out doesn't scan whole collections"""
+    db.jobs.create_index([("client_id", 1), ("created_at", -1)])
+    db.applications.create_index([("freelancer_id", 1), ("created_at", -1)])
+    db.contracts.create_index([("client_id", 1), ("created_at", -1)])
+    db.contracts.create_index([("freelancer_id", 1), ("created_at", -1)])
+    db.messages.create_index([("sender_id", 1)])
+    db.message_buckets.create_index([("participants", 1)])
+    db.conversations.create_index([("participants", 1), ("last_message_at", -1)])
+
+
+def _stale(fields: dict, prefix: str = "") -> dict:
+    return {"$or": [{f"{prefix}{name}": {"$ne": value}} for name, value in fields.items()]}
+
+
+class UserFanout:
+    """Rewrites copied user fields from a background thread after a user changes them"""
+
+    def __init__(self, db=None, batch_size: int = 500, max_queue: int = 10000):
+        self.db = db
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.updated = 0
+        self.dropped = 0
+
+    def start(self, db=None) -> None:
+        if db is not None:
+            self.db = db
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="user-fanout", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop after finishing the users already queued"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, user_id: str) -> None:
+        """Queue a user whose display fields changed; repeated submits before it runs are coalesced"""
+        with self._lock:
+            if user_id in self._pending:
+                return
+            self._pending.add(user_id)
+        try:
+            self._queue.put_nowait(user_id)
+        except queue.Full:
+            with self._lock:
+                self._pending.discard(user_id)
+            self.dropped += 1
+            logger.warning("User fan-out queue full, copies of %s stay stale until the next change", user_id)
+
+    def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                user_id = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._pending.discard(user_id)
+            try:
+                self.fan_out(user_id)
+            except Exception:
+                logger.exception("User fan-out failed", extra={"user_id": user_id})
+
+    def _update_in_batches(self, collection, query: dict, update: dict, **kwargs) -> int:
+        """Apply ``update`` to documents matching ``query``, at most batch_size documents per write"""
+        updated = 0
+        while True:
+            ids = [doc["_id"] for doc in collection.find(query, {"_id": 1}).limit(self.batch_size)]
+            if not ids:
+                return updated
+            result = collection.update_many({"_id": {"$in": ids}}, update, **kwargs)
+            updated += result.modified_count
+            if result.modified_count < len(ids):
+                # Nothing left to change in this batch; stop instead of re-reading the same documents
+                return updated
+
+    def fan_out(self, user_id: str) -> int:
+        """Bring every copy of the user's fields up to date; returns the number of documents changed"""
+        user = self.db.users.find_one({"id": user_id}, {"_id": 0, **{f: 1 for f in COPIED_USER_FIELDS}})
+        if not user:
+            return 0
+        updated = 0
+
+        for collection, id_field, fields in USER_COPIES:
+            copies = user_fields(user, fields)
+            updated += self._update_in_batches(
+                self.db[collection], {id_field: user_id, **_stale(copies)}, {"$set": copies}
+            )
+
+        # Conversation messages stored in buckets (MESSAGE_STORAGE=buckets)
+        copies = user_fields(user, MESSAGE_SENDER_FIELDS)
+        updated += self._update_in_batches(
+            self.db.message_buckets,
+            {"participants": user_id, "messages": {"$elemMatch": {"sender_id": user_id, **_stale(copies)}}},
+            {"$set": {f"messages.$[sent].{name}": value for name, value in copies.items()}},
+            array_filters=[{"sent.sender_id": user_id}]
+        )
+
+        info = user_fields(user, PARTICIPANT_FIELDS)
+        updated += self._update_in_batches(
+            self.db.conversations,
+            {"participants": user_id, f"participant_info.{user_id}": {"$ne": info}},
+            {"$set": {f"participant_info.{user_id}": info}}
+        )
+
+        self.updated += updated
+        return updated
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "updated": self.updated, "dropped": self.dropped}
+
+
+def backfill_user_copies(db, user_ids: Optional[Iterable[str]] = None, batch_size: int = 500) -> int:
+    """Write the copies for every user (or ``user_ids``) synchronously"""
+    ensure_copy_indexes(db)
+    fanout = UserFanout(db, batch_size=batch_size)
+    if user_ids is None:
+        user_ids = [user["id"] for user in db.users.find({}, {"id": 1})]
+    return sum(fanout.fan_out(user_id) for user_id in user_ids)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Denormalized user field maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Copy user display fields onto existing documents")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    if args.backfill:
+        updated = backfill_user_copies(client[os.environ.get('MONGO_DB_NAME', 'afrilance')], batch_size=args.batch_size)
+        print(f"✅ Updated {updated} documents")
+    else:
+        parser.print_help()
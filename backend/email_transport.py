@@ -0,0 +1,127 @@
+"""
+Reusable SMTP connection for outgoing mail.
+
+send_email used to open, authenticate and tear down an SMTP_SSL session for
+every message. ``SMTPTransport`` keeps one authenticated session per worker
+process, opened on first use, shared behind a lock and reconnected once if the
+server dropped it. The application lifespan closes it on shutdown.
+
+``EmailQueue`` sends notification mail from a background thread, for endpoints
+that notify many users at once and shouldn't wait on SMTP per recipient. The
+queue lives in process memory only: emails still queued when a worker crashes,
+or when shutdown's bounded wait runs out, are not sent (shutdown logs how many).
+Use it for notifications that are safe to lose, not for mail that must arrive.
+"""
+
+import logging
+import queue
+import smtplib
+import threading
+from email.message import Message
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SMTPTransport:
+    def __init__(self, host: str, port: int, username: str, password: str, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self._connection: Optional[smtplib.SMTP_SSL] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP_SSL:
+        connection = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        connection.login(self.username, self.password)
+        return connection
+
+    def send(self, msg: Message) -> None:
+        """Send a message, reconnecting once if the pooled session has gone stale"""
+        with self._lock:
+            if self._connection is None:
+                self._connection = self._connect()
+            try:
+                self._connection.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                self._discard()
+                self._connection = self._connect()
+                self._connection.send_message(msg)
+
+    def _discard(self) -> None:
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is None:
+                return
+            try:
+                self._connection.quit()
+            except Exception:
+                pass
+            self._connection = None
+
+
+class EmailQueue:
+    """Queues (to, subject, body) emails and sends them one by one from a background thread"""
+
+    def __init__(self, send: Callable[[str, str, str], bool], max_queue: int = 10000):
+        self.send = send
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="email-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop after sending what is already queued (or when ``timeout`` runs out)"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        unsent = self._queue.qsize()
+        if unsent:
+            logger.warning("Email queue stopped with %d emails unsent; they are lost", unsent)
+
+    def enqueue(self, to_email: str, subject: str, body: str) -> bool:
+        """Queue an email without blocking; returns False if the queue is full and the email was dropped"""
+        try:
+            self._queue.put_nowait((to_email, subject, body))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Email queue full, dropped email", extra={"to": to_email, "subject": subject})
+            return False
+
+    def _run(self) -> None:
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                to_email, subject, body = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                delivered = self.send(to_email, subject, body)
+            except Exception:
+                logger.exception("Queued email failed", extra={"to": to_email})
+                delivered = False
+            if delivered:
+                self.sent += 1
+            else:
+                self.failed += 1
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "sent": self.sent, "failed": self.failed, "dropped": self.dropped}
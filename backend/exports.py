@@ -0,0 +1,282 @@
+"""
+Streaming admin exports of users, contracts and the wallet ledger.
+
+Rows are read from a server-side cursor in batches of ``batch_size`` with only
+the exported columns projected, and written out as CSV or NDJSON in chunks of
+``EXPORT_CHUNK_ROWS`` rows, so memory stays flat however large the collection
+is. Ledger rows are the entries of each wallet's ``transaction_history``,
+unwound by the database. Their user columns are filled in with one ``users``
+query per batch of rows; a role filter instead joins each wallet to its user
+through the unique ``users.id`` index before unwinding, so only the matching
+wallets are unwound.
+
+Filters, all optional:
+    date_from / date_to   ISO dates on created_at (transaction date for the ledger)
+    role                  user role (users and ledger)
+    status                users: active, suspended, verified, unverified;
+                          contracts: the contract status; ledger: the transaction type
+
+The same exports can be written from the command line, e.g.:
+    python exports.py contracts --format csv --status Completed > contracts.csv
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+EXPORT_CHUNK_ROWS = 500
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+# Exportable columns per dataset, in output order; dotted names are nested fields
+EXPORT_COLUMNS = {
+    "users": [
+        "id", "email", "full_name", "phone", "role", "status", "is_verified", "verification_status",
+        "is_suspended", "created_at", "last_login", "region.province", "region.city",
+        "profile.hourly_rate", "rating", "total_reviews"
+    ],
+    "contracts": [
+        "id", "job_id", "job_title", "job_category", "client_id", "client_name", "freelancer_id",
+        "freelancer_name", "amount", "status", "created_at", "start_date", "completed_at"
+    ],
+    "ledger": ["user_id", "user_email", "user_name", "user_role", "type", "amount", "date", "note"]
+}
+
+USER_EXPORT_STATUSES = {
+    "active": {"is_suspended": {"$ne": True}},
+    "suspended": {"is_suspended": True},
+    "verified": {"is_verified": True},
+    "unverified": {"is_verified": {"$ne": True}}
+}
+
+# Ledger columns and the unwound wallet fields they come from
+LEDGER_FIELDS = {
+    "user_id": "$user_id",
+    "user_email": "$user.email",
+    "user_name": "$user.full_name",
+    "user_role": "$user.role",
+    "type": "$transaction_history.type",
+    "amount": "$transaction_history.amount",
+    "date": "$transaction_history.date",
+    "note": "$transaction_history.note"
+}
+
+# Ledger user columns and the user fields they are resolved from
+LEDGER_USER_FIELDS = {"user_email": "email", "user_name": "full_name", "user_role": "role"}
+
+# Characters that make spreadsheet applications evaluate a cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def export_columns(dataset: str, columns: Optional[str] = None) -> List[str]:
+    """The requested comma-separated columns, or all of them; raises ValueError for unknown names"""
+    if dataset not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown export: {dataset}")
+    if not columns:
+        return list(EXPORT_COLUMNS[dataset])
+    selected = list(dict.fromkeys(column.strip() for column in columns.split(",") if column.strip()))
+    unknown = [column for column in selected if column not in EXPORT_COLUMNS[dataset]]
+    if unknown or not selected:
+        raise ValueError(f"Unknown columns for {dataset}: {', '.join(unknown) or columns}")
+    return selected
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date")
+
+
+def export_query(dataset: str, date_from: Optional[str] = None, date_to: Optional[str] = None,
+                 role: Optional[str] = None, status: Optional[str] = None) -> dict:
+    """Filter conditions for an export; raises ValueError for filters the dataset doesn't support"""
+    query = {}
+    dates = {}
+    start, end = parse_date(date_from, "date_from"), parse_date(date_to, "date_to")
+    if start:
+        dates["$gte"] = start
+    if end:
+        dates["$lte"] = end
+    if dates:
+        query["date" if dataset == "ledger" else "created_at"] = dates
+
+    if role:
+        if dataset == "contracts":
+            raise ValueError("The role filter applies to users and ledger exports")
+        query["role"] = role
+
+    if status:
+        if dataset == "users":
+            if status not in USER_EXPORT_STATUSES:
+                raise ValueError(f"User status must be one of: {', '.join(USER_EXPORT_STATUSES)}")
+            query.update(USER_EXPORT_STATUSES[status])
+        elif dataset == "contracts":
+            query["status"] = status
+        else:
+            query["type"] = status
+    return query
+
+
+def export_rows(db, dataset: str, query: dict, columns: List[str], batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Projected export rows, oldest first, fetched from the database ``batch_size`` at a time"""
+    if dataset == "ledger":
+        cursor = db.wallets.aggregate(ledger_pipeline(query, columns), batchSize=batch_size)
+        rows = cursor if "role" in query else _with_ledger_users(db, cursor, columns, batch_size)
+    else:
+        projection = {"_id": 0, **{column: 1 for column in columns}}
+        cursor = rows = db[dataset].find(query, projection).sort("created_at", 1).batch_size(batch_size)
+    try:
+        yield from rows
+    finally:
+        cursor.close()
+
+
+def _with_ledger_users(db, rows: Iterable[dict], columns: List[str], batch_size: int) -> Iterator[dict]:
+    """Ledger rows with their user columns filled in, one users query per ``batch_size`` rows"""
+    user_columns = [column for column in columns if column in LEDGER_USER_FIELDS]
+    if not user_columns:
+        yield from rows
+        return
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from _fill_ledger_users(db, batch, user_columns)
+            batch = []
+    yield from _fill_ledger_users(db, batch, user_columns)
+
+
+def _fill_ledger_users(db, rows: List[dict], user_columns: List[str]) -> List[dict]:
+    if not rows:
+        return rows
+    projection = {"_id": 0, "id": 1, **{LEDGER_USER_FIELDS[column]: 1 for column in user_columns}}
+    user_ids = list({row.get("user_id") for row in rows})
+    users = {user["id"]: user for user in db.users.find({"id": {"$in": user_ids}}, projection)}
+    for row in rows:
+        user = users.get(row.get("user_id"), {})
+        for column in user_columns:
+            row[column] = user.get(LEDGER_USER_FIELDS[column])
+    return rows
+
+
+def ledger_pipeline(query: dict, columns: List[str]) -> list:
+    """Wallets -> one document per transaction, filtered and projected to ``columns``.
+
+    User columns only come out of the pipeline when a role filter joins the
+    users in; otherwise rows carry ``user_id`` and ``export_rows`` fills them in.
+    """
+    pipeline = []
+    if "date" in query:
+        # Skip wallets without a single transaction in range before unwinding
+        pipeline.append({"$match": {"transaction_history.date": query["date"]}})
+    joined = "role" in query
+    if joined:
+        pipeline += [
+            {"$lookup": {"from": "users", "localField": "user_id", "foreignField": "id", "as": "user"}},
+            {"$unwind": "$user"},
+            {"$match": {"user.role": query["role"]}}
+        ]
+    pipeline.append({"$unwind": "$transaction_history"})
+    transaction_match = {f"transaction_history.{field}": query[field] for field in ("date", "type") if field in query}
+    if transaction_match:
+        pipeline.append({"$match": transaction_match})
+    fields = {column: LEDGER_FIELDS[column] for column in columns if joined or column not in LEDGER_USER_FIELDS}
+    pipeline.append({"$project": {"_id": 0, "user_id": "$user_id", **fields}})
+    return pipeline
+
+
+def _field(row: dict, column: str):
+    value = row
+    for part in column.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        value = ";".join(str(item) for item in value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows: Iterable[dict], columns: List[str], chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(_field(row, column)) for column in columns])
+        if count % chunk_rows == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(rows: Iterable[dict], columns: List[str], chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[bytes]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _json_value(_field(row, column)) for column in columns}, default=str))
+        if len(lines) >= chunk_rows:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+
+def export_chunks(db, dataset: str, export_format: str, query: dict, columns: List[str],
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """The encoded export, a chunk at a time"""
+    rows = export_rows(db, dataset, query, columns, batch_size)
+    return csv_chunks(rows, columns) if export_format == "csv" else ndjson_chunks(rows, columns)
+
+
+def ensure_export_indexes(db) -> None:
+    db.users.create_index([("created_at", 1)])
+    db.users.create_index([("role", 1), ("created_at", 1)])
+    db.contracts.create_index([("created_at", 1)])
+    db.contracts.create_index([("status", 1), ("created_at", 1)])
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Export users, contracts or the wallet ledger to stdout")
+    parser.add_argument("dataset", choices=sorted(EXPORT_COLUMNS))
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+    parser.add_argument("--columns", help="Comma-separated columns (default: all)")
+    parser.add_argument("--date-from")
+    parser.add_argument("--date-to")
+    parser.add_argument("--role")
+    parser.add_argument("--status")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    try:
+        columns = export_columns(args.dataset, args.columns)
+        query = export_query(args.dataset, args.date_from, args.date_to, args.role, args.status)
+    except ValueError as e:
+        parser.error(str(e))
+    for chunk in export_chunks(client[os.environ.get('MONGO_DB_NAME', 'afrilance')], args.dataset, args.format, query, columns, args.batch_size):
+        sys.stdout.buffer.write(chunk)
+    sys.stdout.flush()
@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Load and benchmark harness for the Afrilance API.
+
+Drives weighted, mixed user scenarios with N concurrent virtual users and
+reports per-endpoint latency percentiles and throughput as JSON, so runs can
+be compared across commits.
+
+By default the app is booted in-process (httpx ASGI transport) against an
+in-memory MongoDB stand-in (mongomock). Point ``--mongo-url`` at a local
+mongod for realistic database timings (``--db-name`` picks the database, e.g.
+one filled by seed_data.py), or use ``--base-url`` to drive an
+already running server (e.g. uvicorn with several workers).
+
+Usage:
+    python loadtest.py --concurrency 20 --duration 30 --output results.json
+    python loadtest.py --mongo-url mongodb://localhost:27017/ --scenarios browse_jobs=5,messaging=2
+    python loadtest.py --mongo-url mongodb://localhost:27017/ --db-name afrilance_bench
+    python loadtest.py --base-url http://localhost:8001 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import atexit
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+# Scenario -> default weight in the mix
+DEFAULT_SCENARIOS = {
+    "register_login": 1,
+    "browse_jobs": 6,
+    "apply": 3,
+    "accept_proposal": 1,
+    "messaging": 4,
+    "upload_portfolio": 1,
+    "admin_dashboard": 1
+}
+
+# Smallest valid PNG, used for portfolio uploads
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+JOB_CATEGORIES = ["ICT & Digital Work", "Construction & Engineering", "Creative & Media", "Admin & Office Support"]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Collects latencies and status codes per endpoint template"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenarios: Dict[str, Dict[str, int]] = defaultdict(lambda: {"completed": 0, "failed": 0})
+
+    def record(self, endpoint: str, duration: float, status_code: Optional[int]) -> None:
+        self.latencies[endpoint].append(duration)
+        if status_code is None or status_code >= 400:
+            self.errors[endpoint] += 1
+        if status_code is not None:
+            self.statuses[endpoint][status_code] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "errors": self.errors[endpoint],
+                "rps": round(len(values) / elapsed, 2) if elapsed else 0,
+                "mean_ms": round(sum(values) / len(values) * 1000, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2),
+                "status_codes": {str(code): count for code, count in sorted(self.statuses[endpoint].items())}
+            }
+
+        all_values = sorted(value for values in self.latencies.values() for value in values)
+        total_requests = len(all_values)
+        return {
+            "totals": {
+                "requests": total_requests,
+                "errors": sum(self.errors.values()),
+                "rps": round(total_requests / elapsed, 2) if elapsed else 0,
+                "p50_ms": round(percentile(all_values, 50) * 1000, 2),
+                "p95_ms": round(percentile(all_values, 95) * 1000, 2),
+                "p99_ms": round(percentile(all_values, 99) * 1000, 2)
+            },
+            "endpoints": endpoints,
+            "scenarios": dict(self.scenarios)
+        }
+
+
+class ScenarioFailed(Exception):
+    pass
+
+
+class VirtualUser:
+    """One simulated client issuing requests through the shared httpx client"""
+
+    def __init__(self, http: httpx.AsyncClient, recorder: Recorder, pool: "UserPool"):
+        self.http = http
+        self.recorder = recorder
+        self.pool = pool
+
+    async def call(self, method: str, template: str, token: Optional[str] = None, expect_ok: bool = True, **kwargs):
+        """Issue a request; ``template`` is the route path with ``{name}`` placeholders filled from path_params"""
+        path = template.format(**kwargs.pop("path_params", {}))
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+
+        endpoint = f"{method} {template}"
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, path, headers=headers, **kwargs)
+        except httpx.HTTPError as e:
+            self.recorder.record(endpoint, time.perf_counter() - started, None)
+            raise ScenarioFailed(f"{endpoint}: {e}")
+
+        self.recorder.record(endpoint, time.perf_counter() - started, response.status_code)
+        if expect_ok and response.status_code >= 400:
+            raise ScenarioFailed(f"{endpoint}: {response.status_code} {response.text[:200]}")
+        return response
+
+    # Scenarios
+
+    async def register_login(self):
+        email = f"load_{uuid.uuid4().hex[:12]}@example.com"
+        role = random.choice(["client", "freelancer"])
+        await self.call("POST", "/api/register", json={
+            "email": email, "password": "LoadTest123!", "role": role,
+            "full_name": f"Load {role.title()}", "phone": "+27821234567"
+        })
+        await self.call("POST", "/api/login", json={"email": email, "password": "LoadTest123!"})
+
+    async def browse_jobs(self):
+        freelancer = self.pool.random_freelancer()
+        await self.call("GET", "/api/jobs", token=freelancer["token"])
+        await self.call("GET", "/api/jobs", token=freelancer["token"], params={"category": random.choice(JOB_CATEGORIES)})
+        await self.call("GET", "/api/categories/counts")
+        await self.call("GET", "/api/freelancers/featured")
+        await self.call("GET", "/api/portfolio/featured")
+        other = self.pool.random_freelancer()
+        await self.call("GET", "/api/freelancers/{freelancer_id}/public", path_params={"freelancer_id": other["id"]})
+
+    async def apply(self):
+        client = self.pool.random_client()
+        job_id = await self.pool.create_job(self, client)
+        freelancer = self.pool.random_freelancer()
+        await self.call("POST", "/api/jobs/{job_id}/apply", token=freelancer["token"], path_params={"job_id": job_id}, json={
+            "job_id": job_id, "proposal": "I can deliver this within a week.", "bid_amount": random.randint(500, 20000)
+        })
+        await self.call("GET", "/api/jobs/my", token=freelancer["token"])
+
+    async def accept_proposal(self):
+        client = self.pool.random_client()
+        job_id = await self.pool.create_job(self, client)
+        bidders = random.sample(self.pool.freelancers, min(3, len(self.pool.freelancers)))
+        for freelancer in bidders:
+            await self.call("POST", "/api/jobs/{job_id}/apply", token=freelancer["token"], path_params={"job_id": job_id}, json={
+                "job_id": job_id, "proposal": "Experienced and available.", "bid_amount": random.randint(500, 20000)
+            })
+
+        response = await self.call("GET", "/api/jobs/{job_id}/applications", token=client["token"], path_params={"job_id": job_id})
+        proposal = random.choice(response.json())
+        await self.call("POST", "/api/jobs/{job_id}/accept-proposal", token=client["token"], path_params={"job_id": job_id}, json={
+            "job_id": job_id, "freelancer_id": proposal["freelancer_id"],
+            "proposal_id": proposal["id"], "bid_amount": proposal["bid_amount"]
+        })
+        await self.call("GET", "/api/contracts", token=client["token"])
+
+    async def messaging(self):
+        client = self.pool.random_client()
+        freelancer = self.pool.random_freelancer()
+        conversation_id = None
+        for turn in range(4):
+            sender, receiver = (client, freelancer) if turn % 2 == 0 else (freelancer, client)
+            response = await self.call("POST", "/api/direct-messages", token=sender["token"], json={
+                "receiver_id": receiver["id"], "content": f"Message {turn} about the project scope"
+            })
+            conversation_id = response.json()["conversation_id"]
+
+        await self.call("GET", "/api/conversations", token=freelancer["token"])
+        await self.call("GET", "/api/conversations/{conversation_id}/messages", token=freelancer["token"],
+                        path_params={"conversation_id": conversation_id})
+
+    async def upload_portfolio(self):
+        freelancer = self.pool.random_freelancer()
+        await self.call("POST", "/api/upload-portfolio-file", token=freelancer["token"],
+                        files={"file": ("sample.png", PNG_BYTES, "image/png")})
+        await self.call("GET", "/api/portfolio/showcase/{freelancer_id}", path_params={"freelancer_id": freelancer["id"]})
+
+    async def admin_dashboard(self):
+        admin = self.pool.admin
+        await self.call("GET", "/api/admin/stats", token=admin["token"])
+        await self.call("GET", "/api/admin/users", token=admin["token"])
+        await self.call("GET", "/api/admin/activity-log", token=admin["token"])
+        await self.call("GET", "/api/admin/support-tickets", token=admin["token"])
+        await self.call("GET", "/api/admin/revenue-analytics", token=admin["token"])
+
+
+class UserPool:
+    """Pre-registered clients, verified freelancers and an admin shared by all virtual users"""
+
+    def __init__(self):
+        self.clients: List[dict] = []
+        self.freelancers: List[dict] = []
+        self.admin: Optional[dict] = None
+
+    async def register(self, user: VirtualUser, role: str) -> dict:
+        email = f"pool_{role}_{uuid.uuid4().hex[:10]}@afrilance.co.za"
+        response = await user.call("POST", "/api/register", json={
+            "email": email, "password": "LoadTest123!", "role": role,
+            "full_name": f"Pool {role.title()} {len(self.clients) + len(self.freelancers)}", "phone": "+27821234567"
+        })
+        data = response.json()
+        return {"id": data["user"]["id"], "token": data["token"], "email": email}
+
+    async def setup(self, user: VirtualUser, clients: int, freelancers: int) -> None:
+        self.admin = await self.register(user, "admin")
+        for _ in range(clients):
+            self.clients.append(await self.register(user, "client"))
+        for _ in range(freelancers):
+            freelancer = await self.register(user, "freelancer")
+            await user.call("POST", "/api/admin/verify-user", token=self.admin["token"], json={
+                "user_id": freelancer["id"], "verification_status": True
+            })
+            self.freelancers.append(freelancer)
+        # A few open jobs so browsing has something to list
+        for client in self.clients:
+            await self.create_job(user, client)
+
+    async def create_job(self, user: VirtualUser, client: dict) -> str:
+        response = await user.call("POST", "/api/jobs", token=client["token"], json={
+            "title": f"Load test job {uuid.uuid4().hex[:6]}",
+            "description": "Build and deploy a small web application",
+            "category": random.choice(JOB_CATEGORIES),
+            "budget": random.randint(1000, 50000),
+            "budget_type": "fixed",
+            "requirements": ["Python", "React"]
+        })
+        return response.json()["job_id"]
+
+    def random_client(self) -> dict:
+        return random.choice(self.clients)
+
+    def random_freelancer(self) -> dict:
+        return random.choice(self.freelancers)
+
+
+def parse_scenarios(spec: Optional[str]) -> Dict[str, int]:
+    if not spec:
+        return dict(DEFAULT_SCENARIOS)
+    weights = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name not in DEFAULT_SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'. Available: {', '.join(DEFAULT_SCENARIOS)}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_app(mongo_url: str, db_name: Optional[str] = None):
+    """Import server.py against the requested MongoDB; ``mongomock://`` uses the in-memory stand-in"""
+    if db_name:
+        os.environ["MONGO_DB_NAME"] = db_name
+    if mongo_url.startswith("mongomock://"):
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("mongomock is not installed; pip install mongomock or pass --mongo-url mongodb://...")
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient
+    else:
+        os.environ["MONGO_URL"] = mongo_url
+    # Every virtual user shares one client address, so per-IP budgets would reject most of the run
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    # Per-request access and httpx lines would drown out the report; warnings and errors still show
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Uploads made during the run go to a throwaway local directory, never the tracked uploads/ or a real bucket
+    upload_dir = tempfile.mkdtemp(prefix="afrilance-loadtest-")
+    atexit.register(shutil.rmtree, upload_dir, ignore_errors=True)
+    os.environ["UPLOAD_DIR"] = upload_dir
+    os.environ["STORAGE_BACKEND"] = "local"
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import server
+    return server.app
+
+
+async def run(args) -> dict:
+    weights = parse_scenarios(args.scenarios)
+    scenario_names = list(weights)
+    scenario_weights = [weights[name] for name in scenario_names]
+    random.seed(args.seed)
+
+    recorder = Recorder()
+    pool = UserPool()
+
+    if args.base_url:
+        transport, base_url, app = None, args.base_url, None
+    else:
+        app = load_app(args.mongo_url, args.db_name)
+        transport, base_url = httpx.ASGITransport(app=app), "http://loadtest"
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout, limits=limits) as http:
+        async def drive():
+            setup_recorder = Recorder()
+            await pool.setup(VirtualUser(http, setup_recorder, pool), args.clients, args.freelancers)
+
+            deadline = time.perf_counter() + args.duration
+            remaining = [args.iterations] if args.iterations else None
+
+            async def worker():
+                user = VirtualUser(http, recorder, pool)
+                while time.perf_counter() < deadline:
+                    if remaining is not None:
+                        if remaining[0] <= 0:
+                            return
+                        remaining[0] -= 1
+                    name = random.choices(scenario_names, scenario_weights)[0]
+                    try:
+                        await getattr(user, name)()
+                        recorder.scenarios[name]["completed"] += 1
+                    except ScenarioFailed as e:
+                        recorder.scenarios[name]["failed"] += 1
+                        if args.verbose:
+                            print(f"⚠️  {name} failed: {e}", file=sys.stderr)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            return time.perf_counter() - started
+
+        if app is not None:
+            # Run startup/shutdown handlers (indexes, background writers) as uvicorn would
+            async with app.router.lifespan_context(app):
+                elapsed = await drive()
+        else:
+            elapsed = await drive()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.utcnow().isoformat(),
+            "target": args.base_url or f"in-process ({'mongomock' if args.mongo_url.startswith('mongomock://') else args.mongo_url})",
+            "concurrency": args.concurrency,
+            "duration_s": round(elapsed, 2),
+            "seed": args.seed,
+            "scenario_weights": weights
+        },
+        **recorder.summary(elapsed)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Afrilance API load and benchmark harness")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run the mix for")
+    parser.add_argument("--iterations", type=int, default=0, help="Stop after this many scenarios (0 = run for --duration)")
+    parser.add_argument("--scenarios", help="Weighted mix, e.g. browse_jobs=5,messaging=2 (default: all)")
+    parser.add_argument("--mongo-url", default=os.environ.get("LOADTEST_MONGO_URL", "mongomock://"),
+                        help="MongoDB for the in-process app; mongomock:// uses the in-memory stand-in")
+    parser.add_argument("--db-name", default=os.environ.get("MONGO_DB_NAME"),
+                        help="Database the in-process app serves from (default: MONGO_DB_NAME or afrilance)")
+    parser.add_argument("--base-url", help="Drive a running server instead of booting the app in-process")
+    parser.add_argument("--clients", type=int, default=10, help="Clients registered before the run")
+    parser.add_argument("--freelancers", type=int, default=30, help="Verified freelancers registered before the run")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="Print scenario failures")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(output)
+        print(f"✅ {report['totals']['requests']} requests, {report['totals']['rps']} req/s, "
+              f"p95 {report['totals']['p95_ms']} ms -> {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+South African locations, normalized at write time.
+
+Free-text locations ("Joburg", "Port Elizabeth, EC", "Cape Town, Western Cape")
+are resolved against a small gazetteer of provinces and cities and stored next
+to the original text as:
+
+    region: {"province": "GP", "city": "johannesburg", "label": "Johannesburg, Gauteng"}
+    geo:    {"type": "Point", "coordinates": [28.0473, -26.2041]}   (cities only)
+
+``region.province`` and ``region.city`` are plain indexed fields, so region
+filters are exact index lookups; ``geo`` has a 2dsphere index for radius
+searches. Text that can't be resolved keeps only the original string and is
+still matched by the old regex filter.
+
+Normalize users and jobs written before this existed with:
+    python locations.py --backfill
+"""
+
+import argparse
+import os
+import re
+import unicodedata
+from typing import Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+EARTH_RADIUS_KM = 6378.1
+
+# ISO 3166-2:ZA province code -> (name, extra aliases)
+PROVINCES = {
+    "EC": ("Eastern Cape", ["oos kaap"]),
+    "FS": ("Free State", ["freestate", "vrystaat", "ofs"]),
+    "GP": ("Gauteng", ["gauteng province"]),
+    "KZN": ("KwaZulu-Natal", ["kwazulu natal", "kwa zulu natal", "natal", "kzn"]),
+    "LP": ("Limpopo", ["northern province"]),
+    "MP": ("Mpumalanga", []),
+    "NC": ("Northern Cape", ["noord kaap"]),
+    "NW": ("North West", ["northwest", "noordwes"]),
+    "WC": ("Western Cape", ["wes kaap"])
+}
+
+# City code -> (name, province code, latitude, longitude, aliases)
+CITIES = {
+    "johannesburg": ("Johannesburg", "GP", -26.2041, 28.0473, ["joburg", "jozi", "jhb", "egoli"]),
+    "pretoria": ("Pretoria", "GP", -25.7479, 28.2293, ["tshwane", "pta"]),
+    "soweto": ("Soweto", "GP", -26.2485, 27.8540, []),
+    "sandton": ("Sandton", "GP", -26.1076, 28.0567, []),
+    "centurion": ("Centurion", "GP", -25.8603, 28.1894, []),
+    "midrand": ("Midrand", "GP", -25.9992, 28.1263, []),
+    "randburg": ("Randburg", "GP", -26.0936, 28.0064, []),
+    "roodepoort": ("Roodepoort", "GP", -26.1625, 27.8725, []),
+    "germiston": ("Germiston", "GP", -26.2309, 28.1772, ["ekurhuleni"]),
+    "benoni": ("Benoni", "GP", -26.1885, 28.3208, []),
+    "boksburg": ("Boksburg", "GP", -26.2125, 28.2625, []),
+    "krugersdorp": ("Krugersdorp", "GP", -26.0855, 27.7750, ["mogale city"]),
+    "vereeniging": ("Vereeniging", "GP", -26.6731, 27.9261, []),
+    "vanderbijlpark": ("Vanderbijlpark", "GP", -26.7113, 27.8379, []),
+    "cape-town": ("Cape Town", "WC", -33.9249, 18.4241, ["kaapstad", "cpt"]),
+    "bellville": ("Bellville", "WC", -33.9022, 18.6290, []),
+    "stellenbosch": ("Stellenbosch", "WC", -33.9321, 18.8602, []),
+    "somerset-west": ("Somerset West", "WC", -34.0757, 18.8433, []),
+    "paarl": ("Paarl", "WC", -33.7342, 18.9621, []),
+    "george": ("George", "WC", -33.9630, 22.4617, []),
+    "knysna": ("Knysna", "WC", -34.0363, 23.0471, []),
+    "hermanus": ("Hermanus", "WC", -34.4187, 19.2345, []),
+    "durban": ("Durban", "KZN", -29.8587, 31.0218, ["ethekwini", "dbn"]),
+    "umhlanga": ("Umhlanga", "KZN", -29.7256, 31.0844, []),
+    "pietermaritzburg": ("Pietermaritzburg", "KZN", -29.6006, 30.3794, ["pmb", "msunduzi"]),
+    "richards-bay": ("Richards Bay", "KZN", -28.7830, 32.0377, []),
+    "gqeberha": ("Gqeberha", "EC", -33.9608, 25.6022, ["port elizabeth", "nelson mandela bay", "pe"]),
+    "east-london": ("East London", "EC", -33.0153, 27.9116, ["buffalo city"]),
+    "mthatha": ("Mthatha", "EC", -31.5889, 28.7844, ["umtata"]),
+    "makhanda": ("Makhanda", "EC", -33.3042, 26.5328, ["grahamstown"]),
+    "bloemfontein": ("Bloemfontein", "FS", -29.0852, 26.1596, ["mangaung", "bloem"]),
+    "welkom": ("Welkom", "FS", -27.9774, 26.7351, []),
+    "polokwane": ("Polokwane", "LP", -23.9045, 29.4689, ["pietersburg"]),
+    "tzaneen": ("Tzaneen", "LP", -23.8332, 30.1635, []),
+    "mbombela": ("Mbombela", "MP", -25.4753, 30.9694, ["nelspruit"]),
+    "emalahleni": ("Emalahleni", "MP", -25.8713, 29.2332, ["witbank"]),
+    "kimberley": ("Kimberley", "NC", -28.7282, 24.7499, []),
+    "upington": ("Upington", "NC", -28.4478, 21.2561, []),
+    "mahikeng": ("Mahikeng", "NW", -25.8560, 25.6403, ["mafikeng", "mafeking"]),
+    "rustenburg": ("Rustenburg", "NW", -25.6676, 27.2421, []),
+    "potchefstroom": ("Potchefstroom", "NW", -26.7145, 27.0970, ["potch"])
+}
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower()
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text).split())
+
+
+def _alias_table() -> dict:
+    aliases = {}
+    for code, (name, extra) in PROVINCES.items():
+        for alias in [name, code, *extra]:
+            aliases[_normalize(alias)] = ("province", code)
+    for code, (name, _, _, _, extra) in CITIES.items():
+        for alias in [name, *extra]:
+            aliases[_normalize(alias)] = ("city", code)
+    return aliases
+
+
+ALIASES = _alias_table()
+# Longest aliases first, so "east london" wins over a shorter alias inside it
+ALIAS_PATTERN = re.compile(r"\b(" + "|".join(re.escape(alias) for alias in sorted(ALIASES, key=len, reverse=True)) + r")\b")
+
+
+def normalize_location(text: Optional[str]) -> Optional[dict]:
+    """The region a free-text South African location refers to, or None if it isn't recognised"""
+    provinces, cities = [], []
+    for alias in ALIAS_PATTERN.findall(_normalize(text)):
+        kind, code = ALIASES[alias]
+        (cities if kind == "city" else provinces).append(code)
+    # Street names often repeat city names ("George Street, Durban") and come before the city,
+    # so the last city named wins; a province named in the text picks among the cities inside it
+    province = provinces[-1] if provinces else None
+    city = ([code for code in cities if CITIES[code][1] == province] or cities or [None])[-1]
+    if city:
+        # The city decides the province; a conflicting province in the text is ignored
+        province = CITIES[city][1]
+    if not province:
+        return None
+    label = PROVINCES[province][0]
+    if city:
+        label = f"{CITIES[city][0]}, {label}"
+    return {"province": province, "city": city, "label": label}
+
+
+def city_point(city: str) -> Optional[dict]:
+    if city not in CITIES:
+        return None
+    _, _, latitude, longitude, _ = CITIES[city]
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def location_fields(text: Optional[str]) -> dict:
+    """``region`` and (for cities) ``geo`` to store next to a free-text location"""
+    region = normalize_location(text)
+    fields = {"region": region}
+    if region and region["city"]:
+        fields["geo"] = city_point(region["city"])
+    return fields
+
+
+def location_filter(location: Optional[str] = None, province: Optional[str] = None, city: Optional[str] = None,
+                    latitude: Optional[float] = None, longitude: Optional[float] = None,
+                    radius_km: Optional[float] = None, text_field: Optional[str] = None) -> dict:
+    """
+    Query conditions for a location-filtered search.
+
+    ``radius_km`` searches around ``latitude``/``longitude``, or around the city
+    named by ``location`` or ``city``. Otherwise ``province``/``city`` codes, or
+    the region ``location`` resolves to, are matched exactly. Unrecognised
+    ``location`` text falls back to a case-insensitive match on ``text_field``.
+    Raises ValueError for unknown codes or a radius without a centre.
+    """
+    if province and province.upper() not in PROVINCES:
+        raise ValueError(f"Unknown province: {province}")
+    if city and city not in CITIES:
+        raise ValueError(f"Unknown city: {city}")
+    region = normalize_location(location) if location else None
+
+    if radius_km is not None:
+        if radius_km <= 0:
+            raise ValueError("radius_km must be positive")
+        if latitude is None or longitude is None:
+            centre = city or (region or {}).get("city")
+            if not centre:
+                raise ValueError("A radius search needs latitude and longitude or a city")
+            longitude, latitude = city_point(centre)["coordinates"]
+        return {"geo": {"$geoWithin": {"$centerSphere": [[longitude, latitude], radius_km / EARTH_RADIUS_KM]}}}
+
+    conditions = {}
+    if province:
+        conditions["region.province"] = province.upper()
+    if city:
+        conditions["region.city"] = city
+    if location and not (province or city):
+        if region and region["city"]:
+            conditions["region.city"] = region["city"]
+        elif region:
+            conditions["region.province"] = region["province"]
+        elif text_field:
+            conditions[text_field] = {"$regex": re.escape(location), "$options": "i"}
+    return conditions
+
+
+def ensure_location_indexes(db) -> None:
+    db.users.create_index([("region.province", 1), ("region.city", 1)])
+    db.users.create_index([("geo", "2dsphere")])
+    db.jobs.create_index([("status", 1), ("region.province", 1), ("region.city", 1), ("created_at", -1)])
+    db.jobs.create_index([("geo", "2dsphere")])
+
+
+def backfill_locations(db, batch_size: int = 1000) -> int:
+    """Normalize profile.location on users and location on jobs that have no region yet"""
+    ensure_location_indexes(db)
+    updated = 0
+    for collection, text_field in (("users", "profile.location"), ("jobs", "location")):
+        ops = []
+        cursor = db[collection].find(
+            {text_field: {"$exists": True}, "region": {"$exists": False}}, {"_id": 1, text_field: 1}
+        ).batch_size(batch_size)
+        for doc in cursor:
+            text = doc
+            for part in text_field.split("."):
+                text = (text or {}).get(part)
+            fields = location_fields(text if isinstance(text, str) else None)
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+            if len(ops) >= batch_size:
+                updated += db[collection].bulk_write(ops, ordered=False).modified_count
+                ops = []
+        if ops:
+            updated += db[collection].bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Location normalization maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Normalize existing user and job locations and build the indexes")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    if args.backfill:
+        updated = backfill_locations(client[os.environ.get('MONGO_DB_NAME', 'afrilance')], args.batch_size)
+        print(f"✅ Normalized {updated} locations")
+    else:
+        parser.print_help()
@@ -0,0 +1,130 @@
+"""
+Structured, non-blocking logging.
+
+Request handlers only put log records on an in-memory queue (``QueueHandler``);
+a ``QueueListener`` thread formats them as JSON lines and writes them to stderr,
+so handlers never wait on terminal or file I/O. Every record carries the
+correlation id of the request that produced it, taken from the ``X-Request-ID``
+header or generated by ``install_correlation_middleware``.
+
+``LOG_LEVEL`` (default INFO) controls verbosity and ``LOG_FORMAT=text`` switches
+to human readable lines for local development.
+"""
+
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+# Correlation id of the request being handled ("-" outside requests)
+correlation_id: contextvars.ContextVar[str] = contextvars.ContextVar("correlation_id", default="-")
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# LogRecord attributes that are not user supplied ``extra`` fields
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "correlation_id"}
+
+
+class CorrelationIdFilter(logging.Filter):
+    """Stamp records with the current correlation id before they leave the request's context"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlation_id = correlation_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; ``extra`` fields are included as top-level keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", "-")
+        }
+        for name, value in vars(record).items():
+            if name not in _RESERVED_ATTRS and not name.startswith("_"):
+                entry[name] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and drop traceback objects here, but leave JSON formatting to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue; call ``start_logging`` to begin writing"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    log_format = (log_format or os.environ.get("LOG_FORMAT", "json")).lower()
+
+    # stderr keeps stdout free for the output of scripts that import the app (loadtest.py reports)
+    output = logging.StreamHandler(sys.stderr)
+    if log_format == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(correlation_id)s] %(name)s: %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _QueueHandler(log_queue)
+    queue_handler.addFilter(CorrelationIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    return _listener
+
+
+def start_logging() -> None:
+    listener = configure_logging()
+    if listener._thread is None:
+        listener.start()
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    if _listener is not None and _listener._thread is not None:
+        _listener.stop()
+
+
+def install_correlation_middleware(app) -> None:
+    """Give every request a correlation id and echo it in the X-Request-ID response header"""
+
+    @app.middleware("http")
+    async def assign_correlation_id(request, call_next):
+        request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        token = correlation_id.set(request_id)
+        try:
+            response = await call_next(request)
+        finally:
+            correlation_id.reset(token)
+        response.headers[REQUEST_ID_HEADER] = request_id
+        return response
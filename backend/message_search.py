@@ -0,0 +1,128 @@
+"""
+Full-text search over a user's own message history.
+
+Every message stores ``participants`` (sender and receiver, sorted) and
+``search_keys``: one ``<user_id>:<word>`` entry per participant and distinct
+word of its content. The multikey index on ``search_keys`` is a per-user
+inverted index, so a search only walks the caller's own entries for the
+searched words and never another user's hits. Words are lower-cased and
+accent-folded, with no stemming or stop words (messages mix English,
+Afrikaans, isiZulu and others); hits match any searched word, ``-word``
+excludes a word, and hits matching more words rank first.
+
+Messages written before ``search_keys`` existed are invisible to search until
+they are backfilled with:
+    python message_search.py --backfill
+"""
+
+import argparse
+import os
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+def ensure_message_indexes(db) -> None:
+    """Per-user keyword index for search plus the thread indexes used for history and search context"""
+    db.messages.create_index([("search_keys", 1)])
+    db.messages.create_index([("participants", 1)])
+    db.messages.create_index([("conversation_id", 1), ("created_at", 1)])
+    db.messages.create_index([("job_id", 1), ("created_at", 1)])
+
+
+def message_participants(sender_id: str, receiver_id: str) -> List[str]:
+    return sorted([sender_id, receiver_id])
+
+
+def search_words(text: str) -> List[str]:
+    """Distinct lower-cased, accent-folded words of ``text``"""
+    folded = unicodedata.normalize("NFKD", text.lower())
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return list(dict.fromkeys(re.findall(r"\w+", folded)))
+
+
+def message_search_keys(participants: List[str], content: str) -> List[str]:
+    """The ``search_keys`` of a message: every word of its content once per participant"""
+    words = search_words(content)
+    return [f"{participant}:{word}" for participant in participants for word in words]
+
+
+def parse_search(text: str) -> Tuple[List[str], List[str]]:
+    """Words to match and ``-`` prefixed words to exclude"""
+    tokens = text.split()
+    excluded = search_words(" ".join(token[1:] for token in tokens if token.startswith("-")))
+    wanted = search_words(" ".join(token for token in tokens if not token.startswith("-")))
+    return [word for word in wanted if word not in excluded], excluded
+
+
+def hidden_fields(prefix: str = "") -> dict:
+    """Projection leaving out the fields that only exist for search; ``prefix`` for embedded messages"""
+    return {f"{prefix}search_keys": 0}
+
+
+def thread_filter(message: dict) -> dict:
+    """Query matching the thread a message belongs to (direct conversation or job thread)"""
+    if message.get("conversation_id"):
+        return {"conversation_id": message["conversation_id"]}
+    return {"job_id": message.get("job_id"), "participants": message["participants"]}
+
+
+def search_query(user_id: str, text: str, conversation_id: Optional[str] = None) -> dict:
+    """Messages of ``user_id`` matching ``text``, through the caller's own search keys"""
+    wanted, excluded = parse_search(text)
+    keys = {"$in": [f"{user_id}:{word}" for word in wanted]}
+    if excluded:
+        keys["$nin"] = [f"{user_id}:{word}" for word in excluded]
+    query = {"search_keys": keys}
+    if conversation_id:
+        query["conversation_id"] = conversation_id
+    return query
+
+
+def search_score(query: dict) -> dict:
+    """Aggregation expression counting the searched words a message matches"""
+    keys = query["search_keys"]["$in"]
+    return {"$size": {"$filter": {"input": "$search_keys", "cond": {"$in": ["$$this", keys]}}}}
+
+
+def backfill_message_participants(db, batch_size: int = 1000) -> int:
+    """Set ``participants`` and ``search_keys`` on messages written before search existed"""
+    ensure_message_indexes(db)
+    updated = 0
+    ops = []
+    cursor = db.messages.find(
+        {"search_keys": {"$exists": False}}, {"_id": 1, "sender_id": 1, "receiver_id": 1, "content": 1}
+    ).batch_size(batch_size)
+    for message in cursor:
+        participants = message_participants(message["sender_id"], message["receiver_id"])
+        ops.append(UpdateOne(
+            {"_id": message["_id"]},
+            {"$set": {
+                "participants": participants,
+                "search_keys": message_search_keys(participants, message.get("content") or "")
+            }}
+        ))
+        if len(ops) >= batch_size:
+            updated += db.messages.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.messages.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Message search maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Add participants and search keys to existing messages")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    if args.backfill:
+        updated = backfill_message_participants(client[os.environ.get('MONGO_DB_NAME', 'afrilance')], args.batch_size)
+        print(f"✅ Added search keys to {updated} messages")
+    else:
+        parser.print_help()
@@ -0,0 +1,427 @@
+"""
+Storage layouts for conversation messages.
+
+Two stores are provided:
+
+* ``DocumentMessageStore`` keeps one document per message in ``messages``
+  (the original layout, and the default).
+* ``BucketMessageStore`` groups the messages of a conversation into bucket
+  documents of up to ``MESSAGE_BUCKET_SIZE`` messages in ``message_buckets``.
+  Reading a long thread then fetches a handful of documents instead of hundreds,
+  and the conversation indexes hold one entry per bucket instead of per message.
+
+The layout is chosen with ``MESSAGE_STORAGE`` (``documents`` or ``buckets``).
+Job-thread messages (no conversation_id) always stay in ``messages``. While
+existing conversations have not been compacted yet, the bucket store also reads
+their remaining per-message documents, so switching from ``documents`` to
+``buckets`` is safe at any time. Move existing conversations into buckets with:
+    python message_store.py --compact
+
+The document store never reads ``message_buckets``, so it refuses to start
+while buckets exist. Switching back to ``documents`` means stopping the app and
+moving the buckets back into per-message documents first:
+    python message_store.py --expand
+
+Both stores search the same way: through the per-user ``search_keys`` described
+in message_search.py, which buckets also keep for all of their messages.
+
+Read state is not stored on messages: each conversation keeps a per-participant
+``read_watermarks`` timestamp and unread counts are the received messages newer
+than it. Watermarks for data that still has per-message read flags come from:
+    python message_store.py --backfill-read-state
+"""
+
+import argparse
+import os
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from message_search import hidden_fields, message_search_keys, search_query, search_score, thread_filter
+
+MESSAGE_BUCKET_SIZE = int(os.environ.get('MESSAGE_BUCKET_SIZE', '100'))
+
+
+# Bucket reads leave out the search keys of the bucket and of its messages
+BUCKET_READ = {"search_keys": 0, "messages.search_keys": 0}
+
+
+def _by_created_at(messages: List[dict]) -> List[dict]:
+    return sorted(messages, key=lambda message: message["created_at"])
+
+
+class MessageStore:
+    """Interface every message store implements"""
+
+    name = "base"
+
+    def __init__(self, db):
+        self.db = db
+
+    def ensure_indexes(self) -> None:
+        pass
+
+    def insert(self, message: dict) -> None:
+        raise NotImplementedError
+
+    def conversation_messages(self, conversation_id: str) -> List[dict]:
+        """Every message of a conversation, oldest first"""
+        raise NotImplementedError
+
+    def neighbours(self, message: dict, context: int) -> Tuple[List[dict], List[dict]]:
+        """Up to ``context`` messages before and after ``message`` in its thread, oldest first"""
+        raise NotImplementedError
+
+    def search(self, user_id: str, text: str, conversation_id: Optional[str],
+               skip: int, limit: int) -> Tuple[List[dict], int]:
+        """One page of the user's messages matching ``text``, and the total number of matches"""
+        raise NotImplementedError
+
+    def unread_count(self, conversation_id: str, user_id: str, since: Optional[datetime]) -> int:
+        """Messages received by ``user_id`` after their read watermark ``since`` (None: never read)"""
+        raise NotImplementedError
+
+    def unread_counts(self, user_id: str, watermarks: Dict[str, Optional[datetime]]) -> Dict[str, int]:
+        """``unread_count`` for many conversations at once, keyed by conversation id"""
+        raise NotImplementedError
+
+
+class DocumentMessageStore(MessageStore):
+    """One document per message in ``messages``"""
+
+    name = "documents"
+
+    def insert(self, message: dict) -> None:
+        self.db.messages.insert_one(message)
+
+    def conversation_messages(self, conversation_id: str) -> List[dict]:
+        return list(self.db.messages.find({"conversation_id": conversation_id}, hidden_fields()).sort("created_at", 1))
+
+    def neighbours(self, message: dict, context: int) -> Tuple[List[dict], List[dict]]:
+        if not context:
+            return [], []
+        thread = thread_filter(message)
+        before = list(self.db.messages.find(
+            {**thread, "created_at": {"$lt": message["created_at"]}}, hidden_fields()
+        ).sort("created_at", -1).limit(context))
+        after = list(self.db.messages.find(
+            {**thread, "created_at": {"$gt": message["created_at"]}}, hidden_fields()
+        ).sort("created_at", 1).limit(context))
+        return before[::-1], after
+
+    def search(self, user_id, text, conversation_id, skip, limit):
+        query = search_query(user_id, text, conversation_id)
+        return _search_page(self.db.messages, [{"$match": query}], query, skip, limit)
+
+    def unread_count(self, conversation_id: str, user_id: str, since: Optional[datetime]) -> int:
+        return self.db.messages.count_documents(
+            {"conversation_id": conversation_id, "receiver_id": user_id, **_newer_than(since)}
+        )
+
+    def unread_counts(self, user_id: str, watermarks: Dict[str, Optional[datetime]]) -> Dict[str, int]:
+        if not watermarks:
+            return {}
+        return _counts_by_conversation(self.db.messages.aggregate([
+            {"$match": {"receiver_id": user_id, "$or": _unread_branches(watermarks)}},
+            {"$group": {"_id": "$conversation_id", "count": {"$sum": 1}}}
+        ]))
+
+
+def _newer_than(since: Optional[datetime], field: str = "created_at") -> dict:
+    return {field: {"$gt": since}} if since else {}
+
+
+def _unread_branches(watermarks: Dict[str, Optional[datetime]], prefix: str = "", field: str = "created_at") -> List[dict]:
+    """One $or branch per conversation, each with its own watermark"""
+    return [
+        {f"{prefix}conversation_id": conversation_id, **_newer_than(since, f"{prefix}{field}")}
+        for conversation_id, since in watermarks.items()
+    ]
+
+
+def _counts_by_conversation(rows) -> Dict[str, int]:
+    return {row["_id"]: row["count"] for row in rows}
+
+
+def _search_page(collection, stages: List[dict], query: dict, skip: int, limit: int) -> Tuple[List[dict], int]:
+    """Rank the messages ``stages`` yield for a search ``query``; the page and the total come out of one pass"""
+    page = list(collection.aggregate(stages + [
+        {"$addFields": {"score": search_score(query)}},
+        {"$project": hidden_fields()},
+        {"$facet": {
+            "hits": [{"$sort": {"score": -1, "created_at": -1}}, {"$skip": skip}, {"$limit": limit}],
+            "total": [{"$count": "count"}]
+        }}
+    ]))[0]
+    return page["hits"], page["total"][0]["count"] if page["total"] else 0
+
+
+class BucketMessageStore(DocumentMessageStore):
+    """Conversation messages grouped into fixed-size documents in ``message_buckets``.
+
+    Buckets of one conversation can overlap in time: compaction builds buckets
+    from per-message documents that may have been written alongside live
+    buckets, and a live message is appended to any bucket with room left.
+    Reads must not assume that buckets ordered by ``first_at`` hold
+    consecutive messages.
+    """
+
+    name = "buckets"
+
+    def __init__(self, db, bucket_size: int = MESSAGE_BUCKET_SIZE):
+        super().__init__(db)
+        self.bucket_size = bucket_size
+
+    def ensure_indexes(self) -> None:
+        self.db.message_buckets.create_index([("conversation_id", 1), ("first_at", 1)])
+        self.db.message_buckets.create_index([("conversation_id", 1), ("last_at", 1)])
+        # Search keys of every message in the bucket; matching messages are picked out of it
+        self.db.message_buckets.create_index([("search_keys", 1)])
+
+    def insert(self, message: dict) -> None:
+        if not message.get("conversation_id"):
+            return super().insert(message)
+        # Append to a bucket with room left, or start a new one
+        self.db.message_buckets.update_one(
+            {"conversation_id": message["conversation_id"], "count": {"$lt": self.bucket_size}},
+            {
+                "$push": {"messages": message},
+                "$inc": {"count": 1},
+                "$min": {"first_at": message["created_at"]},
+                "$max": {"last_at": message["created_at"]},
+                "$addToSet": {"search_keys": {"$each": message.get("search_keys", [])}},
+                "$setOnInsert": {"participants": message["participants"]}
+            },
+            upsert=True
+        )
+
+    def _bucketed(self, query: dict, sort: int, limit: int = 0) -> List[dict]:
+        buckets = self.db.message_buckets.find(query, BUCKET_READ).sort("first_at", sort).limit(limit)
+        return [message for bucket in buckets for message in bucket["messages"]]
+
+    def conversation_messages(self, conversation_id: str) -> List[dict]:
+        return _by_created_at(
+            self._bucketed({"conversation_id": conversation_id}, 1) + super().conversation_messages(conversation_id)
+        )
+
+    def neighbours(self, message: dict, context: int) -> Tuple[List[dict], List[dict]]:
+        before, after = super().neighbours(message, context)
+        if not context or not message.get("conversation_id"):
+            return before, after
+        conversation_id, created_at = message["conversation_id"], message["created_at"]
+        # Buckets spanning the message, then the nearest ones on each side until no bucket can hold closer messages
+        spanning = self._bucketed(
+            {"conversation_id": conversation_id, "first_at": {"$lte": created_at}, "last_at": {"$gte": created_at}}, 1
+        )
+        before = self._nearest(
+            before + [m for m in spanning if m["created_at"] < created_at],
+            {"conversation_id": conversation_id, "last_at": {"$lt": created_at}}, "last_at", context
+        )
+        after = self._nearest(
+            after + [m for m in spanning if m["created_at"] > created_at],
+            {"conversation_id": conversation_id, "first_at": {"$gt": created_at}}, "first_at", context
+        )
+        return before, after
+
+    def _nearest(self, messages: List[dict], query: dict, edge: str, context: int) -> List[dict]:
+        """The ``context`` messages closest to the target, walking buckets from the nearest ``edge`` outwards.
+
+        ``query`` selects the buckets wholly on one side of the target; ``edge`` is
+        their boundary facing it (``last_at`` before the target, ``first_at`` after).
+        """
+        before = edge == "last_at"
+        buckets = self.db.message_buckets.find(query, BUCKET_READ).sort(edge, -1 if before else 1)
+        try:
+            for bucket in buckets:
+                messages = _by_created_at(messages)
+                nearest = messages[-context:] if before else messages[:context]
+                # A bucket whose edge is further away than the context already found can't contribute
+                if len(nearest) == context and (
+                    bucket[edge] < nearest[0]["created_at"] if before else bucket[edge] > nearest[-1]["created_at"]
+                ):
+                    break
+                messages = messages + bucket["messages"]
+        finally:
+            buckets.close()
+        messages = _by_created_at(messages)
+        return messages[-context:] if before else messages[:context]
+
+    def search(self, user_id, text, conversation_id, skip, limit):
+        # Scores count matched words in both layouts, so the two rankings merge
+        document_hits, document_total = super().search(user_id, text, conversation_id, 0, skip + limit)
+        query = search_query(user_id, text, conversation_id)
+        # A bucket qualifies if any of its messages holds a searched word; exclusions apply per message
+        bucket_query = {**query, "search_keys": {"$in": query["search_keys"]["$in"]}}
+        bucket_hits, bucket_total = _search_page(self.db.message_buckets, [
+            {"$match": bucket_query},
+            {"$unwind": "$messages"},
+            {"$replaceRoot": {"newRoot": "$messages"}},
+            {"$match": query}
+        ], query, 0, skip + limit)
+        hits = sorted(
+            bucket_hits + document_hits, key=lambda message: (message["score"], message["created_at"]), reverse=True
+        )
+        return hits[skip:skip + limit], document_total + bucket_total
+
+    def unread_count(self, conversation_id: str, user_id: str, since: Optional[datetime]) -> int:
+        # Only buckets that end after the watermark can hold unread messages
+        counts = list(self.db.message_buckets.aggregate([
+            {"$match": {"conversation_id": conversation_id, **_newer_than(since, "last_at")}},
+            {"$unwind": "$messages"},
+            {"$match": {"messages.receiver_id": user_id, **_newer_than(since, "messages.created_at")}},
+            {"$count": "count"}
+        ]))
+        return (counts[0]["count"] if counts else 0) + super().unread_count(conversation_id, user_id, since)
+
+    def unread_counts(self, user_id: str, watermarks: Dict[str, Optional[datetime]]) -> Dict[str, int]:
+        if not watermarks:
+            return {}
+        counts = _counts_by_conversation(self.db.message_buckets.aggregate([
+            {"$match": {"$or": _unread_branches(watermarks, field="last_at")}},
+            {"$unwind": "$messages"},
+            {"$match": {"messages.receiver_id": user_id, "$or": _unread_branches(watermarks, "messages.")}},
+            {"$group": {"_id": "$conversation_id", "count": {"$sum": 1}}}
+        ]))
+        for conversation_id, count in super().unread_counts(user_id, watermarks).items():
+            counts[conversation_id] = counts.get(conversation_id, 0) + count
+        return counts
+
+
+def get_message_store(db) -> MessageStore:
+    """Build the message store selected by the MESSAGE_STORAGE environment variable"""
+    layout = os.environ.get("MESSAGE_STORAGE", "documents").lower()
+
+    if layout == "documents":
+        if db.message_buckets.find_one({}, {"_id": 1}):
+            raise RuntimeError(
+                "MESSAGE_STORAGE=documents can't read conversations stored in message_buckets; "
+                "move them back with python message_store.py --expand or keep MESSAGE_STORAGE=buckets"
+            )
+        return DocumentMessageStore(db)
+
+    if layout == "buckets":
+        return BucketMessageStore(db)
+
+    raise RuntimeError(f"Unknown MESSAGE_STORAGE: {layout}")
+
+
+def compact_conversations(db, bucket_size: int = MESSAGE_BUCKET_SIZE) -> Tuple[int, int]:
+    """Move per-message conversation documents into buckets; returns (conversations, messages) moved.
+
+    Buckets get deterministic ids from their first message and are only ever inserted,
+    so re-running after an interruption neither duplicates messages nor overwrites a
+    bucket that has since received new ones.
+    """
+    BucketMessageStore(db, bucket_size).ensure_indexes()
+    conversations = moved = 0
+
+    for conversation_id in db.messages.distinct("conversation_id", {"conversation_id": {"$ne": None}}):
+        messages = list(db.messages.find({"conversation_id": conversation_id}).sort("created_at", 1))
+        if not messages:
+            continue
+        ops = []
+        participants = messages[0].get("participants") or sorted([messages[0]["sender_id"], messages[0]["receiver_id"]])
+        for message in messages:
+            # Messages written before search keys existed get them on the way in
+            if "search_keys" not in message:
+                message["search_keys"] = message_search_keys(participants, message.get("content") or "")
+        for start in range(0, len(messages), bucket_size):
+            chunk = messages[start:start + bucket_size]
+            ops.append(UpdateOne({"_id": f"{conversation_id}:{chunk[0]['id']}"}, {"$setOnInsert": {
+                "conversation_id": conversation_id,
+                "participants": participants,
+                "count": len(chunk),
+                "first_at": chunk[0]["created_at"],
+                "last_at": chunk[-1]["created_at"],
+                "search_keys": list(dict.fromkeys(key for message in chunk for key in message["search_keys"])),
+                "messages": [{key: value for key, value in message.items() if key != "_id"} for message in chunk]
+            }}, upsert=True))
+        db.message_buckets.bulk_write(ops, ordered=True)
+        db.messages.delete_many({"_id": {"$in": [message["_id"] for message in messages]}})
+        conversations += 1
+        moved += len(messages)
+
+    return conversations, moved
+
+
+def expand_buckets(db) -> Tuple[int, int]:
+    """Move bucketed messages back into per-message documents; returns (buckets, messages) moved.
+
+    Messages are upserted under their message id, so re-running after an
+    interruption doesn't duplicate the messages of a bucket that wasn't deleted yet.
+    """
+    buckets = moved = 0
+    for bucket in db.message_buckets.find({}, {"messages": 1}):
+        if bucket["messages"]:
+            db.messages.bulk_write([
+                UpdateOne({"_id": message["id"]}, {"$setOnInsert": message}, upsert=True)
+                for message in bucket["messages"]
+            ], ordered=False)
+        db.message_buckets.delete_one({"_id": bucket["_id"]})
+        buckets += 1
+        moved += len(bucket["messages"])
+    return buckets, moved
+
+
+def backfill_read_watermarks(db) -> int:
+    """Derive conversation read watermarks from legacy per-message read flags.
+
+    A participant's watermark becomes the newest message they received that was
+    marked read; conversations that already have a watermark keep it.
+    """
+    read_until = {}
+    pipelines = [
+        (db.messages, [
+            {"$match": {"conversation_id": {"$ne": None}, "read": True}}
+        ]),
+        (db.message_buckets, [
+            {"$unwind": "$messages"},
+            {"$replaceRoot": {"newRoot": "$messages"}},
+            {"$match": {"read": True}}
+        ])
+    ]
+    for collection, stages in pipelines:
+        for row in collection.aggregate(stages + [{"$group": {
+            "_id": {"conversation_id": "$conversation_id", "user_id": "$receiver_id"},
+            "last_read_at": {"$max": "$created_at"}
+        }}]):
+            key = (row["_id"]["conversation_id"], row["_id"]["user_id"])
+            read_until[key] = max(read_until.get(key, row["last_read_at"]), row["last_read_at"])
+
+    ops = [
+        UpdateOne(
+            {"conversation_id": conversation_id, f"read_watermarks.{user_id}": {"$exists": False}},
+            {"$set": {f"read_watermarks.{user_id}": last_read_at}}
+        )
+        for (conversation_id, user_id), last_read_at in read_until.items()
+    ]
+    return db.conversations.bulk_write(ops, ordered=False).modified_count if ops else 0
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Message storage maintenance")
+    parser.add_argument("--compact", action="store_true", help="Move per-message conversation documents into buckets")
+    parser.add_argument("--expand", action="store_true", help="Move buckets back into per-message documents")
+    parser.add_argument("--backfill-read-state", action="store_true", help="Set read watermarks from legacy per-message read flags")
+    parser.add_argument("--bucket-size", type=int, default=MESSAGE_BUCKET_SIZE)
+    args = parser.parse_args()
+    if args.compact and args.expand:
+        parser.error("--compact and --expand move messages in opposite directions; pick one")
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    db = client[os.environ.get('MONGO_DB_NAME', 'afrilance')]
+    if args.backfill_read_state:
+        updated = backfill_read_watermarks(db)
+        print(f"✅ Set {updated} read watermarks")
+    if args.compact:
+        conversations, moved = compact_conversations(db, args.bucket_size)
+        print(f"✅ Moved {moved} messages from {conversations} conversations into buckets")
+    if args.expand:
+        buckets, moved = expand_buckets(db)
+        print(f"✅ Moved {moved} messages out of {buckets} buckets")
+    if not (args.compact or args.expand or args.backfill_read_state):
+        parser.print_help()
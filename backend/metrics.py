@@ -0,0 +1,236 @@
+"""
+Request and database metrics in Prometheus text format.
+
+``RequestMetrics`` keeps per-route latency histograms, status code counters and
+in-flight gauges, labelled by HTTP method and route template (``/api/jobs/{job_id}``
+rather than the concrete path, so label cardinality stays bounded).
+``MongoCommandListener`` is registered on the MongoClient and attributes the
+number of Mongo commands and the time spent in them to the request that issued
+them through a context variable.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from pymongo import monitoring
+from starlette.routing import Match
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the per-request Mongo command count histogram buckets
+DB_COMMAND_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250)
+
+# Label used for requests that match no route (404s, scanners)
+UNMATCHED_ROUTE = "unmatched"
+
+# Concrete (method, path) -> route template lookups remembered, least recently used evicted first
+ROUTE_CACHE_SIZE = 4096
+
+# Per-request database counters: {"commands": int, "db_time": float}
+current_request_stats: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "current_request_stats", default=None
+)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative histogram with fixed bucket bounds"""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += 1
+        self.sum += value
+
+    def samples(self, name: str, labels: Dict[str, str]) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f"{name}_bucket{_labels({**labels, 'le': _format_value(float(bound))})} {cumulative}"
+        yield f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {self.total}"
+        yield f"{name}_sum{_labels(labels)} {_format_value(self.sum)}"
+        yield f"{name}_count{_labels(labels)} {self.total}"
+
+
+class RequestMetrics:
+    def __init__(self, namespace: str = "afrilance"):
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._latency: Dict[Tuple[str, str], Histogram] = {}
+        self._db_time: Dict[Tuple[str, str], Histogram] = {}
+        self._db_commands: Dict[Tuple[str, str], Histogram] = {}
+        self._status: Dict[Tuple[str, str, str], int] = {}
+        self._in_flight: Dict[Tuple[str, str], int] = {}
+        self._routes: "OrderedDict[Tuple[str, str, str], str]" = OrderedDict()
+        self._commands_total: Dict[Tuple[str, str], int] = {}
+
+    def route_template(self, app, scope: dict) -> str:
+        """Path template of the route that will handle the request, remembered per concrete path"""
+        key = (scope["method"], scope.get("root_path", ""), scope["path"])
+        template = self._routes.get(key)
+        if template is not None:
+            self._routes.move_to_end(key)
+            return template
+        template = UNMATCHED_ROUTE
+        for route in app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                template = getattr(route, "path", UNMATCHED_ROUTE)
+                break
+        self._routes[key] = template
+        if len(self._routes) > ROUTE_CACHE_SIZE:
+            self._routes.popitem(last=False)
+        return template
+
+    def request_started(self, method: str, route: str) -> None:
+        with self._lock:
+            self._in_flight[(method, route)] = self._in_flight.get((method, route), 0) + 1
+
+    def request_finished(self, method: str, route: str, status_code: int, duration: float, db_stats: dict) -> None:
+        key = (method, route)
+        with self._lock:
+            self._in_flight[key] -= 1
+            self._latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(duration)
+            self._db_time.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(db_stats["db_time"])
+            self._db_commands.setdefault(key, Histogram(DB_COMMAND_BUCKETS)).observe(db_stats["commands"])
+            status_key = (method, route, str(status_code))
+            self._status[status_key] = self._status.get(status_key, 0) + 1
+
+    def command_started(self, command_name: str, read_preference: str) -> None:
+        key = (command_name, read_preference)
+        with self._lock:
+            self._commands_total[key] = self._commands_total.get(key, 0) + 1
+
+    def render(self, extra: Iterable[str] = ()) -> str:
+        """Prometheus text exposition of every metric"""
+        ns = self.namespace
+        lines = []
+        with self._lock:
+            lines += [
+                f"# HELP {ns}_http_request_duration_seconds Request latency by route template",
+                f"# TYPE {ns}_http_request_duration_seconds histogram"
+            ]
+            for (method, route), histogram in sorted(self._latency.items()):
+                lines += histogram.samples(f"{ns}_http_request_duration_seconds", {"method": method, "route": route})
+
+            lines += [
+                f"# HELP {ns}_http_requests_total Completed requests by route template and status code",
+                f"# TYPE {ns}_http_requests_total counter"
+            ]
+            for (method, route, status), count in sorted(self._status.items()):
+                lines.append(f"{ns}_http_requests_total{_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+            lines += [
+                f"# HELP {ns}_http_requests_in_flight Requests currently being handled",
+                f"# TYPE {ns}_http_requests_in_flight gauge"
+            ]
+            for (method, route), count in sorted(self._in_flight.items()):
+                lines.append(f"{ns}_http_requests_in_flight{_labels({'method': method, 'route': route})} {count}")
+
+            lines += [
+                f"# HELP {ns}_request_db_seconds Time spent in MongoDB commands per request",
+                f"# TYPE {ns}_request_db_seconds histogram"
+            ]
+            for (method, route), histogram in sorted(self._db_time.items()):
+                lines += histogram.samples(f"{ns}_request_db_seconds", {"method": method, "route": route})
+
+            lines += [
+                f"# HELP {ns}_request_db_commands MongoDB commands issued per request",
+                f"# TYPE {ns}_request_db_commands histogram"
+            ]
+            for (method, route), histogram in sorted(self._db_commands.items()):
+                lines += histogram.samples(f"{ns}_request_db_commands", {"method": method, "route": route})
+
+            lines += [
+                f"# HELP {ns}_mongo_commands_total MongoDB commands by command name and read preference",
+                f"# TYPE {ns}_mongo_commands_total counter"
+            ]
+            for (command_name, read_preference), count in sorted(self._commands_total.items()):
+                labels = {'command': command_name, 'read_preference': read_preference}
+                lines.append(f"{ns}_mongo_commands_total{_labels(labels)} {count}")
+
+        lines += extra
+        return "\n".join(lines) + "\n"
+
+
+def counter_lines(name: str, help_text: str, metric_type: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> list:
+    """Format an externally tracked metric family (cache and activity log counters)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    lines += [f"{name}{_labels(labels)} {_format_value(value)}" for labels, value in samples]
+    return lines
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Attributes MongoDB command counts and durations to the current request"""
+
+    def __init__(self, metrics: RequestMetrics):
+        self.metrics = metrics
+
+    def started(self, event):
+        # Drivers only attach $readPreference for non-primary reads on replica sets and mongos
+        read_preference = event.command.get("$readPreference", {}).get("mode", "primary")
+        self.metrics.command_started(event.command_name, read_preference)
+
+    def _finished(self, event):
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats["commands"] += 1
+            stats["db_time"] += event.duration_micros / 1_000_000
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+request_metrics = RequestMetrics()
+
+
+def install_metrics_middleware(app, metrics: RequestMetrics = request_metrics) -> None:
+    """Time every request and record it under its route template"""
+
+    @app.middleware("http")
+    async def record_request_metrics(request, call_next):
+        method = request.method
+        route = metrics.route_template(app, request.scope)
+        # Mutable so DB time recorded inside the handler's context is visible here
+        stats = {"commands": 0, "db_time": 0.0}
+        token = current_request_stats.set(stats)
+        metrics.request_started(method, route)
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            metrics.request_finished(method, route, status_code, time.perf_counter() - started, stats)
+            current_request_stats.reset(token)
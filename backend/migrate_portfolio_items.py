@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Move portfolio_files and project_gallery arrays off user documents into the
+portfolio_items collection.
+
+Safe to re-run: items are upserted by owner, kind and stored filename, and the
+arrays are only removed from a user once all of their items have been written.
+Afterwards the materialized portfolio stats (portfolio_score, project_count,
+technology_breakdown) are backfilled for every freelancer.
+
+Usage:
+    python migrate_portfolio_items.py [--batch-size 200]
+"""
+
+import argparse
+import os
+import uuid
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+from portfolio_stats import refresh_portfolio_stats
+
+load_dotenv()
+
+
+def portfolio_item_ops(user: dict) -> list:
+    """Build upserts for every legacy portfolio entry on a user document"""
+    ops = []
+
+    for file_info in user.get("portfolio_files", []):
+        ops.append(UpdateOne(
+            {"owner_id": user["id"], "kind": "file", "file_info.filename": file_info["filename"]},
+            {"$setOnInsert": {
+                "id": str(uuid.uuid4()),
+                "owner_id": user["id"],
+                "kind": "file",
+                "file_info": file_info,
+                "created_at": file_info.get("uploaded_at")
+            }},
+            upsert=True
+        ))
+
+    for project in user.get("project_gallery", []):
+        ops.append(UpdateOne(
+            {"owner_id": user["id"], "kind": "project", "id": project["id"]},
+            {"$setOnInsert": {
+                **project,
+                "owner_id": user["id"],
+                "kind": "project"
+            }},
+            upsert=True
+        ))
+
+    return ops
+
+
+def migrate_portfolio_items(db, batch_size: int = 200) -> dict:
+    """Copy legacy arrays into db.portfolio_items, set counters and unset the arrays"""
+    db.portfolio_items.create_index("id", unique=True)
+    db.portfolio_items.create_index([("owner_id", 1), ("kind", 1), ("created_at", -1)])
+    db.portfolio_items.create_index([("owner_id", 1), ("created_at", -1)])
+
+    users = db.users.find(
+        {"$or": [{"portfolio_files": {"$exists": True}}, {"project_gallery": {"$exists": True}}]},
+        {"id": 1, "portfolio_files": 1, "project_gallery": 1}
+    ).batch_size(batch_size)
+
+    stats = {"users": 0, "items": 0}
+    for user in users:
+        ops = portfolio_item_ops(user)
+        if ops:
+            db.portfolio_items.bulk_write(ops, ordered=False)
+
+        db.users.update_one(
+            {"id": user["id"]},
+            {"$unset": {"portfolio_files": "", "project_gallery": ""}}
+        )
+
+        stats["users"] += 1
+        stats["items"] += len(ops)
+
+    return stats
+
+
+def backfill_portfolio_stats(db, batch_size: int = 200) -> int:
+    """Materialize portfolio stats on every freelancer record"""
+    db.users.create_index([("is_verified", 1), ("portfolio_score", -1)])
+
+    count = 0
+    for user in db.users.find({"role": "freelancer"}, {"id": 1}).batch_size(batch_size):
+        refresh_portfolio_stats(db, user["id"])
+        count += 1
+
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move portfolio arrays into the portfolio_items collection")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    db = client[os.environ.get('MONGO_DB_NAME', 'afrilance')]
+    result = migrate_portfolio_items(db, batch_size=args.batch_size)
+    print(f"✅ Migrated {result['items']} portfolio items for {result['users']} users")
+
+    refreshed = backfill_portfolio_stats(db, batch_size=args.batch_size)
+    print(f"✅ Refreshed portfolio stats for {refreshed} freelancers")
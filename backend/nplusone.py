@@ -0,0 +1,166 @@
+"""
+Opt-in N+1 query detector for development, test and benchmark runs.
+
+Every MongoDB command issued while handling a request is reduced to a *shape*:
+command name, collection and the filter with literal values replaced by ``?``
+(``find users {"id": "?"}``). When one request issues the same shape more than
+``threshold`` times a warning is logged with the route template, and a
+per-endpoint summary is kept for ``write_report``.
+
+Enable with ``NPLUSONE_DETECTION=true``; ``NPLUSONE_THRESHOLD`` (default 5) and
+``NPLUSONE_REPORT`` (default ``nplusone_report.json``) tune it. The report is
+written when the app shuts down, which TestClient and uvicorn both trigger.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# Driver housekeeping commands that say nothing about query patterns
+IGNORED_COMMANDS = {"getMore", "endSessions", "hello", "isMaster", "ismaster", "ping", "killCursors", "saslStart", "saslContinue"}
+
+# Where each command keeps its filter
+FILTER_FIELDS = {
+    "find": "filter",
+    "count": "query",
+    "distinct": "query",
+    "findAndModify": "query"
+}
+
+# Shape counts for the request being handled
+current_request_shapes: contextvars.ContextVar[Optional[Counter]] = contextvars.ContextVar(
+    "current_request_shapes", default=None
+)
+
+
+def normalize(value):
+    """Replace literal values with ``?`` while keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        # $in and $or lists: the shape of the first element stands for all of them
+        return [normalize(value[0])] if value else []
+    return "?"
+
+
+def command_shape(command_name: str, command: dict) -> str:
+    """Collection, command and normalized filter, e.g. ``find users {"id": "?"}``"""
+    collection = command.get(command_name)
+
+    if command_name in FILTER_FIELDS:
+        shape = normalize(command.get(FILTER_FIELDS[command_name], {}))
+    elif command_name == "aggregate":
+        shape = [normalize(stage) for stage in command.get("pipeline", [])]
+    elif command_name in ("update", "delete"):
+        statements = command.get("updates" if command_name == "update" else "deletes", [])
+        shape = normalize(statements[0].get("q", {})) if statements else {}
+    else:
+        shape = {}
+
+    return f"{command_name} {collection} {json.dumps(shape, sort_keys=True, default=str)}"
+
+
+class QueryShapeDetector(monitoring.CommandListener):
+    """Counts repeated command shapes per request and aggregates them per endpoint"""
+
+    def __init__(self, threshold: int = 5):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # (method, route) -> {"requests", "flagged_requests", "shapes": {shape -> {"max", "total", "requests"}}}
+        self._endpoints = {}
+
+    # CommandListener interface
+
+    def started(self, event):
+        shapes = current_request_shapes.get()
+        if shapes is None or event.command_name in IGNORED_COMMANDS:
+            return
+        shapes[command_shape(event.command_name, event.command)] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    # Request tracking
+
+    def begin_request(self):
+        """Start counting shapes for the current request; returns the token for ``end_request``"""
+        return current_request_shapes.set(Counter())
+
+    def end_request(self, token, method: str, route: str) -> None:
+        shapes = current_request_shapes.get()
+        current_request_shapes.reset(token)
+        if shapes is None:
+            return
+
+        repeated = {shape: count for shape, count in shapes.items() if count > self.threshold}
+        for shape, count in repeated.items():
+            logger.warning("Possible N+1 on %s %s: %d x %s", method, route, count, shape)
+
+        with self._lock:
+            endpoint = self._endpoints.setdefault(
+                (method, route), {"requests": 0, "flagged_requests": 0, "commands": 0, "shapes": {}}
+            )
+            endpoint["requests"] += 1
+            endpoint["commands"] += sum(shapes.values())
+            if repeated:
+                endpoint["flagged_requests"] += 1
+            for shape, count in repeated.items():
+                summary = endpoint["shapes"].setdefault(shape, {"max": 0, "total": 0, "requests": 0})
+                summary["max"] = max(summary["max"], count)
+                summary["total"] += count
+                summary["requests"] += 1
+
+    # Reporting
+
+    def report(self) -> dict:
+        """Per-endpoint summary, worst offenders first"""
+        with self._lock:
+            endpoints = [
+                {
+                    "method": method,
+                    "route": route,
+                    "requests": data["requests"],
+                    "flagged_requests": data["flagged_requests"],
+                    "avg_commands": round(data["commands"] / data["requests"], 2) if data["requests"] else 0,
+                    "repeated_shapes": sorted(
+                        [{"shape": shape, **summary} for shape, summary in data["shapes"].items()],
+                        key=lambda item: item["max"], reverse=True
+                    )
+                }
+                for (method, route), data in self._endpoints.items()
+            ]
+
+        endpoints.sort(key=lambda item: (item["flagged_requests"] > 0, item["avg_commands"]), reverse=True)
+        return {
+            "generated_at": datetime.utcnow().isoformat(),
+            "threshold": self.threshold,
+            "endpoints": endpoints
+        }
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+        logger.info("N+1 query report written to %s", path)
+
+
+def install_nplusone_middleware(app, detector: QueryShapeDetector, route_template) -> None:
+    """Track command shapes for every request; ``route_template(app, scope)`` labels the endpoint"""
+
+    @app.middleware("http")
+    async def detect_repeated_queries(request, call_next):
+        token = detector.begin_request()
+        try:
+            return await call_next(request)
+        finally:
+            detector.end_request(token, request.method, route_template(app, request.scope))
@@ -0,0 +1,76 @@
+"""
+Materialized portfolio statistics stored on freelancer records.
+
+portfolio_file_count, project_count, technology_breakdown and portfolio_score
+are recomputed from db.portfolio_items whenever something that feeds them
+changes (upload, delete, verification, rating), so the featured portfolios
+query is an index-ordered read on (is_verified, portfolio_score).
+"""
+
+from datetime import datetime
+from typing import Iterable
+
+from pymongo import UpdateOne
+
+# Number of technologies kept in the materialized breakdown
+TECHNOLOGY_BREAKDOWN_LIMIT = 10
+
+
+def portfolio_score(file_count: int, project_count: int, rating: float) -> float:
+    """Ranking score used for featured portfolios"""
+    return file_count * 2 + project_count * 5 + rating * 10
+
+
+def refresh_portfolio_stats(db, user_id: str) -> None:
+    """Recompute the materialized portfolio fields for one freelancer"""
+    refresh_portfolio_stats_many(db, [user_id])
+
+
+def refresh_portfolio_stats_many(db, user_ids: Iterable[str]) -> None:
+    """Recompute the materialized portfolio fields for many freelancers with one aggregation"""
+    users = list(db.users.find(
+        {"id": {"$in": list(user_ids)}, "role": "freelancer"}, {"_id": 0, "id": 1, "rating": 1, "profile.rating": 1}
+    ))
+    if not users:
+        return
+    owner_ids = [user["id"] for user in users]
+
+    stats = next(db.portfolio_items.aggregate([
+        {"$match": {"owner_id": {"$in": owner_ids}}},
+        {"$facet": {
+            "counts": [{"$group": {"_id": {"owner_id": "$owner_id", "kind": "$kind"}, "count": {"$sum": 1}}}],
+            "technologies": [
+                {"$match": {"kind": "project"}},
+                {"$unwind": "$technologies"},
+                {"$group": {
+                    "_id": {"owner_id": "$owner_id", "name": {"$toLower": "$technologies"}},
+                    "name": {"$first": "$technologies"},
+                    "count": {"$sum": 1}
+                }},
+                {"$sort": {"count": -1}}
+            ]
+        }}
+    ]))
+    counts = {(row["_id"]["owner_id"], row["_id"]["kind"]): row["count"] for row in stats["counts"]}
+    breakdowns = {owner_id: [] for owner_id in owner_ids}
+    for tech in stats["technologies"]:
+        breakdown = breakdowns[tech["_id"]["owner_id"]]
+        if len(breakdown) < TECHNOLOGY_BREAKDOWN_LIMIT:
+            breakdown.append({"name": tech["name"], "count": tech["count"]})
+
+    now = datetime.utcnow()
+    updates = []
+    for user in users:
+        file_count = counts.get((user["id"], "file"), 0)
+        project_count = counts.get((user["id"], "project"), 0)
+        # Review ratings live on the user; older profiles carried profile.rating
+        rating = user.get("rating") or user.get("profile", {}).get("rating") or 3
+        updates.append(UpdateOne({"id": user["id"]}, {"$set": {
+            "portfolio_file_count": file_count,
+            "project_count": project_count,
+            "technology_breakdown": breakdowns[user["id"]],
+            # Freelancers without portfolio items are never featured
+            "portfolio_score": portfolio_score(file_count, project_count, rating) if (file_count or project_count) else 0,
+            "portfolio_stats_updated_at": now
+        }}))
+    db.users.bulk_write(updates, ordered=False)
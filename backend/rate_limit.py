@@ -0,0 +1,204 @@
+"""
+Per-identity token-bucket rate limiting for expensive endpoints.
+
+Every limited route has a budget: a bucket of ``capacity`` tokens refilled at
+``refill_per_second``. Each request takes one token from the bucket belonging to
+its identity (user id from the bearer token, otherwise the client IP); when the
+bucket is empty the request is rejected with 429 and a Retry-After header
+telling the client when the next token will be available.
+
+Behind a reverse proxy or ingress every connection comes from the proxy, so
+``client_ip`` takes the client address from X-Forwarded-For when, and only
+when, the connecting peer is one of the trusted proxies.
+
+Buckets live in process memory by default, which limits each worker process
+separately. ``MongoBucketStore`` keeps them in a shared collection so that all
+workers (and all instances behind a load balancer) draw from the same budget.
+"""
+
+import ipaddress
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    capacity: int
+    refill_per_second: float
+
+    @classmethod
+    def per_minute(cls, requests: int, burst: Optional[int] = None) -> "RateLimit":
+        return cls(capacity=burst or requests, refill_per_second=requests / 60)
+
+    @classmethod
+    def per_hour(cls, requests: int, burst: Optional[int] = None) -> "RateLimit":
+        return cls(capacity=burst or requests, refill_per_second=requests / 3600)
+
+    def retry_after(self, tokens: float) -> int:
+        """Whole seconds until the bucket holds one token again"""
+        return max(1, math.ceil((1 - tokens) / self.refill_per_second))
+
+
+def parse_networks(spec: str) -> List[ipaddress._BaseNetwork]:
+    """Comma-separated addresses or CIDR ranges, e.g. ``10.0.0.0/8,127.0.0.1``"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in spec.split(",") if item.strip()]
+
+
+def _in_networks(address: str, networks: List[ipaddress._BaseNetwork]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(request: Request, trusted_proxies: List[ipaddress._BaseNetwork]) -> str:
+    """The client address, read through X-Forwarded-For hops added by trusted proxies"""
+    peer = request.client.host if request.client else "unknown"
+    if not _in_networks(peer, trusted_proxies):
+        # Anyone can send X-Forwarded-For; only believe it from our own proxies
+        return peer
+    hops = [hop.strip() for header in request.headers.getlist("x-forwarded-for") for hop in header.split(",")]
+    # Proxies append the address they received the request from, so the client is the rightmost untrusted hop
+    for hop in reversed([hop for hop in hops if hop]):
+        if not _in_networks(hop, trusted_proxies):
+            return hop
+    return peer
+
+
+class MemoryBucketStore:
+    """Buckets held in this process; each worker enforces the budget on its own"""
+
+    name = "memory"
+
+    # How often buckets that have refilled completely are dropped, so idle identities don't accumulate
+    PRUNE_INTERVAL_SECONDS = 60
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def take(self, route: str, identity: str, limit: RateLimit) -> Tuple[bool, float]:
+        now = time.monotonic()
+        key = (route, identity)
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated) * limit.refill_per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            if now - self._last_prune > self.PRUNE_INTERVAL_SECONDS:
+                self._prune(now, route, limit)
+        return allowed, tokens
+
+    def _prune(self, now: float, route: str, limit: RateLimit) -> None:
+        self._last_prune = now
+        full_after = limit.capacity / limit.refill_per_second
+        for key, (_, updated) in list(self._buckets.items()):
+            if key[0] == route and now - updated > full_after:
+                del self._buckets[key]
+
+
+class MongoBucketStore:
+    """Buckets shared by every worker, refilled and decremented in one atomic update"""
+
+    name = "mongo"
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def ensure_indexes(self) -> None:
+        # Buckets expire once they would have refilled completely
+        self.collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def take(self, route: str, identity: str, limit: RateLimit) -> Tuple[bool, float]:
+        now = time.time()
+        full_after = limit.capacity / limit.refill_per_second
+        refilled = {"$min": [
+            limit.capacity,
+            {"$add": [
+                {"$ifNull": ["$tokens", limit.capacity]},
+                {"$multiply": [
+                    {"$max": [0, {"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}]},
+                    limit.refill_per_second
+                ]}
+            ]}
+        ]}
+        bucket = self.collection.find_one_and_update(
+            {"_id": f"{route}:{identity}"},
+            [
+                {"$set": {"tokens": refilled, "updated_at": now}},
+                {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                    "expires_at": datetime.utcnow() + timedelta(seconds=full_after)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return bucket["allowed"], bucket["tokens"]
+
+
+class RateLimiter:
+    def __init__(self, limits: Dict[str, RateLimit], store=None, enabled: bool = True):
+        self.limits = limits
+        self.store = store or MemoryBucketStore()
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def use_store(self, store) -> None:
+        self.store = store
+
+    def check(self, route: str, identity: str) -> Optional[int]:
+        """Take a token for ``identity``; returns the Retry-After seconds when rejected"""
+        limit = self.limits[route]
+        try:
+            allowed, tokens = self.store.take(route, identity, limit)
+        except Exception:
+            # A shared store outage must not take the endpoints down with it
+            logger.exception("Rate limit store failed; allowing request", extra={"route": route})
+            self._count(route, "store_errors")
+            return None
+        self._count(route, "allowed" if allowed else "limited")
+        return None if allowed else limit.retry_after(tokens)
+
+    def _count(self, route: str, outcome: str) -> None:
+        with self._lock:
+            route_stats = self._stats.setdefault(route, {"allowed": 0, "limited": 0, "store_errors": 0})
+            route_stats[outcome] += 1
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {route: dict(route_stats) for route, route_stats in self._stats.items()}
+
+    def dependency(self, route: str, identify):
+        """FastAPI dependency enforcing the ``route`` budget for the identity returned by ``identify(request)``"""
+        if route not in self.limits:
+            raise KeyError(f"No rate limit configured for {route}")
+
+        def enforce_rate_limit(request: Request) -> None:
+            if not self.enabled:
+                return
+            retry_after = self.check(route, identify(request))
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please try again later",
+                    headers={"Retry-After": str(retry_after)}
+                )
+
+        return enforce_rate_limit
@@ -0,0 +1,509 @@
+"""
+Skill-based job recommendations for freelancers.
+
+Each worker keeps an in-memory TF-IDF index of the open jobs: every normalized
+requirement (the whole phrase, plus its single words at a lower weight) is a
+term, and a job is a sparse row of term weights. The rows are held as per-term
+postings (job slot and term frequency arrays), so scoring a freelancer only
+touches the postings of their own skills and is a handful of vectorized NumPy
+operations, regardless of how many jobs are open. Cosine similarity against the
+freelancer's skills is blended with a category match and how well the budget of
+hourly jobs covers the freelancer's rate, and the top K come from argpartition.
+
+create_job adds a job and closing it (accepted proposal, completed or cancelled
+contract) removes it in the worker that handled the request. A background thread
+picks up jobs posted through other workers and periodically rebuilds the index
+from the database, which also drops jobs closed elsewhere and reclaims the slots
+of removed jobs.
+
+Measure scoring latency against a synthetic marketplace with:
+    python recommendations.py --benchmark --jobs 100000
+"""
+
+import argparse
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Score = text similarity, category match and budget fit, blended with these weights
+TEXT_WEIGHT = 0.7
+CATEGORY_WEIGHT = 0.2
+BUDGET_WEIGHT = 0.1
+
+# Term frequency of the single words of a multi-word skill, relative to the whole phrase
+WORD_WEIGHT = 0.5
+
+# IDF and row norms are recomputed once more than this fraction of the index changed since the last refresh
+REFRESH_FRACTION = 0.01
+
+# Fields the index needs from a job document
+JOB_INDEX_FIELDS = {"_id": 0, "id": 1, "requirements": 1, "category": 1, "budget": 1, "budget_type": 1, "created_at": 1}
+
+
+def normalize_term(text: str) -> str:
+    """Lowercase, accent-free, punctuation-free form of a skill or requirement"""
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode()
+    return " ".join(re.sub(r"[^a-z0-9+#]+", " ", text.lower()).split())
+
+
+def skill_terms(skills: Iterable[str]) -> Dict[str, float]:
+    """Term -> frequency for a list of skills or requirements"""
+    terms: Dict[str, float] = {}
+    for skill in skills or []:
+        phrase = normalize_term(skill)
+        if not phrase:
+            continue
+        terms[phrase] = terms.get(phrase, 0.0) + 1.0
+        words = phrase.split()
+        if len(words) > 1:
+            for word in words:
+                if len(word) > 1:
+                    terms[word] = terms.get(word, 0.0) + WORD_WEIGHT
+    return terms
+
+
+def _grown(array: np.ndarray, size: int, fill=0) -> np.ndarray:
+    """``array`` with room for at least ``size`` entries (capacity doubles)"""
+    if size <= len(array):
+        return array
+    grown = np.full(max(size, 2 * len(array), 16), fill, dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+class JobIndex:
+    """Sparse TF-IDF rows of open jobs, one slot per job; not thread-safe (see JobRecommender)"""
+
+    def __init__(self):
+        self._slots: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._active = np.zeros(0, dtype=bool)
+        self._budget = np.zeros(0, dtype=np.float64)
+        self._hourly = np.zeros(0, dtype=bool)
+        self._norms = np.zeros(0, dtype=np.float64)
+        self._categories: Dict[str, int] = {}
+        self._category_slots: List[List[int]] = []
+        self._category_slot_arrays: Dict[int, np.ndarray] = {}
+
+        self._vocabulary: Dict[str, int] = {}
+        self._df = np.zeros(0, dtype=np.float64)
+        self._idf = np.zeros(0, dtype=np.float64)
+        self._postings: List[Tuple[List[int], List[float]]] = []
+        self._posting_arrays: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        # Every (slot, term, tf) entry, for recomputing all row norms in one pass
+        self._entry_slot = np.zeros(0, dtype=np.int32)
+        self._entry_term = np.zeros(0, dtype=np.int32)
+        self._entry_tf = np.zeros(0, dtype=np.float64)
+        self._entries = 0
+        self._job_terms: Dict[int, List[int]] = {}
+
+        self.active_jobs = 0
+        self.removed_slots = 0
+        self._changes = 0
+
+    def __contains__(self, job_id: str) -> bool:
+        return job_id in self._slots
+
+    def __len__(self) -> int:
+        return self.active_jobs
+
+    @property
+    def terms(self) -> int:
+        return len(self._vocabulary)
+
+    def _term_idf(self, df) -> np.ndarray:
+        return np.log((1 + self.active_jobs) / (1 + np.asarray(df))) + 1
+
+    def _term_id(self, term: str) -> int:
+        term_id = self._vocabulary.get(term)
+        if term_id is None:
+            term_id = len(self._vocabulary)
+            self._vocabulary[term] = term_id
+            self._postings.append(([], []))
+            self._df = _grown(self._df, term_id + 1)
+            self._idf = _grown(self._idf, term_id + 1)
+        return term_id
+
+    def _category_id(self, category: Optional[str]) -> int:
+        if not category:
+            return -1
+        category_id = self._categories.get(category)
+        if category_id is None:
+            category_id = len(self._categories)
+            self._categories[category] = category_id
+            self._category_slots.append([])
+        return category_id
+
+    def add(self, job: dict) -> None:
+        """Index an open job; a job already in the index is replaced"""
+        self.add_many([job])
+
+    def add_many(self, jobs: Iterable[dict]) -> int:
+        """Index a batch of open jobs with one set of array updates; returns the number added"""
+        jobs = list({job["id"]: job for job in jobs}.values())
+        for job in jobs:
+            self.remove(job["id"])
+
+        first_slot = len(self._ids)
+        budgets, hourly = [], []
+        entry_slot, entry_term, entry_tf = [], [], []
+        for job in jobs:
+            slot = len(self._ids)
+            self._slots[job["id"]] = slot
+            self._ids.append(job["id"])
+            budgets.append(float(job.get("budget") or 0))
+            hourly.append(job.get("budget_type") == "hourly")
+            category_id = self._category_id(job.get("category"))
+            if category_id >= 0:
+                self._category_slots[category_id].append(slot)
+                self._category_slot_arrays.pop(category_id, None)
+
+            terms = skill_terms(job.get("requirements"))
+            term_ids = [self._term_id(term) for term in terms]
+            self._job_terms[slot] = term_ids
+            for term_id, tf in zip(term_ids, terms.values()):
+                slots, frequencies = self._postings[term_id]
+                slots.append(slot)
+                frequencies.append(tf)
+                self._posting_arrays.pop(term_id, None)
+            entry_slot.extend([slot] * len(term_ids))
+            entry_term.extend(term_ids)
+            entry_tf.extend(terms.values())
+
+        end_slot = len(self._ids)
+        added = end_slot - first_slot
+        if not added:
+            return 0
+        new_slots = slice(first_slot, end_slot)
+        self._active = _grown(self._active, end_slot)
+        self._budget = _grown(self._budget, end_slot)
+        self._hourly = _grown(self._hourly, end_slot)
+        self._norms = _grown(self._norms, end_slot)
+        self._active[new_slots] = True
+        self._budget[new_slots] = budgets
+        self._hourly[new_slots] = hourly
+        self.active_jobs += added
+
+        entries = slice(self._entries, self._entries + len(entry_slot))
+        self._entries = entries.stop
+        self._entry_slot = _grown(self._entry_slot, entries.stop)
+        self._entry_term = _grown(self._entry_term, entries.stop)
+        self._entry_tf = _grown(self._entry_tf, entries.stop)
+        self._entry_slot[entries] = entry_slot
+        self._entry_term[entries] = entry_term
+        self._entry_tf[entries] = entry_tf
+
+        # Document frequencies and IDF of the terms the batch uses, then the norms of the new rows
+        new_terms = self._entry_term[entries]
+        self._df[:len(self._vocabulary)] += np.bincount(new_terms, minlength=len(self._vocabulary))
+        touched = np.unique(new_terms)
+        self._idf[touched] = self._term_idf(self._df[touched])
+        weights = self._entry_tf[entries] * self._idf[new_terms]
+        self._norms[new_slots] = np.sqrt(np.bincount(
+            self._entry_slot[entries] - first_slot, weights=weights ** 2, minlength=added
+        ))
+        self._changes += added
+        return added
+
+    def remove(self, job_id: str) -> bool:
+        """Drop a job from scoring; its slot stays allocated until the next rebuild"""
+        slot = self._slots.pop(job_id, None)
+        if slot is None:
+            return False
+        self._active[slot] = False
+        term_ids = self._job_terms.pop(slot)
+        if term_ids:
+            self._df[term_ids] -= 1
+        self.active_jobs -= 1
+        self.removed_slots += 1
+        self._changes += 1
+        return True
+
+    def refresh(self, force: bool = False) -> None:
+        """Recompute IDF and row norms once enough jobs changed since the last refresh"""
+        if not self._changes or (not force and self._changes <= self.active_jobs * REFRESH_FRACTION):
+            return
+        terms = len(self._vocabulary)
+        self._idf[:terms] = self._term_idf(self._df[:terms])
+        entries = slice(0, self._entries)
+        weights = self._entry_tf[entries] * self._idf[self._entry_term[entries]]
+        norms = np.bincount(self._entry_slot[entries], weights=weights ** 2, minlength=len(self._ids))
+        self._norms[:len(self._ids)] = np.sqrt(norms)
+        self._changes = 0
+
+    def _category_array(self, category_id: int) -> np.ndarray:
+        slots = self._category_slot_arrays.get(category_id)
+        if slots is None:
+            slots = np.array(self._category_slots[category_id], dtype=np.int64)
+            self._category_slot_arrays[category_id] = slots
+        return slots
+
+    def _posting_array(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self._posting_arrays.get(term_id)
+        if arrays is None:
+            slots, frequencies = self._postings[term_id]
+            arrays = (np.array(slots, dtype=np.int64), np.array(frequencies, dtype=np.float64))
+            self._posting_arrays[term_id] = arrays
+        return arrays
+
+    def top(self, skills: Iterable[str], category: Optional[str] = None, hourly_rate: Optional[float] = None,
+            limit: int = 10, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """The ``limit`` best (job id, score) pairs for a freelancer, best first"""
+        size = len(self._ids)
+        query = [
+            (self._vocabulary[term], tf) for term, tf in skill_terms(skills).items() if term in self._vocabulary
+        ]
+        category_id = self._categories.get(category) if category else None
+        if size == 0 or limit <= 0 or (not query and category_id is None):
+            return []
+
+        self.refresh()
+        # Candidate rows and their text/category contributions, summed per row by a single bincount
+        slots, contributions = [], []
+        if query:
+            term_ids = np.array([term_id for term_id, _ in query], dtype=np.int64)
+            query_weights = np.array([tf for _, tf in query]) * self._idf[term_ids]
+            query_norm = math.sqrt(float(np.sum(query_weights ** 2)))
+            for term_id, weight in zip(term_ids.tolist(), query_weights.tolist()):
+                term_slots, frequencies = self._posting_array(term_id)
+                slots.append(term_slots)
+                contributions.append(
+                    frequencies * (TEXT_WEIGHT * weight * self._idf[term_id] / query_norm) / self._norms[term_slots]
+                )
+        if category_id is not None:
+            category_slots = self._category_array(category_id)
+            slots.append(category_slots)
+            contributions.append(np.full(len(category_slots), CATEGORY_WEIGHT))
+        scores = np.bincount(np.concatenate(slots), weights=np.concatenate(contributions), minlength=size)
+
+        candidates = np.flatnonzero(scores)
+        candidates = candidates[self._active[candidates]]
+        excluded = [self._slots[job_id] for job_id in exclude if job_id in self._slots]
+        if excluded:
+            candidates = np.setdiff1d(candidates, excluded, assume_unique=True)
+        if not len(candidates):
+            return []
+
+        candidate_scores = scores[candidates]
+        if hourly_rate and hourly_rate > 0:
+            budget_fit = np.where(
+                self._hourly[candidates], np.clip(self._budget[candidates] / hourly_rate, 0, 1), 1.0
+            )
+            candidate_scores += BUDGET_WEIGHT * budget_fit
+        else:
+            candidate_scores += BUDGET_WEIGHT
+
+        limit = min(limit, len(candidates))
+        best = np.argpartition(-candidate_scores, limit - 1)[:limit]
+        best = best[np.argsort(-candidate_scores[best], kind="stable")]
+        return [
+            (self._ids[slot], round(float(score), 4))
+            for slot, score in zip(candidates[best].tolist(), candidate_scores[best].tolist())
+        ]
+
+
+class JobRecommender:
+    """The worker's job index, kept current by request handlers and a background sync thread"""
+
+    def __init__(self, db=None, sync_interval: float = 30.0, rebuild_interval: float = 900.0):
+        self.db = db
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._index = JobIndex()
+        self._lock = threading.Lock()
+        self._journal: Optional[list] = None
+        self._synced_until: Optional[datetime] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.rebuilds = 0
+        self.queries = 0
+
+    def start(self, db=None) -> None:
+        """Build the index from the open jobs, then keep it in sync from a background thread"""
+        if db is not None:
+            self.db = db
+        if self._thread and self._thread.is_alive():
+            return
+        self.rebuild()
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="job-recommender", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        last_rebuild = time.monotonic()
+        while not self._stopping.wait(self.sync_interval):
+            try:
+                with self._lock:
+                    compact = self._index.removed_slots > max(1000, self._index.active_jobs)
+                if compact or time.monotonic() - last_rebuild > self.rebuild_interval:
+                    self.rebuild()
+                    last_rebuild = time.monotonic()
+                else:
+                    self.sync()
+            except Exception:
+                logger.exception("Job recommender sync failed")
+
+    def add_job(self, job: dict) -> None:
+        with self._lock:
+            self._index.add(job)
+            if self._journal is not None:
+                self._journal.append(("add", job))
+            self._advance(job.get("created_at"))
+
+    def remove_job(self, job_id: str) -> None:
+        with self._lock:
+            self._index.remove(job_id)
+            if self._journal is not None:
+                self._journal.append(("remove", job_id))
+
+    def _advance(self, created_at: Optional[datetime]) -> None:
+        if created_at and (self._synced_until is None or created_at > self._synced_until):
+            self._synced_until = created_at
+
+    def sync(self) -> int:
+        """Index open jobs posted through other workers since the last sync"""
+        query = {"status": "open"}
+        if self._synced_until:
+            query["created_at"] = {"$gte": self._synced_until}
+        added = 0
+        for job in self.db.jobs.find(query, JOB_INDEX_FIELDS):
+            with self._lock:
+                if job["id"] not in self._index:
+                    self._index.add(job)
+                    added += 1
+                self._advance(job.get("created_at"))
+        return added
+
+    def rebuild(self) -> None:
+        """Replace the index with a fresh one built from every open job"""
+        with self._lock:
+            # Changes made while the new index is built are replayed onto it before the swap
+            self._journal = []
+        index = JobIndex()
+        synced_until = None
+        try:
+            batch = []
+            for job in self.db.jobs.find({"status": "open"}, JOB_INDEX_FIELDS).batch_size(5000):
+                batch.append(job)
+                if job.get("created_at") and (synced_until is None or job["created_at"] > synced_until):
+                    synced_until = job["created_at"]
+                if len(batch) >= 5000:
+                    index.add_many(batch)
+                    batch = []
+            index.add_many(batch)
+            index.refresh(force=True)
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            for change, value in self._journal:
+                if change == "add":
+                    index.add(value)
+                else:
+                    index.remove(value)
+            self._journal = None
+            self._index = index
+            self._advance(synced_until)
+        self.rebuilds += 1
+
+    def recommend(self, skills: Iterable[str], category: Optional[str] = None, hourly_rate: Optional[float] = None,
+                  limit: int = 10, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        with self._lock:
+            self.queries += 1
+            return self._index.top(skills, category, hourly_rate, limit, exclude)
+
+    def stats(self) -> dict:
+        return {
+            "jobs": self._index.active_jobs,
+            "terms": self._index.terms,
+            "rebuilds": self.rebuilds,
+            "queries": self.queries
+        }
+
+
+def run_benchmark(jobs: int, queries: int, limit: int, seed: int) -> None:
+    """Build an index of ``jobs`` synthetic open jobs and time recommendations against it"""
+    import random
+
+    from seed_data import CATEGORIES, CATEGORY_SKILLS
+
+    rng = random.Random(seed)
+    # Real postings name many specific skills; pad the seed vocabulary with variants so the index has realistic width
+    variants = ["", "Senior", "Junior", "Advanced", "Certified", "Remote", "Commercial", "Residential"]
+
+    def requirements(category: str, count: int) -> List[str]:
+        return [f"{rng.choice(variants)} {skill}".strip() for skill in rng.sample(CATEGORY_SKILLS[category], k=count)]
+
+    def job(number: int) -> dict:
+        category = rng.choice(CATEGORIES)
+        return {
+            "id": f"job-{number}",
+            "category": category,
+            "budget": float(rng.randrange(100, 100000, 100)),
+            "budget_type": rng.choice(["fixed", "fixed", "hourly"]),
+            "requirements": requirements(category, rng.randint(1, 4))
+        }
+
+    open_jobs = [job(number) for number in range(jobs)]
+    index = JobIndex()
+    started = time.perf_counter()
+    index.add_many(open_jobs)
+    index.refresh(force=True)
+    build_seconds = time.perf_counter() - started
+
+    timings = []
+    for _ in range(queries):
+        category = rng.choice(CATEGORIES)
+        skills = requirements(category, min(4, len(CATEGORY_SKILLS[category])))
+        started = time.perf_counter()
+        index.top(skills, category, float(rng.randrange(100, 1500, 50)), limit)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    for number in range(1000):
+        category = rng.choice(CATEGORIES)
+        index.add({"id": f"new-{number}", "category": category, "budget": 1000.0, "budget_type": "fixed",
+                   "requirements": requirements(category, 2)})
+        index.remove(f"job-{number}")
+    update_ms = (time.perf_counter() - started) * 1000 / 2000
+
+    timings.sort()
+
+    def percentile(fraction: float) -> float:
+        return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+    print(f"✅ {jobs} open jobs, {index.terms} terms: built in {build_seconds:.2f}s")
+    print(f"   top-{limit} over {queries} freelancers: p50 {percentile(0.5):.2f}ms, "
+          f"p95 {percentile(0.95):.2f}ms, p99 {percentile(0.99):.2f}ms")
+    print(f"   incremental add/remove: {update_ms:.3f}ms per job")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Job recommendation index")
+    parser.add_argument("--benchmark", action="store_true", help="Time recommendations against synthetic open jobs")
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.jobs, args.queries, args.limit, args.seed)
+    else:
+        parser.print_help()
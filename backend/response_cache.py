@@ -0,0 +1,257 @@
+"""
+In-process response cache for public, read-heavy endpoints.
+
+Entries are keyed by route name and handler parameters. Each route has a TTL
+during which cached responses are served as-is, plus a stale window during
+which the stale response is served immediately while a background task
+recomputes it (stale-while-revalidate). Write endpoints call ``invalidate`` to
+drop entries that their change affects.
+
+Each route holds at most ``max_entries`` responses; the least recently used is
+evicted first, after any that have outlived their stale window.
+
+With several workers, ``start(db)`` shares invalidations between them: each
+invalidation bumps a per-route generation in ``db.cache_generations`` and a
+background thread in every worker applies the other workers' invalidations
+within ``sync_interval`` seconds.
+
+Routes read from secondaries can lag behind the write that invalidated them,
+so for ``primary_window`` seconds after an invalidation recomputes run with
+``prefer_primary`` set and ``read_db`` sends them to the primary.
+"""
+
+import asyncio
+import functools
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Set while a cache entry is recomputed soon after an invalidation
+prefer_primary: ContextVar[bool] = ContextVar("prefer_primary", default=False)
+
+# Invalidations kept per route for other workers; a worker further behind drops the whole route
+RECENT_INVALIDATIONS = 50
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 1000, primary_window: float = 0):
+        self.max_entries = max_entries
+        self.primary_window = primary_window
+        # route -> {param key -> entry}, least recently used first
+        self._entries: Dict[str, "OrderedDict[tuple, dict]"] = {}
+        self._refreshing = set()
+        self._metrics: Dict[str, Dict[str, int]] = {}
+        self._invalidated_at: Dict[str, float] = {}
+        # Cross-worker invalidation
+        self.worker_id = uuid.uuid4().hex
+        self.db = None
+        self.sync_interval = 1.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._published = queue.Queue()
+        self._generations: Optional[Dict[str, int]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    def _count(self, route: str, metric: str, amount: int = 1) -> None:
+        route_metrics = self._metrics.setdefault(route, {
+            "hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "invalidations": 0,
+            "remote_invalidations": 0, "evictions": 0
+        })
+        route_metrics[metric] += amount
+
+    @staticmethod
+    def _key(params: dict) -> tuple:
+        return tuple(sorted(params.items()))
+
+    async def get_or_compute(
+        self,
+        route: str,
+        params: dict,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: float,
+        stale_ttl: float = 0
+    ) -> Any:
+        """Serve a cached response, refreshing it in the background once it goes stale"""
+        key = self._key(params)
+        entries = self._entries.get(route, {})
+        entry = entries.get(key)
+        now = time.monotonic()
+
+        if entry:
+            age = now - entry["stored_at"]
+            if age < ttl:
+                entries.move_to_end(key)
+                self._count(route, "hits")
+                return entry["value"]
+            if age < ttl + stale_ttl:
+                entries.move_to_end(key)
+                self._count(route, "stale_hits")
+                if (route, key) not in self._refreshing:
+                    self._refreshing.add((route, key))
+                    asyncio.get_running_loop().create_task(self._refresh(route, params, key, compute, ttl + stale_ttl))
+                return entry["value"]
+            del entries[key]
+
+        self._count(route, "misses")
+        value = await self._compute(route, compute)
+        self._store(route, key, params, value, ttl + stale_ttl)
+        return value
+
+    async def _compute(self, route: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        recently_invalidated = time.monotonic() - self._invalidated_at.get(route, float("-inf")) < self.primary_window
+        token = prefer_primary.set(recently_invalidated)
+        try:
+            return await compute()
+        finally:
+            prefer_primary.reset(token)
+
+    async def _refresh(self, route: str, params: dict, key: tuple, compute: Callable[[], Awaitable[Any]],
+                       lifetime: float) -> None:
+        try:
+            value = await self._compute(route, compute)
+            self._store(route, key, params, value, lifetime)
+            self._count(route, "refreshes")
+        except Exception:
+            # Keep serving the stale entry until it expires
+            self._count(route, "refresh_errors")
+        finally:
+            self._refreshing.discard((route, key))
+
+    def _store(self, route: str, key: tuple, params: dict, value: Any, lifetime: float) -> None:
+        entries = self._entries.setdefault(route, OrderedDict())
+        now = time.monotonic()
+        entries[key] = {"value": value, "params": params, "stored_at": now, "expires_at": now + lifetime}
+        entries.move_to_end(key)
+        if len(entries) > self.max_entries:
+            expired = [stored_key for stored_key, entry in entries.items() if entry["expires_at"] <= now]
+            for stored_key in expired:
+                del entries[stored_key]
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._count(route, "evictions")
+
+    def invalidate(self, route: str, match: Optional[dict] = None) -> None:
+        """Drop every entry for a route, or only those whose params include ``match``, in every worker"""
+        self._drop(route, match)
+        if self._thread:
+            self._published.put((route, match))
+
+    def _drop(self, route: str, match: Optional[dict] = None, metric: str = "invalidations") -> None:
+        self._invalidated_at[route] = time.monotonic()
+        entries = self._entries.get(route)
+        if not entries:
+            return
+
+        if match is None:
+            removed = len(entries)
+            entries.clear()
+        else:
+            stale_keys = [
+                key for key, entry in entries.items()
+                if all(entry["params"].get(name) == value for name, value in match.items())
+            ]
+            for key in stale_keys:
+                del entries[key]
+            removed = len(stale_keys)
+
+        self._count(route, metric, removed)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Per-route hit/miss/refresh counters and current entry counts"""
+        return {
+            route: {**metrics, "entries": len(self._entries.get(route, {}))}
+            for route, metrics in self._metrics.items()
+        }
+
+    def cached(self, route: str, ttl: float, stale_ttl: float = 0):
+        """Decorator for FastAPI handlers; the handler's keyword arguments form the cache key"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(**kwargs):
+                return await self.get_or_compute(route, kwargs, lambda: func(**kwargs), ttl, stale_ttl)
+            return wrapper
+        return decorator
+
+    # Cross-worker invalidation
+
+    def start(self, db, sync_interval: float = 1.0) -> None:
+        """Share invalidations with the other workers through ``db``; call from the event loop"""
+        self.db = db
+        self.sync_interval = sync_interval
+        self._loop = asyncio.get_running_loop()
+        if self._thread and self._thread.is_alive():
+            return
+        self._generations = None
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="response-cache-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop syncing after publishing pending invalidations"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.sync_interval):
+            self._sync()
+        self._publish()
+
+    def _sync(self) -> None:
+        try:
+            self._publish()
+            self._apply_remote()
+        except Exception as e:
+            logger.error("Response cache sync failed: %s", e)
+
+    def _publish(self) -> None:
+        while True:
+            try:
+                route, match = self._published.get_nowait()
+            except queue.Empty:
+                return
+            generation = self.db.cache_generations.find_one_and_update(
+                {"_id": route},
+                {"$inc": {"generation": 1}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )["generation"]
+            self.db.cache_generations.update_one({"_id": route}, {"$push": {"recent": {
+                "$each": [{"generation": generation, "match": match, "origin": self.worker_id}],
+                "$slice": -RECENT_INVALIDATIONS
+            }}})
+
+    def _apply_remote(self) -> None:
+        generations = {}
+        for doc in self.db.cache_generations.find({}):
+            route, generation = doc["_id"], doc["generation"]
+            generations[route] = generation
+            # Nothing to catch up on at startup; the cache starts empty
+            if self._generations is None or generation <= self._generations.get(route, 0):
+                continue
+            seen = self._generations.get(route, 0)
+            recent = {item["generation"]: item for item in doc.get("recent", [])}
+            missing = [number for number in range(seen + 1, generation + 1) if number not in recent]
+            if missing:
+                self._loop.call_soon_threadsafe(self._drop, route, None, "remote_invalidations")
+                continue
+            for number in range(seen + 1, generation + 1):
+                if recent[number]["origin"] != self.worker_id:
+                    self._loop.call_soon_threadsafe(self._drop, route, recent[number]["match"], "remote_invalidations")
+        self._generations = generations
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,587 @@
+#!/usr/bin/env python3
+"""
+Seed a database with synthetic marketplace data for benchmarks.
+
+Documents mirror what server.py writes: freelancers (profiles, wallets,
+portfolio_items and the materialized portfolio stats), clients, jobs across the
+marketplace categories, applications, contracts, reviews, direct-message
+conversations with skewed message counts and support tickets with replies.
+Jobs, applications, contracts, messages and conversations carry the same
+copies of user fields that denormalize.py maintains.
+
+Output is reproducible: the same --seed and --scale always produce the same ids,
+timestamps and content. Every collection is written with unordered insert_many
+batches.
+
+Usage:
+    python seed_data.py --scale 10k --drop
+    python seed_data.py --scale 100k --db-name afrilance_bench_100k --seed 7
+    python seed_data.py --users 250000 --batch-size 5000
+
+Data goes into the ``afrilance_bench`` database unless --db-name says
+otherwise; --drop refuses to drop the application's own ``afrilance`` database.
+Point the app or the load test at the seeded database with MONGO_DB_NAME, e.g.
+``python loadtest.py --mongo-url mongodb://localhost:27017/ --db-name afrilance_bench``.
+
+Every seeded account uses the password ``Password123!``.
+"""
+
+import argparse
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+import bcrypt
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateMany
+
+from denormalize import (
+    APPLICATION_FREELANCER_FIELDS, CONTRACT_CLIENT_FIELDS, CONTRACT_FREELANCER_FIELDS, COPIED_USER_FIELDS,
+    JOB_CLIENT_FIELDS, MESSAGE_SENDER_FIELDS, PARTICIPANT_FIELDS, user_fields
+)
+from portfolio_stats import TECHNOLOGY_BREAKDOWN_LIMIT, portfolio_score
+from typeahead import search_prefixes
+from locations import location_fields
+from message_search import message_search_keys
+
+# Number of users for each named scale; every other volume is derived from it
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+SEED_PASSWORD = "Password123!"
+
+# Categories shown on the landing page (see get_category_counts)
+CATEGORIES = [
+    'ICT & Digital Work', 'Construction & Engineering', 'Creative & Media',
+    'Admin & Office Support', 'Health & Wellness', 'Beauty & Fashion',
+    'Logistics & Labour', 'Education & Training', 'Home & Domestic Services'
+]
+
+CATEGORY_SKILLS = {
+    'ICT & Digital Work': ["Python", "React", "JavaScript", "Django", "FastAPI", "MongoDB", "AWS", "Flutter", "SQL", "DevOps"],
+    'Construction & Engineering': ["AutoCAD", "Plumbing", "Electrical", "Welding", "Bricklaying", "Project Management", "Revit"],
+    'Creative & Media': ["Photoshop", "Illustrator", "Video Editing", "Copywriting", "Photography", "Figma", "Animation"],
+    'Admin & Office Support': ["Data Entry", "Excel", "Bookkeeping", "Customer Service", "Scheduling", "Transcription"],
+    'Health & Wellness': ["Nutrition", "Personal Training", "Yoga", "Physiotherapy", "Counselling"],
+    'Beauty & Fashion': ["Makeup", "Hair Styling", "Nail Art", "Tailoring", "Fashion Design"],
+    'Logistics & Labour': ["Driving", "Moving", "Warehousing", "Forklift", "Delivery"],
+    'Education & Training': ["Mathematics Tutoring", "English Tutoring", "Coding Bootcamp", "Curriculum Design", "Afrikaans"],
+    'Home & Domestic Services': ["Cleaning", "Gardening", "Childcare", "Cooking", "Pool Maintenance"]
+}
+
+LOCATIONS = [
+    "Johannesburg, Gauteng", "Pretoria, Gauteng", "Cape Town, Western Cape", "Durban, KwaZulu-Natal",
+    "Gqeberha, Eastern Cape", "Bloemfontein, Free State", "Polokwane, Limpopo", "Mbombela, Mpumalanga",
+    "Kimberley, Northern Cape", "Mahikeng, North West", "East London, Eastern Cape", "Stellenbosch, Western Cape"
+]
+
+FIRST_NAMES = ["Thabo", "Naledi", "Sipho", "Lerato", "Johan", "Ayesha", "Pieter", "Zanele", "Kagiso", "Refilwe",
+               "Mandla", "Nomvula", "Ruan", "Priya", "Bongani", "Lindiwe", "Tshepo", "Anele", "Marius", "Fatima"]
+LAST_NAMES = ["Nkosi", "Dlamini", "van der Merwe", "Naidoo", "Mokoena", "Botha", "Khumalo", "Pillay", "Mahlangu",
+              "Smith", "Ndlovu", "Pretorius", "Molefe", "Govender", "Zulu", "Jacobs", "Sithole", "Venter"]
+JOB_VERBS = ["Build", "Design", "Fix", "Install", "Set up", "Create", "Renovate", "Manage", "Translate", "Teach"]
+JOB_OBJECTS = ["e-commerce website", "company logo", "mobile app", "solar geyser", "bathroom", "social media campaign",
+               "accounting spreadsheet", "delivery route", "wedding shoot", "matric maths lessons", "office network"]
+MESSAGE_SNIPPETS = ["Hi, is this still available?", "I can start on Monday.", "Please share the requirements.",
+                    "Sent the first draft, let me know.", "Can we move the deadline?", "Payment received, thanks!",
+                    "Here is the updated quote.", "Looks great, just a few changes.", "Call me when you're free."]
+
+
+class Seeder:
+    def __init__(self, db, users: int, seed: int = 42, batch_size: int = 2000, base_date: datetime = datetime(2025, 1, 1)):
+        self.db = db
+        self.users = users
+        self.batch_size = batch_size
+        self.base_date = base_date
+        self.rng = random.Random(seed)
+        # One hash shared by every seeded account; bcrypt per user would dominate seeding time
+        self.password_hash = bcrypt.hashpw(SEED_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=10)).decode('utf-8')
+        self.freelancers = []  # (id, full_name, category)
+        self.portfolio_counts = {}  # freelancer id -> (file_count, project_count)
+        self._portfolio_buffer = []
+        self.clients = []      # (id, full_name)
+        self.jobs = []         # (id, client_id, category, budget, created_at, title)
+        self.copied = {}       # user id -> the user fields other documents copy
+        self.counts = Counter()
+
+    # Deterministic helpers
+
+    def new_id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def timestamp(self, days: int = 365, after: datetime = None) -> datetime:
+        start = after or self.base_date
+        return start + timedelta(seconds=self.rng.randint(0, days * 86400))
+
+    def skewed(self, alpha: float, cap: int) -> int:
+        """Heavy-tailed count: most values are small, a few are very large"""
+        return min(cap, int(self.rng.paretovariate(alpha)) - 1)
+
+    def name(self) -> str:
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def insert(self, collection: str, docs) -> None:
+        """Insert an iterable of documents in unordered batches"""
+        batch = []
+        for doc in docs:
+            batch.append(doc)
+            if len(batch) >= self.batch_size:
+                self.db[collection].insert_many(batch, ordered=False)
+                self.counts[collection] += len(batch)
+                batch = []
+        if batch:
+            self.db[collection].insert_many(batch, ordered=False)
+            self.counts[collection] += len(batch)
+
+    # Collections
+
+    def seed_users(self) -> None:
+        freelancer_count = int(self.users * 0.7)
+        self.insert("users", (self.freelancer(index) for index in range(freelancer_count)))
+        self.insert("portfolio_items", self._portfolio_buffer)
+        self._portfolio_buffer = []
+        self.insert("users", (self.client(index) for index in range(self.users - freelancer_count)))
+
+    def freelancer(self, index: int) -> dict:
+        user_id = self.new_id()
+        full_name = self.name()
+        category = self.rng.choice(CATEGORIES)
+        created_at = self.timestamp()
+        is_verified = self.rng.random() < 0.6
+        self.freelancers.append((user_id, full_name, category))
+
+        items = self.portfolio_items(user_id, category, created_at)
+        self._portfolio_buffer.extend(items)
+        if len(self._portfolio_buffer) >= self.batch_size:
+            self.insert("portfolio_items", self._portfolio_buffer)
+            self._portfolio_buffer = []
+        file_count = sum(1 for item in items if item["kind"] == "file")
+        project_count = len(items) - file_count
+        self.portfolio_counts[user_id] = (file_count, project_count)
+        technologies = Counter(tech for item in items if item["kind"] == "project" for tech in item["technologies"])
+
+        email = f"freelancer{index}@seed.afrilance.co.za"
+        location = self.rng.choice(LOCATIONS)
+        return self.remember({
+            "id": user_id,
+            "email": email,
+            "password": self.password_hash,
+            "role": "freelancer",
+            "full_name": full_name,
+            "search_prefixes": search_prefixes(full_name, email),
+            "phone": f"+2782{self.rng.randint(0, 9999999):07d}",
+            "is_verified": is_verified,
+            "verification_status": "approved" if is_verified else "pending",
+            "verified_at": self.timestamp(30, after=created_at) if is_verified else None,
+            "id_document": None,
+            "profile_completed": True,
+            "created_at": created_at,
+            "last_login": self.timestamp(30, after=created_at),
+            "status": "active",
+            "is_suspended": self.rng.random() < 0.01,
+            "verification_required": not is_verified,
+            "can_bid": is_verified,
+            "total_reviews": 0,
+            "profile": {
+                "category": category,
+                "profession": f"{category.split(' &')[0]} Specialist",
+                "skills": self.rng.sample(CATEGORY_SKILLS[category], k=min(4, len(CATEGORY_SKILLS[category]))),
+                "experience": f"{self.rng.randint(1, 20)} years",
+                "hourly_rate": float(self.rng.randrange(100, 1500, 50)),
+                "bio": f"Experienced {category.lower()} professional based in {location}.",
+                "location": location,
+                "availability": self.rng.choice(["available", "busy", "part-time"]),
+                "languages": self.rng.sample(["English", "Afrikaans", "isiZulu", "isiXhosa", "Sesotho", "Setswana"], k=2),
+                "portfolio_links": []
+            },
+            # Materialized stats, as refresh_portfolio_stats would write them
+            "portfolio_file_count": file_count,
+            "project_count": project_count,
+            "technology_breakdown": [
+                {"name": name, "count": count} for name, count in technologies.most_common(TECHNOLOGY_BREAKDOWN_LIMIT)
+            ],
+            # Ratings arrive with reviews; until then the default rating of 3 applies
+            "portfolio_score": portfolio_score(file_count, project_count, 3) if items else 0,
+            "portfolio_stats_updated_at": created_at,
+            **location_fields(location)
+        })
+
+    def remember(self, user: dict) -> dict:
+        """Keep the fields that referencing documents copy from ``user``"""
+        self.copied[user["id"]] = {field: user[field] for field in COPIED_USER_FIELDS if field in user}
+        return user
+
+    def portfolio_items(self, owner_id: str, category: str, created_at: datetime) -> list:
+        items = []
+        for _ in range(self.skewed(1.5, 30)):
+            uploaded_at = self.timestamp(180, after=created_at)
+            filename = f"{self.new_id()}.jpg"
+            file_info = {
+                "filename": filename,
+                "original_name": f"work_sample_{len(items)}.jpg",
+                "file_path": f"uploads/portfolios/{filename}",
+                "storage_key": f"portfolios/{filename}",
+                "file_url": f"/uploads/portfolios/{filename}",
+                "content_type": "image/jpeg",
+                "file_size": self.rng.randint(50_000, 5_000_000),
+                "uploaded_at": uploaded_at
+            }
+            if self.rng.random() < 0.5:
+                items.append({"id": self.new_id(), "owner_id": owner_id, "kind": "file",
+                              "file_info": file_info, "created_at": uploaded_at})
+            else:
+                items.append({
+                    "id": self.new_id(),
+                    "owner_id": owner_id,
+                    "kind": "project",
+                    "title": f"{self.rng.choice(JOB_VERBS)} {self.rng.choice(JOB_OBJECTS)}",
+                    "description": f"Delivered for a client in {self.rng.choice(LOCATIONS)}.",
+                    "technologies": self.rng.sample(CATEGORY_SKILLS[category], k=min(3, len(CATEGORY_SKILLS[category]))),
+                    "project_url": None,
+                    "file_info": {**file_info, "file_path": f"uploads/project_gallery/{filename}",
+                                  "storage_key": f"project_gallery/{filename}",
+                                  "file_url": f"/uploads/project_gallery/{filename}"},
+                    "created_at": uploaded_at
+                })
+        return items
+
+    def client(self, index: int) -> dict:
+        user_id = self.new_id()
+        full_name = self.name()
+        self.clients.append((user_id, full_name))
+        created_at = self.timestamp()
+        email = f"client{index}@seed.afrilance.co.za"
+        return self.remember({
+            "id": user_id,
+            "email": email,
+            "password": self.password_hash,
+            "role": "client",
+            "full_name": full_name,
+            "search_prefixes": search_prefixes(full_name, email),
+            "phone": f"+2783{self.rng.randint(0, 9999999):07d}",
+            "is_verified": self.rng.random() < 0.3,
+            "id_document": None,
+            "profile_completed": False,
+            "created_at": created_at,
+            "profile": {},
+            "last_login": self.timestamp(30, after=created_at),
+            "status": "active",
+            "verification_required": False,
+            "can_bid": True
+        })
+
+    def seed_wallets(self) -> None:
+        def wallets():
+            for user_id, _, _ in self.freelancers:
+                history = []
+                available = 0.0
+                for _ in range(self.skewed(1.1, 1000)):
+                    amount = float(self.rng.randrange(100, 20000, 50))
+                    if available >= amount and self.rng.random() < 0.3:
+                        history.append({"type": "Debit", "amount": amount, "date": self.timestamp(),
+                                        "note": "Withdrawal to bank account"})
+                        available -= amount
+                    else:
+                        history.append({"type": "Credit", "amount": amount, "date": self.timestamp(),
+                                        "note": "Escrow released for job completion"})
+                        available += amount
+                yield {
+                    "id": self.new_id(),
+                    "user_id": user_id,
+                    "available_balance": round(available, 2),
+                    "escrow_balance": 0.0,
+                    "transaction_history": history,
+                    "created_at": self.base_date
+                }
+        self.insert("wallets", wallets())
+
+    def seed_jobs(self) -> None:
+        def jobs():
+            for _ in range(int(self.users * 0.5)):
+                client_id = self.rng.choice(self.clients)[0]
+                category = self.rng.choice(CATEGORIES)
+                created_at = self.timestamp()
+                budget = float(self.rng.randrange(500, 100000, 100))
+                job_id = self.new_id()
+                location = self.rng.choice(LOCATIONS)
+                title = f"{self.rng.choice(JOB_VERBS)} {self.rng.choice(JOB_OBJECTS)}"
+                self.jobs.append((job_id, client_id, category, budget, created_at, title))
+                yield {
+                    "id": job_id,
+                    "client_id": client_id,
+                    **user_fields(self.copied[client_id], JOB_CLIENT_FIELDS),
+                    "status": "open",
+                    "created_at": created_at,
+                    "applications_count": 0,
+                    "title": title,
+                    "description": f"Looking for a reliable professional in {location}.",
+                    "category": category,
+                    "budget": budget,
+                    "budget_type": self.rng.choice(["fixed", "fixed", "hourly"]),
+                    "requirements": self.rng.sample(CATEGORY_SKILLS[category], k=2),
+                    "location": location,
+                    **location_fields(location)
+                }
+        self.insert("jobs", jobs())
+
+    def seed_applications_and_contracts(self) -> None:
+        """Applications per job are skewed; about a fifth of jobs end in a contract"""
+        applications, contracts, reviews = [], [], []
+        job_updates = {}
+        review_totals = {}
+
+        def flush():
+            for collection, docs in (("applications", applications), ("contracts", contracts), ("reviews", reviews)):
+                if docs:
+                    self.insert(collection, docs)
+                    docs.clear()
+
+        for job_id, client_id, category, budget, created_at, title in self.jobs:
+            bidders = self.rng.sample(self.freelancers, k=min(len(self.freelancers), 1 + self.skewed(1.1, 200)))
+            if not bidders:
+                continue
+
+            job_apps = []
+            for freelancer_id, _, _ in bidders:
+                job_apps.append({
+                    "id": self.new_id(),
+                    "job_id": job_id,
+                    "freelancer_id": freelancer_id,
+                    **user_fields(self.copied[freelancer_id], APPLICATION_FREELANCER_FIELDS),
+                    "proposal": "I have done similar work and can start immediately.",
+                    "bid_amount": round(budget * self.rng.uniform(0.6, 1.2), 2),
+                    "status": "pending",
+                    "created_at": self.timestamp(14, after=created_at)
+                })
+
+            update = {"applications_count": len(job_apps)}
+            if self.rng.random() < 0.2:
+                accepted = self.rng.choice(job_apps)
+                status = self.rng.choices(["In Progress", "Completed", "Cancelled"], [3, 6, 1])[0]
+                started = self.timestamp(7, after=accepted["created_at"])
+                contract_id = self.new_id()
+                for application in job_apps:
+                    application["status"] = "accepted" if application is accepted else "rejected"
+                contract = {
+                    "id": contract_id,
+                    "job_id": job_id,
+                    "job_title": title,
+                    "job_category": category,
+                    "freelancer_id": accepted["freelancer_id"],
+                    **user_fields(self.copied[accepted["freelancer_id"]], CONTRACT_FREELANCER_FIELDS),
+                    "client_id": client_id,
+                    **user_fields(self.copied[client_id], CONTRACT_CLIENT_FIELDS),
+                    "amount": accepted["bid_amount"],
+                    "status": status,
+                    "created_at": started,
+                    "proposal_id": accepted["id"],
+                    "start_date": started,
+                    "milestones": [],
+                    "payments": []
+                }
+                update.update({"status": "assigned", "assigned_freelancer_id": accepted["freelancer_id"],
+                               "contract_id": contract_id})
+                if status == "Completed":
+                    contract["completed_at"] = self.timestamp(60, after=started)
+                    update.update({"status": "completed", "completed_at": contract["completed_at"]})
+                    if self.rng.random() < 0.7:
+                        rating = self.rng.choices([1, 2, 3, 4, 5], [1, 1, 3, 8, 12])[0]
+                        reviews.append({
+                            "id": self.new_id(),
+                            "contract_id": contract_id,
+                            "reviewer_id": client_id,
+                            "reviewed_user_id": accepted["freelancer_id"],
+                            "reviewer_type": "client",
+                            "rating": rating,
+                            "review_text": "Great communication and quality work." if rating >= 4 else "Work was delayed.",
+                            "created_at": self.timestamp(14, after=contract["completed_at"]),
+                            "is_approved": True,
+                            "is_public": True
+                        })
+                        totals = review_totals.setdefault(accepted["freelancer_id"], [0, 0])
+                        totals[0] += rating
+                        totals[1] += 1
+                elif status == "Cancelled":
+                    update.update({"status": "cancelled", "cancelled_at": self.timestamp(30, after=started)})
+                contracts.append(contract)
+
+            applications.extend(job_apps)
+            job_updates[job_id] = update
+            if len(applications) >= self.batch_size:
+                flush()
+        flush()
+
+        self.bulk_set("jobs", job_updates)
+        # Ratings and totals as create_review maintains them, with the score they feed
+        rated = {}
+        for user_id, (total, count) in review_totals.items():
+            rating = round(total / count, 1)
+            file_count, project_count = self.portfolio_counts[user_id]
+            rated[user_id] = {
+                "rating": rating,
+                "total_reviews": count,
+                "portfolio_score": portfolio_score(file_count, project_count, rating) if (file_count or project_count) else 0
+            }
+        self.bulk_set("users", rated)
+        # Applications were written before the reviews, with the unrated copies
+        self.bulk_set("applications", {
+            user_id: {"freelancer_rating": fields["rating"], "freelancer_reviews": fields["total_reviews"]}
+            for user_id, fields in rated.items()
+        }, id_field="freelancer_id")
+        for user_id, fields in rated.items():
+            self.copied[user_id].update(rating=fields["rating"], total_reviews=fields["total_reviews"])
+
+    def bulk_set(self, collection: str, updates: dict, id_field: str = "id") -> None:
+        """Set fields on the documents whose ``id_field`` matches each key"""
+        ops = []
+        for doc_id, fields in updates.items():
+            ops.append(UpdateMany({id_field: doc_id}, {"$set": fields}))
+            if len(ops) >= self.batch_size:
+                self.db[collection].bulk_write(ops, ordered=False)
+                ops = []
+        if ops:
+            self.db[collection].bulk_write(ops, ordered=False)
+
+    def seed_conversations(self) -> None:
+        """Direct-message conversations; a few very chatty pairs, most with a handful of messages"""
+        conversations, messages = [], []
+        seen = set()
+
+        for _ in range(int(self.users * 0.4)):
+            client_id = self.rng.choice(self.clients)[0]
+            freelancer_id = self.rng.choice(self.freelancers)[0]
+            participants = sorted([client_id, freelancer_id])
+            conversation_id = f"dm_{participants[0]}_{participants[1]}"
+            if conversation_id in seen:
+                continue
+            seen.add(conversation_id)
+
+            sent_at = self.timestamp()
+            thread = []
+            for _ in range(1 + self.skewed(0.9, 2000)):
+                sender = self.rng.choice(participants)
+                receiver = participants[1] if sender == participants[0] else participants[0]
+                sent_at += timedelta(minutes=self.rng.randint(1, 720))
+                content = self.rng.choice(MESSAGE_SNIPPETS)
+                last = {
+                    "id": self.new_id(),
+                    "conversation_id": conversation_id,
+                    "sender_id": sender,
+                    **user_fields(self.copied[sender], MESSAGE_SENDER_FIELDS),
+                    "receiver_id": receiver,
+                    "participants": participants,
+                    "content": content,
+                    "search_keys": message_search_keys(participants, content),
+                    "message_type": "direct",
+                    "created_at": sent_at,
+                    "job_id": None
+                }
+                thread.append(last)
+            messages += thread
+
+            conversations.append({
+                "conversation_id": conversation_id,
+                "participants": participants,
+                "participant_info": {
+                    participant: user_fields(self.copied[participant], PARTICIPANT_FIELDS) for participant in participants
+                },
+                "last_message_id": last["id"],
+                "last_message_at": last["created_at"],
+                "last_message_content": last["content"][:100],
+                "updated_at": last["created_at"],
+                # Most participants are caught up; the rest stopped reading somewhere in the thread
+                "read_watermarks": {
+                    participant: thread[-1 if self.rng.random() < 0.8 else self.rng.randrange(len(thread))]["created_at"]
+                    for participant in participants
+                }
+            })
+
+            if len(messages) >= self.batch_size:
+                self.insert("messages", messages)
+                messages = []
+            if len(conversations) >= self.batch_size:
+                self.insert("conversations", conversations)
+                conversations = []
+
+        self.insert("messages", messages)
+        self.insert("conversations", conversations)
+
+    def seed_support_tickets(self) -> None:
+        def tickets():
+            for number in range(1, max(1, int(self.users * 0.02)) + 1):
+                created_at = self.timestamp()
+                status = self.rng.choices(["open", "in_progress", "resolved"], [3, 2, 5])[0]
+                replies = [{
+                    "message": "Thanks for reaching out, we are looking into this.",
+                    "replied_by": "seed-admin",
+                    "replied_at": created_at + timedelta(hours=self.rng.randint(1, 72))
+                } for _ in range(self.skewed(1.5, 10))]
+                ticket = {
+                    "id": self.new_id(),
+                    "ticket_number": f"{number:07d}",
+                    "name": self.name(),
+                    "email": f"support{number}@example.com",
+                    "message": "I cannot withdraw my balance, please assist.",
+                    "status": status,
+                    "created_at": created_at,
+                    "admin_replies": replies
+                }
+                if replies:
+                    ticket["last_reply_at"] = replies[-1]["replied_at"]
+                if status == "resolved":
+                    ticket["resolved_at"] = created_at + timedelta(days=self.rng.randint(1, 10))
+                    ticket["resolved_by"] = "seed-admin"
+                yield ticket
+        self.insert("support_tickets", tickets())
+
+    def run(self) -> Counter:
+        steps = [
+            ("users and portfolio items", self.seed_users),
+            ("wallets", self.seed_wallets),
+            ("jobs", self.seed_jobs),
+            ("applications, contracts and reviews", self.seed_applications_and_contracts),
+            ("conversations and messages", self.seed_conversations),
+            ("support tickets", self.seed_support_tickets)
+        ]
+        for label, step in steps:
+            started = time.perf_counter()
+            step()
+            print(f"   seeded {label} in {time.perf_counter() - started:.1f}s")
+        return self.counts
+
+
+# The production database server.py serves from by default (MONGO_DB_NAME); never dropped by the seeder
+APP_DB_NAME = "afrilance"
+
+SEEDED_COLLECTIONS = ["users", "portfolio_items", "wallets", "jobs", "applications", "contracts",
+                      "reviews", "messages", "conversations", "support_tickets"]
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Seed synthetic marketplace data for benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="10k", help="Number of users to create")
+    parser.add_argument("--users", type=int, help="Exact number of users (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--db-name", default="afrilance_bench")
+    parser.add_argument("--drop", action="store_true", help="Drop the seeded collections first")
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    db = client[args.db_name]
+
+    if args.drop:
+        if args.db_name == APP_DB_NAME:
+            parser.error(f"--drop would wipe the application's {APP_DB_NAME} database; pick a benchmark --db-name")
+        for collection in SEEDED_COLLECTIONS:
+            db[collection].drop()
+
+    users = args.users or SCALES[args.scale]
+    print(f"🌱 Seeding {users:,} users into {args.db_name} (seed {args.seed})")
+    counts = Seeder(db, users, seed=args.seed, batch_size=args.batch_size).run()
+    for collection, count in sorted(counts.items()):
+        print(f"✅ {collection}: {count:,}")
@@ -1,16 +1,20 @@
-from fastapi import FastAPI, HTTPException, Depends, status, File, UploadFile, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, status, File, UploadFile, Form, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Dict, Optional, List
+from contextlib import asynccontextmanager
 import os
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.read_preferences import SecondaryPreferred
 import bcrypt
 import jwt
 from datetime import datetime, timedelta
 import uuid
+import base64
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -20,40 +24,231 @@ import socket
 from postmarker.core import PostmarkClient
 from postmarker.exceptions import PostmarkerException
 import logging
+from storage import get_storage
+from portfolio_stats import refresh_portfolio_stats, refresh_portfolio_stats_many
+from response_cache import prefer_primary, response_cache
+from activity_log import ActivityLogWriter, ACTIVITY_EVENT_TYPES, ensure_activity_indexes
+from metrics import request_metrics, MongoCommandListener, install_metrics_middleware, counter_lines
+from nplusone import QueryShapeDetector, install_nplusone_middleware
+from logging_config import configure_logging, start_logging, stop_logging, install_correlation_middleware
+from email_transport import EmailQueue, SMTPTransport
+from rate_limit import RateLimit, RateLimiter, MongoBucketStore, client_ip, parse_networks
+from message_search import ensure_message_indexes, hidden_fields, message_participants, message_search_keys
+from message_store import get_message_store
+from denormalize import (
+    UserFanout, user_fields, fill_user_fields, ensure_copy_indexes, COPIED_USER_FIELDS, JOB_CLIENT_FIELDS,
+    APPLICATION_FREELANCER_FIELDS, CONTRACT_FREELANCER_FIELDS, CONTRACT_CLIENT_FIELDS, MESSAGE_SENDER_FIELDS,
+    PARTICIPANT_FIELDS
+)
+from recommendations import JobRecommender
+from typeahead import search_prefixes, prefix_keys, prefix_query, ensure_typeahead_indexes, start_prefix_backfill
+from locations import location_fields, location_filter, ensure_location_indexes
+from exports import EXPORT_FORMATS, export_chunks, export_columns, export_query, ensure_export_indexes
+from applicant_ranking import score_applicants, ranked_positions, APPLICANT_SCORE_FIELDS, APPLICANT_SCORE_COPIES
 
 # Load environment variables from .env file
 from dotenv import load_dotenv
 load_dotenv()
 
-# Create uploads directory structure
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-# Create subdirectories for different file types
-(UPLOAD_DIR / "id_documents").mkdir(exist_ok=True)
-(UPLOAD_DIR / "profile_pictures").mkdir(exist_ok=True)
-(UPLOAD_DIR / "portfolios").mkdir(exist_ok=True)
-(UPLOAD_DIR / "project_gallery").mkdir(exist_ok=True)
-(UPLOAD_DIR / "resumes").mkdir(exist_ok=True)
-
-app = FastAPI()
-
-# Mount static files for uploads
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# JSON logs written from a background thread (LOG_LEVEL / LOG_FORMAT)
+configure_logging()
+logger = logging.getLogger("afrilance")
+
+# Uploads directory (created by create_app for the local storage driver)
+UPLOAD_DIR = Path(os.environ.get('UPLOAD_DIR', 'uploads'))
+UPLOAD_SUBDIRECTORIES = ["id_documents", "profile_pictures", "portfolios", "project_gallery", "resumes"]
+
+# Object storage for uploaded media (local filesystem or S3-compatible bucket)
+storage = get_storage(UPLOAD_DIR)
+
+# Lifetime of presigned direct-to-storage upload URLs
+PRESIGNED_UPLOAD_EXPIRY_SECONDS = int(os.environ.get('PRESIGNED_UPLOAD_EXPIRY_SECONDS', '900'))
+
+# All API routes; the app itself is built by create_app()
+router = APIRouter()
+
+# Optional bearer token required to scrape /api/metrics
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Opt-in N+1 query detection for development, test and benchmark runs
+NPLUSONE_DETECTION = os.environ.get('NPLUSONE_DETECTION', 'false').lower() == 'true'
+NPLUSONE_REPORT = os.environ.get('NPLUSONE_REPORT', 'nplusone_report.json')
+nplusone_detector = QueryShapeDetector(threshold=int(os.environ.get('NPLUSONE_THRESHOLD', '5'))) if NPLUSONE_DETECTION else None
 
-# MongoDB connection
+# Server process settings (python server.py); WEB_CONCURRENCY is also read by every worker
+SERVER_HOST = os.environ.get('HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('PORT', '8001'))
+WEB_CONCURRENCY = max(1, int(os.environ.get('WEB_CONCURRENCY', '1')))
+GRACEFUL_SHUTDOWN_SECONDS = int(os.environ.get('GRACEFUL_SHUTDOWN_SECONDS', '30'))
+
+# MongoDB connection pool, sized per worker process so the total stays within MONGO_TOTAL_POOL_SIZE
 mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-client = MongoClient(mongo_url)
-db = client.afrilance
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'afrilance')
+MONGO_TOTAL_POOL_SIZE = int(os.environ.get('MONGO_TOTAL_POOL_SIZE', '100'))
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', str(max(10, MONGO_TOTAL_POOL_SIZE // WEB_CONCURRENCY))))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+
+# Read policy for heavy, staleness-tolerant read routes: "primary" or "secondary"
+# (secondaryPreferred bounded by SECONDARY_MAX_STALENESS_SECONDS). Routes not listed read from the primary.
+# To verify locally, run a single-host replica set (mongod --replSet rs0, then rs.initiate()) with
+# MONGO_URL=mongodb://localhost:27017/?replicaSet=rs0; /api/metrics then counts these reads under
+# afrilance_mongo_commands_total{read_preference="secondaryPreferred"}.
+ROUTE_READ_POLICIES = {
+    "public_freelancers": "secondary",
+    "featured_freelancers": "secondary",
+    "freelancer_public_profile": "secondary",
+    "featured_portfolios": "secondary",
+    "portfolio_showcase": "secondary",
+    "portfolio_analytics": "secondary",
+    "category_counts": "secondary",
+    "search_portfolios": "secondary",
+    "search_jobs": "secondary",
+    "search_users": "secondary",
+    "search_transactions": "primary",  # users expect their latest payment to show up
+    "revenue_analytics": "secondary",
+    "admin_stats": "secondary",
+    "admin_export": "secondary"
+}
+# Overrides such as READ_POLICY_OVERRIDES="admin_stats=primary,search_jobs=primary"
+for override in filter(None, os.environ.get('READ_POLICY_OVERRIDES', '').split(',')):
+    route_name, _, policy = override.partition('=')
+    if policy.strip() not in ("primary", "secondary"):
+        raise RuntimeError(f"Invalid read policy for {route_name}: {policy}")
+    ROUTE_READ_POLICIES[route_name.strip()] = policy.strip()
+# MongoDB requires at least 90 seconds
+SECONDARY_MAX_STALENESS_SECONDS = max(90, int(os.environ.get('SECONDARY_MAX_STALENESS_SECONDS', '120')))
+
+# Token-bucket budgets per identity (user id, else client IP) for bcrypt, regex-scan and email sending routes.
+# RATE_LIMIT_BACKEND=mongo shares the buckets between workers; "memory" limits each worker separately.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()
+RATE_LIMITS = {
+    "login": RateLimit.per_minute(10),
+    "admin_login": RateLimit.per_minute(5),
+    "register": RateLimit.per_hour(10, burst=5),
+    "admin_register_request": RateLimit.per_hour(5, burst=2),
+    "search_jobs": RateLimit.per_minute(30, burst=10),
+    "search_users": RateLimit.per_minute(30, burst=10),
+    "search_transactions": RateLimit.per_minute(30, burst=10),
+    "search_portfolios": RateLimit.per_minute(30, burst=10),
+    "support": RateLimit.per_hour(10, burst=3),
+    "admin_export": RateLimit.per_minute(10, burst=3)
+}
+rate_limiter = RateLimiter(RATE_LIMITS, enabled=RATE_LIMIT_ENABLED)
+# Proxies whose X-Forwarded-For is believed when keying by client IP; the default covers loopback and
+# private networks, where the ingress lives. Set TRUSTED_PROXIES="" when the app is reached directly.
+TRUSTED_PROXIES = parse_networks(
+    os.environ.get('TRUSTED_PROXIES', '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7')
+)
+
+# Opened and closed by the application lifespan, one client per worker process
+client: Optional[MongoClient] = None
+db = None
+secondary_db = None
+message_store = None
+mongo_server_version: Optional[tuple] = None
+
+# Admin activity feed events are buffered and written by a background thread
+activity_log = ActivityLogWriter()
+
+# Copies of user names, roles, pictures and profiles are rewritten in the background after a change
+user_fanout = UserFanout(batch_size=int(os.environ.get('USER_FANOUT_BATCH_SIZE', '500')))
+
+# In-memory TF-IDF index of open jobs for freelancer recommendations, synced from the database in the background
+job_recommender = JobRecommender(
+    sync_interval=float(os.environ.get('RECOMMENDER_SYNC_SECONDS', '30')),
+    rebuild_interval=float(os.environ.get('RECOMMENDER_REBUILD_SECONDS', '900'))
+)
+
+def display_user(user_id: str) -> Optional[dict]:
+    """The user fields that referencing documents copy at write time"""
+    return db.users.find_one({"id": user_id}, {"_id": 0, **{field: 1 for field in COPIED_USER_FIELDS}})
+
+def open_database():
+    """Connect this worker's MongoDB client"""
+    global client, db, secondary_db, message_store
+    mongo_listeners = [MongoCommandListener(request_metrics)]
+    if nplusone_detector:
+        mongo_listeners.append(nplusone_detector)
+    client = MongoClient(
+        mongo_url,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        event_listeners=mongo_listeners
+    )
+    db = client[MONGO_DB_NAME]
+    secondary_db = client.get_database(
+        MONGO_DB_NAME, read_preference=SecondaryPreferred(max_staleness=SECONDARY_MAX_STALENESS_SECONDS)
+    )
+    # Per-message documents or conversation buckets (MESSAGE_STORAGE)
+    message_store = get_message_store(db)
+
+def read_db(route_name: str):
+    """Database handle honouring the route's read policy"""
+    # Cache recomputes right after a write read the primary so a lagging secondary isn't cached again
+    if prefer_primary.get():
+        return db
+    return secondary_db if ROUTE_READ_POLICIES.get(route_name) == "secondary" else db
+
+def mongo_supports(version: tuple) -> bool:
+    """Whether the connected MongoDB server is at least ``version``, e.g. (5, 2)"""
+    global mongo_server_version
+    if mongo_server_version is None:
+        mongo_server_version = tuple(client.server_info()["versionArray"][:2])
+    return mongo_server_version >= version
+
+def close_database():
+    global client, mongo_server_version
+    mongo_server_version = None
+    if client is not None:
+        client.close()
+        client = None
+
+def ensure_indexes():
+    """Create the indexes the query paths rely on (idempotent)"""
+    # Users are looked up by id on nearly every request, and by the copy fan-out and bulk moderation
+    db.users.create_index("id", unique=True)
+    
+    # Portfolio files and project gallery items, one document per item
+    db.portfolio_items.create_index("id", unique=True)
+    db.portfolio_items.create_index([("owner_id", 1), ("kind", 1), ("created_at", -1)])
+    db.portfolio_items.create_index([("owner_id", 1), ("created_at", -1)])
+    
+    # Featured portfolios: index-ordered top-N on the materialized score
+    db.users.create_index([("is_verified", 1), ("portfolio_score", -1)])
+    
+    # Jobs by id: job pages, applications and the recommender's candidate lookups
+    db.jobs.create_index("id", unique=True)
+    
+    # Open jobs feed: keyset pagination over (created_at, id), optionally within a category
+    db.jobs.create_index([("status", 1), ("created_at", -1), ("id", -1)])
+    db.jobs.create_index([("status", 1), ("category", 1), ("created_at", -1), ("id", -1)])
+    
+    # Region and radius filters on users and jobs
+    ensure_location_indexes(db)
+    
+    # Admin exports, oldest first with date, role and status filters
+    ensure_export_indexes(db)
+    
+    # Messaging typeahead; the conversations and contracts that make users contacts use the copy indexes below
+    ensure_typeahead_indexes(db)
+    
+    # Applications per job, newest first (listing and ranking)
+    db.applications.create_index([("job_id", 1), ("created_at", -1)])
+    
+    # Admin activity feed
+    ensure_activity_indexes(db)
+    
+    # Each user's jobs, applications, contracts, messages and conversations, for the copy fan-out,
+    # the contracts and conversations lists and the typeahead contacts
+    ensure_copy_indexes(db)
+    
+    # Finalized direct uploads, kept until their upload tokens can no longer be replayed
+    db.finalized_uploads.create_index("finalized_at", expireAfterSeconds=PRESIGNED_UPLOAD_EXPIRY_SECONDS + 3600)
+    
+    # Message history and full-text message search
+    ensure_message_indexes(db)
+    message_store.ensure_indexes()
 
 # JWT settings
 JWT_SECRET = os.environ.get('JWT_SECRET', 'afrilance_fallback_secret_key_2025_change_in_production')
@@ -66,6 +261,49 @@ EMAIL_PORT = 465
 EMAIL_USER = "sam@afrilance.co.za"
 EMAIL_PASS = os.environ.get('EMAIL_PASSWORD', '')
 
+# One authenticated SMTP session per worker, closed by the lifespan
+email_transport = SMTPTransport(EMAIL_HOST, EMAIL_PORT, EMAIL_USER, EMAIL_PASS)
+
+# Bulk moderation is limited to this many users per request
+BULK_MODERATION_MAX_USERS = int(os.environ.get('BULK_MODERATION_MAX_USERS', '500'))
+
+# Public marketplace response cache: route -> (ttl seconds, stale-while-revalidate seconds)
+PUBLIC_CACHE_TTLS = {
+    "featured_freelancers": (60, 300),
+    "featured_portfolios": (60, 300),
+    "portfolio_showcase": (30, 120),
+    "freelancer_public_profile": (30, 120),
+    "category_counts": (120, 600)
+}
+# Responses held per cached route, and how often each worker applies the other workers' invalidations
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+RESPONSE_CACHE_SYNC_SECONDS = float(os.environ.get('RESPONSE_CACHE_SYNC_SECONDS', '1'))
+
+# Open jobs feed: page size bounds and the lifetime of the cached first page per category.
+# create_job and job status changes invalidate it; other workers pick that up within RESPONSE_CACHE_SYNC_SECONDS.
+JOBS_PAGE_SIZE = 20
+JOBS_MAX_PAGE_SIZE = 100
+JOBS_FIRST_PAGE_TTL = int(os.environ.get('JOBS_FIRST_PAGE_TTL', '15'))
+
+# Job search facets: lifetime of cached counts per filter set, budget bucket boundaries and posted-within windows
+JOB_SEARCH_FACETS_TTL = int(os.environ.get('JOB_SEARCH_FACETS_TTL', '30'))
+JOB_BUDGET_BUCKETS = [0, 1000, 5000, 10000, 50000, float("inf")]
+JOB_POSTED_WITHIN_DAYS = [1, 7, 30]
+
+# Messaging user typeahead: results per keystroke, how many recent conversations/contracts count as contacts,
+# and how long a user's contact set is reused across keystrokes (new conversations and contracts invalidate it)
+TYPEAHEAD_LIMIT = 20
+TYPEAHEAD_CONTACTS_SCAN = 200
+TYPEAHEAD_CONTACTS_TTL = int(os.environ.get('TYPEAHEAD_CONTACTS_TTL', '300'))
+
+# Ranked applications per page
+APPLICATIONS_PAGE_SIZE = 20
+APPLICATIONS_MAX_PAGE_SIZE = 100
+
+# Recommended jobs per request
+RECOMMENDATIONS_LIMIT = 10
+RECOMMENDATIONS_MAX_LIMIT = 50
+
 # Postmark Configuration (disabled - using SMTP)
 POSTMARK_SERVER_TOKEN = os.environ.get('POSTMARK_SERVER_TOKEN', '')
 POSTMARK_SENDER_EMAIL = os.environ.get('POSTMARK_SENDER_EMAIL', 'sam@afrilance.co.za')
@@ -91,12 +329,24 @@ class VerificationRequest(BaseModel):
     user_id: str
     verification_status: bool
 
+class BulkVerificationRequest(BaseModel):
+    user_ids: List[str]
+    status: str  # approved, rejected
+    reason: Optional[str] = ""
+    admin_notes: Optional[str] = ""
+
+class BulkSuspensionRequest(BaseModel):
+    user_ids: List[str]
+    suspend: bool = True
+    reason: Optional[str] = ""
+
 class FreelancerProfile(BaseModel):
     skills: List[str]
     experience: str
     hourly_rate: float
     bio: str
     portfolio_links: List[str] = []
+    location: Optional[str] = None
 
 class JobCreate(BaseModel):
     title: str
@@ -105,6 +355,7 @@ class JobCreate(BaseModel):
     budget: float
     budget_type: str  # fixed, hourly
     requirements: List[str]
+    location: Optional[str] = None
 
 class JobApplication(BaseModel):
     job_id: str
@@ -153,6 +404,19 @@ class ProjectGalleryItem(BaseModel):
     technologies: List[str] = []
     project_url: Optional[str] = None
 
+class UploadPresignRequest(BaseModel):
+    upload_type: str  # id_document, profile_picture, resume, portfolio, project_gallery
+    filename: str
+    content_type: str
+
+class UploadFinalize(BaseModel):
+    upload_token: str
+    # Project gallery metadata (ignored for other upload types)
+    title: Optional[str] = None
+    description: Optional[str] = None
+    technologies: List[str] = []
+    project_url: Optional[str] = None
+
 class ContractCreate(BaseModel):
     job_id: str
     freelancer_id: str
@@ -200,6 +464,11 @@ class AdvancedJobSearch(BaseModel):
     budget_type: Optional[str] = "all"  # fixed, hourly, all
     skills: Optional[List[str]] = []
     location: Optional[str] = ""
+    province: Optional[str] = None  # GP, WC, KZN, ...
+    city: Optional[str] = None  # johannesburg, cape-town, ...
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
     posted_within_days: Optional[int] = None
     sort_by: Optional[str] = "created_at"  # created_at, budget, title
     sort_order: Optional[str] = "desc"  # asc, desc
@@ -212,6 +481,11 @@ class AdvancedUserSearch(BaseModel):
     max_hourly_rate: Optional[float] = None
     min_hourly_rate: Optional[float] = None
     location: Optional[str] = ""
+    province: Optional[str] = None
+    city: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    radius_km: Optional[float] = None
     is_verified: Optional[bool] = None
     availability: Optional[str] = "all"
     sort_by: Optional[str] = "rating"  # rating, hourly_rate, created_at
@@ -251,23 +525,42 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+def rate_limit_identity(request: Request) -> str:
+    """Rate limit key: the authenticated user, falling back to the client IP"""
+    authorization = request.headers.get("authorization", "")
+    if authorization.startswith("Bearer "):
+        try:
+            return "user:" + jwt.decode(authorization[7:], JWT_SECRET, algorithms=[JWT_ALGORITHM])["user_id"]
+        except (jwt.InvalidTokenError, KeyError):
+            pass
+    return "ip:" + client_ip(request, TRUSTED_PROXIES)
+
+def rate_limited(route_name: str):
+    """Route dependency enforcing the RATE_LIMITS budget for route_name"""
+    return Depends(rate_limiter.dependency(route_name, rate_limit_identity))
+
+def invalidate_freelancer_caches(*freelancer_ids: str) -> None:
+    """Drop cached public marketplace responses that include these freelancers"""
+    response_cache.invalidate("featured_freelancers")
+    response_cache.invalidate("featured_portfolios")
+    response_cache.invalidate("category_counts")
+    for route in ("portfolio_showcase", "freelancer_public_profile"):
+        if len(freelancer_ids) == 1:
+            response_cache.invalidate(route, {"freelancer_id": freelancer_ids[0]})
+        elif freelancer_ids:
+            # One invalidation for the whole route rather than one per freelancer for bulk changes
+            response_cache.invalidate(route)
+
 def send_email(to_email: str, subject: str, body: str) -> bool:
     """Send email using direct SMTP"""
-    logger = logging.getLogger(__name__)
-    
     try:
         # Check if we have email configuration
         if not EMAIL_PASS:
-            print("❌ CRITICAL: EMAIL_PASSWORD not configured!")
             logger.error("EMAIL_PASSWORD not configured")
             return False
         
         # Create SMTP connection
-        print(f"📧 Attempting to send email via SMTP...")
-        print(f"   Host: {EMAIL_HOST}:{EMAIL_PORT}")
-        print(f"   From: {EMAIL_USER}")
-        print(f"   To: {to_email}")
-        print(f"   Subject: {subject}")
+        logger.debug("Sending email via SMTP", extra={"smtp_host": f"{EMAIL_HOST}:{EMAIL_PORT}", "to": to_email, "subject": subject})
         
         # Create message
         msg = MIMEMultipart('alternative')
@@ -279,36 +572,26 @@ def send_email(to_email: str, subject: str, body: str) -> bool:
         html_part = MIMEText(body, 'html')
         msg.attach(html_part)
         
-        # Connect and send
-        server = smtplib.SMTP_SSL(EMAIL_HOST, EMAIL_PORT)
-        server.login(EMAIL_USER, EMAIL_PASS)
-        server.send_message(msg)
-        server.quit()
-        
-        print(f"✅ Email sent successfully via SMTP")
-        print(f"   Message delivered to: {to_email}")
+        # Send over the worker's pooled SMTP session
+        email_transport.send(msg)
         
-        logger.info(f"SMTP email sent successfully to {to_email}")
+        logger.info("SMTP email sent", extra={"to": to_email, "subject": subject})
         return True
         
     except smtplib.SMTPAuthenticationError as e:
-        print(f"❌ SMTP Authentication failed: {e}")
-        logger.error(f"SMTP Authentication error: {e}")
+        logger.error("SMTP Authentication error: %s", e, extra={"to": to_email})
         return False
         
     except smtplib.SMTPConnectError as e:
-        print(f"❌ SMTP Connection failed: {e}")
-        logger.error(f"SMTP Connection error: {e}")
+        logger.error("SMTP Connection error: %s", e, extra={"to": to_email})
         return False
         
     except smtplib.SMTPException as e:
-        print(f"❌ SMTP Error: {e}")
-        logger.error(f"SMTP error: {e}")
+        logger.error("SMTP error: %s", e, extra={"to": to_email})
         return False
         
     except Exception as e:
-        print(f"❌ Unexpected email error: {e}")
-        logger.error(f"Unexpected email error: {e}")
+        logger.error("Unexpected email error: %s", e, extra={"to": to_email})
         return False
 
 def send_email_smtp_fallback(to_email: str, subject: str, body: str) -> bool:
@@ -322,15 +605,10 @@ def send_email_smtp_fallback(to_email: str, subject: str, body: str) -> bool:
         
         if result != 0:
             # Connection failed, log for debugging but continue with mock mode
-            print(f"SMTP connection to {EMAIL_HOST}:{EMAIL_PORT} failed (code: {result})")
-            print(f"MOCK EMAIL SENT TO: {to_email}")
-            print(f"SUBJECT: {subject}")
-            print(f"BODY LENGTH: {len(body)} characters")
-            print("EMAIL CONTENT PREVIEW:")
-            print("="*50)
-            print(body[:500] + "..." if len(body) > 500 else body)
-            print("="*50)
-            print("✅ Email logged successfully (mock mode due to network restrictions)")
+            logger.warning("SMTP connection to %s:%s failed (code: %s), email logged in mock mode",
+                           EMAIL_HOST, EMAIL_PORT, result, extra={"to": to_email, "subject": subject, "body_length": len(body)})
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Mock email preview", extra={"to": to_email, "body_preview": body[:500]})
             return True
         
         # If connection test passes, try to send real email
@@ -346,31 +624,91 @@ def send_email_smtp_fallback(to_email: str, subject: str, body: str) -> bool:
         text = msg.as_string()
         server.sendmail(EMAIL_USER, to_email, text)
         server.quit()
-        print(f"✅ Real SMTP email sent successfully to {to_email}")
+        logger.info("SMTP email sent", extra={"to": to_email, "subject": subject})
         return True
         
     except Exception as e:
-        print(f"SMTP sending failed: {e}")
         # Fallback to mock mode
-        print(f"FALLBACK: MOCK EMAIL SENT TO: {to_email}")
-        print(f"SUBJECT: {subject}")
-        print(f"BODY LENGTH: {len(body)} characters")
-        print("EMAIL CONTENT PREVIEW:")
-        print("="*50)
-        print(body[:500] + "..." if len(body) > 500 else body)
-        print("="*50)
-        print("✅ Email logged successfully (fallback mock mode)")
+        logger.warning("SMTP sending failed: %s, email logged in mock mode", e,
+                       extra={"to": to_email, "subject": subject, "body_length": len(body)})
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Mock email preview", extra={"to": to_email, "body_preview": body[:500]})
         return True
 
+# Emails that shouldn't hold up the request (bulk moderation) are sent from a background thread
+email_queue = EmailQueue(send_email)
+
+# Upload rules per upload type, shared by multipart uploads and presigned direct uploads
+UPLOAD_POLICIES = {
+    "id_document": {
+        "subdirectory": "id_documents",
+        "allowed_types": ["image/jpeg", "image/png", "image/jpg", "application/pdf"],
+        "max_size_mb": 5,
+        "roles": ["freelancer"],
+        "role_error": "Only freelancers can upload ID documents"
+    },
+    "profile_picture": {
+        "subdirectory": "profile_pictures",
+        "allowed_types": ["image/jpeg", "image/png", "image/jpg", "image/webp"],
+        "max_size_mb": 2,  # Smaller size for profile pictures
+        "roles": None,  # Any user
+        "role_error": None
+    },
+    "resume": {
+        "subdirectory": "resumes",
+        "allowed_types": ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"],
+        "max_size_mb": 10,  # Larger size for documents
+        "roles": ["freelancer"],
+        "role_error": "Only freelancers can upload resumes"
+    },
+    "portfolio": {
+        "subdirectory": "portfolios",
+        "allowed_types": [
+            "image/jpeg", "image/png", "image/jpg", "image/webp", "image/gif",
+            "application/pdf", 
+            "video/mp4", "video/mpeg", "video/quicktime",
+            "application/zip", "application/x-zip-compressed"
+        ],
+        "max_size_mb": 50,  # Larger size for portfolio files
+        "roles": ["freelancer"],
+        "role_error": "Only freelancers can upload portfolio files"
+    },
+    "project_gallery": {
+        "subdirectory": "project_gallery",
+        "allowed_types": [
+            "image/jpeg", "image/png", "image/jpg", "image/webp", "image/gif",
+            "video/mp4", "video/mpeg", "video/quicktime"
+        ],
+        "max_size_mb": 25,  # Medium size for project media
+        "roles": ["freelancer"],
+        "role_error": "Only freelancers can upload project gallery items"
+    }
+}
+
+def get_upload_policy(upload_type: str, current_user: dict) -> dict:
+    """Look up the upload policy and check the caller's role against it"""
+    policy = UPLOAD_POLICIES.get(upload_type)
+    if not policy:
+        raise HTTPException(status_code=400, detail=f"Invalid upload type. Allowed types: {', '.join(UPLOAD_POLICIES)}")
+    
+    if policy["roles"] and current_user["role"] not in policy["roles"]:
+        raise HTTPException(status_code=403, detail=policy["role_error"])
+    
+    return policy
+
 def validate_file_upload(file: UploadFile, allowed_types: List[str], max_size_mb: int = 5) -> None:
     """Validate uploaded file type and size"""
-    if file.content_type not in allowed_types:
+    validate_content_type(file.content_type, allowed_types)
+    
+    # Note: We'll check size when reading the file content
+
+def validate_content_type(content_type: str, allowed_types: List[str]) -> None:
+    """Reject content types that are not allowed for an upload"""
+    if content_type not in allowed_types:
         raise HTTPException(
             status_code=400, 
             detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}"
         )
-    
-    # Note: We'll check size when reading the file content
 
 def generate_unique_filename(user_id: str, file_type: str, original_filename: str) -> str:
     """Generate unique filename for uploaded file"""
@@ -379,6 +717,27 @@ def generate_unique_filename(user_id: str, file_type: str, original_filename: st
     unique_id = uuid.uuid4().hex[:8]
     return f"{user_id}_{file_type}_{timestamp}_{unique_id}.{file_extension}"
 
+def build_file_info(key: str, original_name: str, content_type: str, file_size: int) -> dict:
+    """Build the file_info document recorded for a stored upload"""
+    return {
+        "filename": key.rsplit("/", 1)[-1],
+        "original_name": original_name,
+        "file_path": storage.location(key),
+        "storage_key": key,
+        "file_url": storage.url_for(key),
+        "content_type": content_type,
+        "file_size": file_size,
+        "uploaded_at": datetime.utcnow()
+    }
+
+def delete_stored_file(file_info: dict, subdirectory: str) -> None:
+    """Delete the stored object behind a file_info, logging instead of failing"""
+    key = file_info.get("storage_key") or f"{subdirectory}/{file_info['filename']}"
+    try:
+        storage.delete(key)
+    except Exception as e:
+        logger.warning("Could not delete stored file %s: %s", key, e)
+
 async def save_uploaded_file(
     file: UploadFile, 
     user_id: str, 
@@ -401,29 +760,48 @@ async def save_uploaded_file(
             detail=f"File too large. Maximum size is {max_size_mb}MB"
         )
     
-    # Generate unique filename and path
+    # Generate unique filename and storage key
     unique_filename = generate_unique_filename(user_id, file_type, file.filename)
-    file_path = UPLOAD_DIR / subdirectory / unique_filename
+    key = f"{subdirectory}/{unique_filename}"
     
     # Save file
-    with open(file_path, "wb") as buffer:
-        buffer.write(file_content)
+    storage.save(key, file_content, file.content_type)
     
-    return {
-        "filename": unique_filename,
-        "original_name": file.filename,
-        "file_path": str(file_path),
-        "content_type": file.content_type,
-        "file_size": len(file_content),
-        "uploaded_at": datetime.utcnow()
+    return build_file_info(key, file.filename, file.content_type, len(file_content))
+
+def create_upload_token(user_id: str, upload_type: str, key: str, original_name: str, content_type: str) -> str:
+    """Sign the details of a pending direct upload so finalize can trust them"""
+    payload = {
+        "purpose": "upload",
+        "user_id": user_id,
+        "upload_type": upload_type,
+        "key": key,
+        "original_name": original_name,
+        "content_type": content_type,
+        "exp": datetime.utcnow() + timedelta(seconds=PRESIGNED_UPLOAD_EXPIRY_SECONDS)
     }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+def decode_upload_token(upload_token: str) -> dict:
+    """Decode an upload token issued by create_upload_token"""
+    try:
+        payload = jwt.decode(upload_token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=400, detail="Upload token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=400, detail="Invalid upload token")
+    
+    if payload.get("purpose") != "upload":
+        raise HTTPException(status_code=400, detail="Invalid upload token")
+    
+    return payload
 
 # API Routes
-@app.get("/api/health")
+@router.get("/api/health")
 async def health_check():
     return {"status": "healthy", "service": "Afrilance API"}
 
-@app.post("/api/register")
+@router.post("/api/register", dependencies=[rate_limited("register")])
 async def register_user(user: UserRegister):
     # Check if user exists
     existing = db.users.find_one({"email": user.email})
@@ -441,6 +819,7 @@ async def register_user(user: UserRegister):
         "password": hash_password(user.password),
         "role": user.role,
         "full_name": user.full_name,
+        "search_prefixes": search_prefixes(user.full_name, user.email),
         "phone": user.phone,
         "is_verified": False,  # Always start as unverified
         "id_document": None,   # Will be uploaded later for freelancers
@@ -474,6 +853,11 @@ async def register_user(user: UserRegister):
         }
         db.wallets.insert_one(wallet_data)
     
+    activity_log.emit(
+        "user_registration", f"New {user_data['role']} registered: {user_data['full_name']}",
+        actor_id=user_data["id"], user_id=user_data["id"]
+    )
+    
     token = create_token(user_data["id"], user_data["role"])
     
     return {
@@ -491,7 +875,7 @@ async def register_user(user: UserRegister):
         }
     }
 
-@app.post("/api/login")
+@router.post("/api/login", dependencies=[rate_limited("login")])
 async def login_user(user: UserLogin):
     db_user = db.users.find_one({"email": user.email})
     if not db_user or not verify_password(user.password, db_user["password"]):
@@ -520,7 +904,7 @@ async def login_user(user: UserLogin):
         }
     }
 
-@app.get("/api/profile")
+@router.get("/api/profile")
 async def get_profile(current_user = Depends(verify_token)):
     user = db.users.find_one({"id": current_user["user_id"]})
     if not user:
@@ -541,7 +925,7 @@ async def get_profile(current_user = Depends(verify_token)):
         "id_document": user.get("id_document")
     }
 
-@app.put("/api/profile")
+@router.put("/api/profile")
 async def update_profile(profile: UserProfile, current_user = Depends(verify_token)):
     # Update basic profile information
     db.users.update_one(
@@ -550,15 +934,18 @@ async def update_profile(profile: UserProfile, current_user = Depends(verify_tok
             "$set": {
                 "full_name": profile.full_name,
                 "phone": profile.phone,
-                "email": profile.email
+                "email": profile.email,
+                "search_prefixes": search_prefixes(profile.full_name, profile.email)
             }
         }
     )
+    invalidate_freelancer_caches(current_user["user_id"])
+    user_fanout.submit(current_user["user_id"])
     
     return {"message": "Profile updated successfully"}
 
 # Admin-only endpoint for user verification
-@app.post("/api/admin/verify-user")
+@router.post("/api/admin/verify-user")
 async def verify_user(verification: VerificationRequest, current_user = Depends(verify_token)):
     # Check if current user is admin
     if current_user["role"] != "admin":
@@ -581,9 +968,21 @@ async def verify_user(verification: VerificationRequest, current_user = Depends(
         {"$set": update_data}
     )
     
+    # Verification decides whether the freelancer can be featured
+    refresh_portfolio_stats(db, verification.user_id)
+    invalidate_freelancer_caches(verification.user_id)
+    user_fanout.submit(verification.user_id)
+    
+    if user:
+        activity_log.emit(
+            "user_verification",
+            f"{user['full_name']} {'verified' if verification.verification_status else 'unverified'} by admin",
+            actor_id=current_user["user_id"], user_id=verification.user_id
+        )
+    
     return {"message": "User verification status updated"}
 
-@app.get("/api/admin/users")
+@router.get("/api/admin/users")
 async def get_all_users(current_user = Depends(verify_token)):
     # Check if current user is admin
     if current_user["role"] != "admin":
@@ -597,58 +996,154 @@ async def get_all_users(current_user = Depends(verify_token)):
     
     return users
 
-@app.put("/api/freelancer/profile")
+@router.get("/api/admin/export/{dataset}", dependencies=[rate_limited("admin_export")])
+async def export_admin_data(
+    dataset: str,
+    format: str = "csv",
+    columns: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    role: Optional[str] = None,
+    status: Optional[str] = None,
+    current_user = Depends(verify_token)
+):
+    """Stream users, contracts or ledger entries as CSV or NDJSON"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    try:
+        export_fields = export_columns(dataset, columns)
+        query = export_query(dataset, date_from, date_to, role, status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    activity_log.emit(
+        "data_export", f"{dataset.title()} exported as {format.upper()} by admin",
+        actor_id=current_user["user_id"]
+    )
+    
+    # Rows are read from the cursor and encoded as the client downloads them
+    filename = f"afrilance-{dataset}-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{format}"
+    return StreamingResponse(
+        export_chunks(read_db("admin_export"), dataset, format, query, export_fields),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.put("/api/freelancer/profile")
 async def update_freelancer_profile(profile: FreelancerProfile, current_user = Depends(verify_token)):
     if current_user["role"] != "freelancer":
         raise HTTPException(status_code=403, detail="Only freelancers can update this profile")
     
-    db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$set": {
-                "profile": profile.dict(),
-                "profile_completed": True
-            }
-        }
-    )
+    # Structured region and coordinates for location-filtered searches
+    location = location_fields(profile.location)
+    update = {"$set": {"profile": profile.dict(), "profile_completed": True, **location}}
+    if "geo" not in location:
+        update["$unset"] = {"geo": ""}
+    db.users.update_one({"id": current_user["user_id"]}, update)
+    invalidate_freelancer_caches(current_user["user_id"])
+    user_fanout.submit(current_user["user_id"])
     
     return {"message": "Profile updated successfully"}
 
-@app.post("/api/jobs")
+@router.post("/api/jobs")
 async def create_job(job: JobCreate, current_user = Depends(verify_token)):
     if current_user["role"] != "client":
         raise HTTPException(status_code=403, detail="Only clients can create jobs")
     
+    client = display_user(current_user["user_id"])
+    
     job_data = {
         "id": str(uuid.uuid4()),
         "client_id": current_user["user_id"],
+        # Copied at write time so the jobs feed never looks up clients
+        **user_fields(client, JOB_CLIENT_FIELDS),
         "status": "open",
         "created_at": datetime.utcnow(),
         "applications_count": 0,
-        **job.dict()
+        **job.dict(),
+        **location_fields(job.location)
     }
     
     db.jobs.insert_one(job_data)
+    invalidate_job_feed(job_data["category"])
+    job_recommender.add_job(job_data)
+    
+    activity_log.emit(
+        "job_posted", f"New job posted: {job_data['title']} by {client['full_name'] if client else 'Unknown'}",
+        actor_id=current_user["user_id"], job_id=job_data["id"]
+    )
+    
     return {"message": "Job created successfully", "job_id": job_data["id"]}
 
-@app.get("/api/jobs")
-async def get_jobs(category: Optional[str] = None, current_user = Depends(verify_token)):
+def encode_jobs_cursor(job: dict) -> str:
+    return base64.urlsafe_b64encode(f"{job['created_at'].isoformat()}|{job['id']}".encode()).decode()
+
+def decode_jobs_cursor(cursor: str) -> tuple:
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(created_at), job_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def invalidate_job_feed(category: Optional[str] = None) -> None:
+    """Drop the cached first page of the open jobs feed for a category and for all categories"""
+    response_cache.invalidate("open_jobs", {"category": None})
+    if category:
+        response_cache.invalidate("open_jobs", {"category": category})
+    response_cache.invalidate("job_search_facets")
+
+def fetch_open_jobs(category: Optional[str], cursor: Optional[str], limit: int) -> tuple:
+    """One page of open jobs, newest first, and the cursor of the next page (None on the last page)"""
     query = {"status": "open"}
     if category:
         query["category"] = category
-        
-    jobs = list(db.jobs.find(query).sort("created_at", -1))
+    if cursor:
+        created_at, job_id = decode_jobs_cursor(cursor)
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "id": {"$lt": job_id}}
+        ]
+    
+    jobs = list(db.jobs.find(query).sort([("created_at", -1), ("id", -1)]).limit(limit + 1))
+    next_cursor = encode_jobs_cursor(jobs[limit - 1]) if len(jobs) > limit else None
+    jobs = jobs[:limit]
+    
+    # Jobs posted before client details were stored on them
+    fill_user_fields(db, jobs, "client_id", JOB_CLIENT_FIELDS)
     
-    # Get client info for each job
     for job in jobs:
-        client = db.users.find_one({"id": job["client_id"]})
-        if client:
-            job["client_name"] = client["full_name"]
         job["_id"] = str(job["_id"])  # Convert ObjectId to string
     
+    return jobs, next_cursor
+
+@router.get("/api/jobs")
+async def get_jobs(
+    response: Response,
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = JOBS_PAGE_SIZE,
+    current_user = Depends(verify_token)
+):
+    """Open jobs, newest first; pass the X-Next-Cursor response header back as cursor for the next page"""
+    limit = min(max(limit, 1), JOBS_MAX_PAGE_SIZE)
+    
+    if cursor:
+        jobs, next_cursor = fetch_open_jobs(category, cursor, limit)
+    else:
+        async def first_page():
+            return fetch_open_jobs(category, None, limit)
+        jobs, next_cursor = await response_cache.get_or_compute(
+            "open_jobs", {"category": category, "limit": limit}, first_page, JOBS_FIRST_PAGE_TTL
+        )
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return jobs
 
-@app.get("/api/jobs/my")
+@router.get("/api/jobs/my")
 async def get_my_jobs(current_user = Depends(verify_token)):
     if current_user["role"] == "client":
         jobs = list(db.jobs.find({"client_id": current_user["user_id"]}).sort("created_at", -1))
@@ -665,7 +1160,41 @@ async def get_my_jobs(current_user = Depends(verify_token)):
         
     return jobs
 
-@app.post("/api/jobs/{job_id}/apply")
+@router.get("/api/jobs/recommended")
+async def get_recommended_jobs(limit: int = RECOMMENDATIONS_LIMIT, current_user = Depends(verify_token)):
+    """Open jobs ranked against the freelancer's skills, category and hourly rate, best match first"""
+    if current_user["role"] != "freelancer":
+        raise HTTPException(status_code=403, detail="Only freelancers can get job recommendations")
+    limit = min(max(limit, 1), RECOMMENDATIONS_MAX_LIMIT)
+    
+    user = db.users.find_one({"id": current_user["user_id"]}, {"_id": 0, "profile": 1, "portfolio_categories": 1})
+    profile = (user or {}).get("profile") or {}
+    category = profile.get("category") or ((user or {}).get("portfolio_categories") or {}).get("primary")
+    applied = [application["job_id"] for application in db.applications.find(
+        {"freelancer_id": current_user["user_id"]}, {"_id": 0, "job_id": 1}
+    )]
+    
+    # Ask for extra matches in case jobs were closed through another worker since its last sync
+    matches = job_recommender.recommend(
+        profile.get("skills", []), category, profile.get("hourly_rate"), limit=limit * 2, exclude=applied
+    )
+    jobs = {job["id"]: job for job in db.jobs.find(
+        {"id": {"$in": [job_id for job_id, _ in matches]}, "status": "open"}, {"_id": 0}
+    )}
+    
+    recommended = []
+    for job_id, score in matches:
+        if job_id not in jobs:
+            job_recommender.remove_job(job_id)
+        elif len(recommended) < limit:
+            recommended.append({**jobs[job_id], "match_score": score})
+    
+    # Jobs posted before client details were stored on them
+    fill_user_fields(db, recommended, "client_id", JOB_CLIENT_FIELDS)
+    
+    return recommended
+
+@router.post("/api/jobs/{job_id}/apply")
 async def apply_to_job(job_id: str, application: JobApplication, current_user = Depends(verify_token)):
     if current_user["role"] != "freelancer":
         raise HTTPException(status_code=403, detail="Only freelancers can apply to jobs")
@@ -700,6 +1229,7 @@ async def apply_to_job(job_id: str, application: JobApplication, current_user =
         "id": str(uuid.uuid4()),
         "job_id": job_id,
         "freelancer_id": current_user["user_id"],
+        **user_fields(user, APPLICATION_FREELANCER_FIELDS),
         "proposal": application.proposal,
         "bid_amount": application.bid_amount,
         "status": "pending",
@@ -716,41 +1246,152 @@ async def apply_to_job(job_id: str, application: JobApplication, current_user =
     
     return {"message": "Application submitted successfully"}
 
-@app.get("/api/jobs/{job_id}/applications")
-async def get_job_applications(job_id: str, current_user = Depends(verify_token)):
+@router.get("/api/jobs/{job_id}/applications")
+async def get_job_applications(
+    job_id: str,
+    sort: str = "newest",
+    skip: int = 0,
+    limit: int = APPLICATIONS_PAGE_SIZE,
+    current_user = Depends(verify_token)
+):
+    """Applications to the caller's job, newest first; sort=score returns a page of applicants ranked by fit"""
+    if sort not in ("newest", "score"):
+        raise HTTPException(status_code=400, detail="sort must be newest or score")
+    
     # Check if user owns the job
     job = db.jobs.find_one({"id": job_id, "client_id": current_user["user_id"]})
     if not job:
         raise HTTPException(status_code=404, detail="Job not found or access denied")
     
+    if sort == "score":
+        return rank_job_applications(job, max(skip, 0), min(max(limit, 1), APPLICATIONS_MAX_PAGE_SIZE))
+    
     applications = list(db.applications.find({"job_id": job_id}).sort("created_at", -1))
     
-    # Get freelancer info for each application
+    # Freelancer name and profile are stored on the application
+    fill_user_fields(db, applications, "freelancer_id", APPLICATION_FREELANCER_FIELDS)
     for app in applications:
-        freelancer = db.users.find_one({"id": app["freelancer_id"]})
-        if freelancer:
-            app["freelancer_name"] = freelancer["full_name"]
-            app["freelancer_profile"] = freelancer.get("profile", {})
         app["_id"] = str(app["_id"])
     
     return applications
 
-@app.post("/api/messages")
+def rank_job_applications(job: dict, skip: int, limit: int) -> dict:
+    """One page of a job's applications, best scored first; only the page is read in full"""
+    applications = list(
+        db.applications.find({"job_id": job["id"]}, APPLICANT_SCORE_FIELDS).sort([("created_at", -1), ("id", -1)])
+    )
+    # Applications written before rating and verification were copied onto them
+    fill_user_fields(db, applications, "freelancer_id", APPLICANT_SCORE_COPIES)
+    
+    signals = score_applicants(job, applications)
+    # Equal scores stay newest first
+    page = ranked_positions(signals["score"])[skip:skip + limit]
+    
+    # The job_id prefix keeps the re-read on the (job_id, created_at) index
+    documents = {
+        application["id"]: application
+        for application in db.applications.find(
+            {"job_id": job["id"], "id": {"$in": [applications[i]["id"] for i in page]}}
+        )
+    }
+    fill_user_fields(db, list(documents.values()), "freelancer_id", APPLICATION_FREELANCER_FIELDS)
+    
+    ranked = []
+    for position in page:
+        application = documents.get(applications[position]["id"])
+        if application is None:
+            continue
+        application["_id"] = str(application["_id"])
+        application["match_score"] = round(float(signals["score"][position]), 4)
+        application["score_breakdown"] = {
+            name: round(float(values[position]), 4) for name, values in signals.items() if name != "score"
+        }
+        ranked.append(application)
+    
+    total = len(applications)
+    return {
+        "applications": ranked,
+        "total": total,
+        "page": skip // limit + 1,
+        "pages": (total + limit - 1) // limit if total > 0 else 1
+    }
+
+@router.post("/api/messages")
 async def send_message(message: Message, current_user = Depends(verify_token)):
     message_data = {
         "id": str(uuid.uuid4()),
         "job_id": message.job_id,
         "sender_id": current_user["user_id"],
+        **user_fields(display_user(current_user["user_id"]), MESSAGE_SENDER_FIELDS),
         "receiver_id": message.receiver_id,
+        "participants": message_participants(current_user["user_id"], message.receiver_id),
         "content": message.content,
         "created_at": datetime.utcnow(),
         "read": False
     }
+    message_data["search_keys"] = message_search_keys(message_data["participants"], message.content)
     
     db.messages.insert_one(message_data)
     return {"message": "Message sent successfully"}
 
-@app.get("/api/messages/{job_id}")
+@router.get("/api/messages/search")
+async def search_messages(
+    q: str,
+    conversation_id: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 20,
+    context: int = 1,
+    current_user = Depends(verify_token)
+):
+    """Full-text search over the caller's own messages, with surrounding messages for context"""
+    if len(q.strip()) < 2:
+        raise HTTPException(status_code=400, detail="Query must be at least 2 characters")
+    
+    skip = max(skip, 0)
+    limit = min(max(limit, 1), 50)
+    context = min(max(context, 0), 3)
+    user_id = current_user["user_id"]
+    
+    hits, total = message_store.search(user_id, q.strip(), conversation_id, skip, limit)
+    
+    # Neighbouring messages in the same thread, bounded by limit * context per side
+    for hit in hits:
+        hit["context_before"], hit["context_after"] = message_store.neighbours(hit, context)
+    
+    # One lookup for every sender and conversation partner on the page
+    user_ids = {participant for hit in hits for participant in hit["participants"]}
+    user_ids |= {msg["sender_id"] for hit in hits for msg in hit["context_before"] + hit["context_after"]}
+    users = {
+        user["id"]: user for user in db.users.find(
+            {"id": {"$in": list(user_ids)}}, {"_id": 0, "id": 1, "full_name": 1, "role": 1, "profile_picture": 1}
+        )
+    }
+    
+    results = []
+    for hit in hits:
+        other_id = next((p for p in hit["participants"] if p != user_id), user_id)
+        for msg in [hit] + hit["context_before"] + hit["context_after"]:
+            msg.pop("_id", None)
+            msg["sender_name"] = users.get(msg["sender_id"], {}).get("full_name")
+        results.append({
+            "message": {key: value for key, value in hit.items() if key not in ("context_before", "context_after")},
+            "conversation": {
+                "conversation_id": hit.get("conversation_id"),
+                "job_id": hit.get("job_id"),
+                "other_participant": users.get(other_id)
+            },
+            "context_before": hit["context_before"],
+            "context_after": hit["context_after"]
+        })
+    
+    return {
+        "results": results,
+        "total": total,
+        "page": skip // limit + 1,
+        "pages": (total + limit - 1) // limit if total > 0 else 1
+    }
+
+@router.get("/api/messages/{job_id}")
 async def get_messages(job_id: str, current_user = Depends(verify_token)):
     messages = list(db.messages.find({
         "job_id": job_id,
@@ -758,20 +1399,18 @@ async def get_messages(job_id: str, current_user = Depends(verify_token)):
             {"sender_id": current_user["user_id"]},
             {"receiver_id": current_user["user_id"]}
         ]
-    }).sort("created_at", 1))
+    }, hidden_fields()).sort("created_at", 1))
     
-    # Get sender names
+    # Sender names are stored on the messages
+    fill_user_fields(db, messages, "sender_id", MESSAGE_SENDER_FIELDS)
     for msg in messages:
-        sender = db.users.find_one({"id": msg["sender_id"]})
-        if sender:
-            msg["sender_name"] = sender["full_name"]
         msg["_id"] = str(msg["_id"])
     
     return messages
 
 # ENHANCED MESSAGING SYSTEM - Direct Messages & Conversations
 
-@app.post("/api/direct-messages")
+@router.post("/api/direct-messages")
 async def send_direct_message(message: DirectMessage, current_user = Depends(verify_token)):
     """Send a direct message between users (not tied to a specific job)"""
     
@@ -787,41 +1426,55 @@ async def send_direct_message(message: DirectMessage, current_user = Depends(ver
     # Create conversation ID based on participants (consistent ordering)
     participants = sorted([current_user["user_id"], message.receiver_id])
     conversation_id = f"dm_{participants[0]}_{participants[1]}"
+    sender = display_user(current_user["user_id"])
     
     message_data = {
         "id": str(uuid.uuid4()),
         "conversation_id": conversation_id,
         "sender_id": current_user["user_id"],
+        **user_fields(sender, MESSAGE_SENDER_FIELDS),
         "receiver_id": message.receiver_id,
+        "participants": participants,
         "content": message.content,
+        "search_keys": message_search_keys(participants, message.content),
         "message_type": "direct",
         "created_at": datetime.utcnow(),
-        "read": False,
         "job_id": None  # No job association for direct messages
     }
     
-    db.messages.insert_one(message_data)
+    message_store.insert(message_data)
     
     # Update or create conversation metadata
     conversation_data = {
         "conversation_id": conversation_id,
         "participants": participants,
         "last_message_id": message_data["id"],
-        "last_message_at": datetime.utcnow(),
+        "last_message_at": message_data["created_at"],
         "last_message_content": message.content[:100],  # Preview
-        "updated_at": datetime.utcnow()
+        "updated_at": datetime.utcnow(),
+        f"participant_info.{current_user['user_id']}": user_fields(sender, PARTICIPANT_FIELDS),
+        f"participant_info.{message.receiver_id}": user_fields(receiver, PARTICIPANT_FIELDS)
     }
     
-    # Upsert conversation
-    db.conversations.update_one(
+    # Upsert conversation; the sender has read everything up to their own message
+    result = db.conversations.update_one(
         {"conversation_id": conversation_id},
-        {"$set": conversation_data},
+        {"$set": conversation_data, "$max": {f"read_watermarks.{current_user['user_id']}": message_data["created_at"]}},
         upsert=True
     )
+    if result.upserted_id:
+        invalidate_messaging_contacts(*participants)
     
     return {"message": "Direct message sent successfully", "conversation_id": conversation_id}
 
-@app.get("/api/conversations")
+def advance_read_watermark(conversation_id: str, user_id: str, read_until: datetime) -> None:
+    """Record that user_id has read the conversation up to read_until (never moves backwards)"""
+    db.conversations.update_one(
+        {"conversation_id": conversation_id},
+        {"$max": {f"read_watermarks.{user_id}": read_until}}
+    )
+
+@router.get("/api/conversations")
 async def get_conversations(current_user = Depends(verify_token)):
     """Get all conversations for the current user"""
     
@@ -829,39 +1482,43 @@ async def get_conversations(current_user = Depends(verify_token)):
         "participants": current_user["user_id"]
     }).sort("last_message_at", -1))
     
-    # Enrich conversations with participant info and unread counts
+    # Other participant's info is stored on the conversation; older conversations are filled in one lookup
+    others = []
     for conv in conversations:
-        # Get other participant's info
         other_participant_id = next(
             (p for p in conv["participants"] if p != current_user["user_id"]), 
             None
         )
+        others.append({"user_id": other_participant_id, **conv.pop("participant_info", {}).get(other_participant_id, {})})
+    fill_user_fields(db, others, "user_id", PARTICIPANT_FIELDS)
+    
+    # Unread messages are those received after the user's read watermark, counted for every
+    # conversation in one query; conversations with nothing newer than the watermark are skipped
+    unread_since = {}
+    for conv in conversations:
+        since = conv.get("read_watermarks", {}).get(current_user["user_id"])
+        if since is None or not conv.get("last_message_at") or conv["last_message_at"] > since:
+            unread_since[conv["conversation_id"]] = since
+    unread = message_store.unread_counts(current_user["user_id"], unread_since)
+    
+    # Enrich conversations with participant info and unread counts
+    for conv, other in zip(conversations, others):
+        if other.get("id"):
+            conv["other_participant"] = {field: other[field] for field in PARTICIPANT_FIELDS}
         
-        if other_participant_id:
-            other_user = db.users.find_one({"id": other_participant_id})
-            if other_user:
-                conv["other_participant"] = {
-                    "id": other_user["id"],
-                    "full_name": other_user["full_name"],
-                    "role": other_user["role"],
-                    "is_verified": other_user.get("is_verified", False),
-                    "profile_picture": other_user.get("profile_picture")
-                }
-        
-        # Count unread messages
-        unread_count = db.messages.count_documents({
-            "conversation_id": conv["conversation_id"],
-            "receiver_id": current_user["user_id"],
-            "read": False
-        })
-        conv["unread_count"] = unread_count
+        watermarks = conv.get("read_watermarks", {})
+        conv["unread_count"] = unread.get(conv["conversation_id"], 0)
+        conv["read_state"] = [
+            ConversationParticipant(user_id=participant, last_read_at=watermarks.get(participant)).dict()
+            for participant in conv["participants"]
+        ]
         
         # Convert ObjectId to string
         conv["_id"] = str(conv["_id"])
     
     return conversations
 
-@app.get("/api/conversations/{conversation_id}/messages")
+@router.get("/api/conversations/{conversation_id}/messages")
 async def get_conversation_messages(conversation_id: str, current_user = Depends(verify_token)):
     """Get all messages in a specific conversation"""
     
@@ -875,32 +1532,26 @@ async def get_conversation_messages(conversation_id: str, current_user = Depends
         raise HTTPException(status_code=404, detail="Conversation not found or access denied")
     
     # Get messages for this conversation
-    messages = list(db.messages.find({
-        "conversation_id": conversation_id
-    }).sort("created_at", 1))
+    messages = message_store.conversation_messages(conversation_id)
     
-    # Enrich messages with sender info
-    for msg in messages:
-        sender = db.users.find_one({"id": msg["sender_id"]})
-        if sender:
-            msg["sender_name"] = sender["full_name"]
-            msg["sender_role"] = sender["role"]
-            msg["sender_profile_picture"] = sender.get("profile_picture")
-        msg["_id"] = str(msg["_id"])
+    # Opening the thread reads everything up to the newest message: one write on the conversation
+    watermarks = conversation.get("read_watermarks", {})
+    user_id = current_user["user_id"]
+    if messages and (watermarks.get(user_id) is None or watermarks[user_id] < messages[-1]["created_at"]):
+        advance_read_watermark(conversation_id, user_id, messages[-1]["created_at"])
+        watermarks[user_id] = messages[-1]["created_at"]
     
-    # Mark messages as read for the current user
-    db.messages.update_many(
-        {
-            "conversation_id": conversation_id,
-            "receiver_id": current_user["user_id"],
-            "read": False
-        },
-        {"$set": {"read": True, "read_at": datetime.utcnow()}}
-    )
+    # Sender info is stored on the messages; read state is derived from the receiver's watermark
+    fill_user_fields(db, messages, "sender_id", MESSAGE_SENDER_FIELDS)
+    for msg in messages:
+        receiver_read_at = watermarks.get(msg["receiver_id"])
+        msg["read"] = bool(receiver_read_at and msg["created_at"] <= receiver_read_at)
+        if "_id" in msg:
+            msg["_id"] = str(msg["_id"])
     
     return messages
 
-@app.post("/api/conversations/{conversation_id}/mark-read")
+@router.post("/api/conversations/{conversation_id}/mark-read")
 async def mark_conversation_read(conversation_id: str, current_user = Depends(verify_token)):
     """Mark all messages in a conversation as read for the current user"""
     
@@ -913,45 +1564,72 @@ async def mark_conversation_read(conversation_id: str, current_user = Depends(ve
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found or access denied")
     
-    # Mark all unread messages as read
-    result = db.messages.update_many(
-        {
-            "conversation_id": conversation_id,
-            "receiver_id": current_user["user_id"],
-            "read": False
-        },
-        {"$set": {"read": True, "read_at": datetime.utcnow()}}
-    )
+    # Move the read watermark to the newest message
+    user_id = current_user["user_id"]
+    last_read_at = conversation.get("read_watermarks", {}).get(user_id)
+    marked = message_store.unread_count(conversation_id, user_id, last_read_at)
+    if marked:
+        advance_read_watermark(conversation_id, user_id, conversation.get("last_message_at") or datetime.utcnow())
     
-    return {"message": f"Marked {result.modified_count} messages as read"}
+    return {"message": f"Marked {marked} messages as read"}
+
+def messaging_contacts(user_id: str) -> List[str]:
+    """Users the caller has conversations or contracts with, most recent first"""
+    contacts = []
+    for conversation in db.conversations.find(
+        {"participants": user_id}, {"_id": 0, "participants": 1}
+    ).sort("last_message_at", -1).limit(TYPEAHEAD_CONTACTS_SCAN):
+        contacts.extend(participant for participant in conversation["participants"] if participant != user_id)
+    for field, other in (("client_id", "freelancer_id"), ("freelancer_id", "client_id")):
+        for contract in db.contracts.find(
+            {field: user_id}, {"_id": 0, other: 1}
+        ).sort("created_at", -1).limit(TYPEAHEAD_CONTACTS_SCAN):
+            contacts.append(contract[other])
+    return list(dict.fromkeys(contacts))
 
-@app.get("/api/conversations/search")
+def invalidate_messaging_contacts(*user_ids: str) -> None:
+    """Drop the cached contact sets of users who just gained a conversation or contract"""
+    for user_id in user_ids:
+        response_cache.invalidate("messaging_contacts", {"user_id": user_id})
+
+@router.get("/api/conversations/search")
 async def search_users_for_messaging(query: str, current_user = Depends(verify_token)):
-    """Search users to start a new conversation"""
+    """Search users to start a new conversation: name-word or email prefixes, existing contacts first"""
     
-    if len(query.strip()) < 2:
+    keys = prefix_keys(query)
+    if not keys:
         raise HTTPException(status_code=400, detail="Query must be at least 2 characters")
     
-    # Search users by name or email (exclude current user)
-    search_regex = {"$regex": query, "$options": "i"}
-    users = list(db.users.find({
-        "$and": [
-            {"id": {"$ne": current_user["user_id"]}},  # Exclude current user
-            {
-                "$or": [
-                    {"full_name": search_regex},
-                    {"email": search_regex}
-                ]
-            }
-        ]
-    }, {
+    projection = {
         "id": 1,
         "full_name": 1,
         "email": 1,
         "role": 1,
         "is_verified": 1,
         "profile_picture": 1
-    }).limit(20))
+    }
+    
+    # Every keystroke of a search reuses the same contact set
+    async def contacts_for_user():
+        return messaging_contacts(current_user["user_id"])
+    contacts = await response_cache.get_or_compute(
+        "messaging_contacts", {"user_id": current_user["user_id"]}, contacts_for_user, TYPEAHEAD_CONTACTS_TTL
+    )
+    users = []
+    if contacts:
+        rank = {user_id: position for position, user_id in enumerate(contacts)}
+        users = sorted(
+            db.users.find({**prefix_query(keys), "id": {"$in": contacts}}, projection),
+            key=lambda user: rank[user["id"]]
+        )[:TYPEAHEAD_LIMIT]
+        for user in users:
+            user["is_contact"] = True
+    
+    if len(users) < TYPEAHEAD_LIMIT:
+        # Everyone else (exclude current user and the contacts already listed)
+        users.extend(db.users.find(
+            {**prefix_query(keys), "id": {"$nin": contacts + [current_user["user_id"]]}}, projection
+        ).limit(TYPEAHEAD_LIMIT - len(users)))
     
     # Convert ObjectId to string
     for user in users:
@@ -960,7 +1638,7 @@ async def search_users_for_messaging(query: str, current_user = Depends(verify_t
     return users
 
 # CONTRACTS MANAGEMENT
-@app.post("/api/jobs/{job_id}/accept-proposal")
+@router.post("/api/jobs/{job_id}/accept-proposal")
 async def accept_proposal(job_id: str, acceptance: ProposalAcceptance, current_user = Depends(verify_token)):
     # Verify user is client and owns the job
     job = db.jobs.find_one({"id": job_id, "client_id": current_user["user_id"]})
@@ -991,8 +1669,12 @@ async def accept_proposal(job_id: str, acceptance: ProposalAcceptance, current_u
     contract_data = {
         "id": str(uuid.uuid4()),
         "job_id": job_id,
+        "job_title": job["title"],
+        "job_category": job["category"],
         "freelancer_id": acceptance.freelancer_id,
+        **user_fields(freelancer, CONTRACT_FREELANCER_FIELDS),
         "client_id": current_user["user_id"],
+        **user_fields(display_user(current_user["user_id"]), CONTRACT_CLIENT_FIELDS),
         "amount": acceptance.bid_amount,
         "status": "In Progress",
         "created_at": datetime.utcnow(),
@@ -1006,6 +1688,7 @@ async def accept_proposal(job_id: str, acceptance: ProposalAcceptance, current_u
     try:
         # Insert contract
         db.contracts.insert_one(contract_data)
+        invalidate_messaging_contacts(acceptance.freelancer_id, current_user["user_id"])
         
         # Handle escrow: Move funds to escrow balance for freelancer
         freelancer_wallet = db.wallets.find_one({"user_id": acceptance.freelancer_id})
@@ -1036,6 +1719,8 @@ async def accept_proposal(job_id: str, acceptance: ProposalAcceptance, current_u
                 "updated_at": datetime.utcnow()
             }}
         )
+        invalidate_job_feed(job.get("category"))
+        job_recommender.remove_job(job_id)
         
         # Update accepted proposal status
         db.applications.update_one(
@@ -1059,6 +1744,13 @@ async def accept_proposal(job_id: str, acceptance: ProposalAcceptance, current_u
             }}
         )
         
+        activity_log.emit(
+            "proposal_accepted",
+            f"Proposal accepted: {freelancer['full_name']} hired for {job.get('title', 'Untitled Job')} (R{acceptance.bid_amount:,.2f})",
+            actor_id=current_user["user_id"], user_id=acceptance.freelancer_id,
+            job_id=job_id, contract_id=contract_data["id"]
+        )
+        
         return {
             "message": "Proposal accepted and contract created successfully",
             "contract_id": contract_data["id"],
@@ -1068,7 +1760,7 @@ async def accept_proposal(job_id: str, acceptance: ProposalAcceptance, current_u
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating contract: {str(e)}")
 
-@app.get("/api/contracts")
+@router.get("/api/contracts")
 async def get_contracts(current_user = Depends(verify_token)):
     # Get contracts based on user role
     if current_user["role"] == "freelancer":
@@ -1080,30 +1772,24 @@ async def get_contracts(current_user = Depends(verify_token)):
     else:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Enrich contracts with additional data
+    # Job, freelancer and client details are stored on the contract; older contracts are filled per page
+    missing_jobs = {contract["job_id"] for contract in contracts if "job_title" not in contract}
+    if missing_jobs:
+        jobs = {job["id"]: job for job in db.jobs.find({"id": {"$in": list(missing_jobs)}}, {"id": 1, "title": 1, "category": 1})}
+        for contract in contracts:
+            job = jobs.get(contract["job_id"])
+            if "job_title" not in contract and job:
+                contract["job_title"] = job["title"]
+                contract["job_category"] = job["category"]
+    fill_user_fields(db, contracts, "freelancer_id", CONTRACT_FREELANCER_FIELDS)
+    fill_user_fields(db, contracts, "client_id", CONTRACT_CLIENT_FIELDS)
+    
     for contract in contracts:
-        # Get job details
-        job = db.jobs.find_one({"id": contract["job_id"]})
-        if job:
-            contract["job_title"] = job["title"]
-            contract["job_category"] = job["category"]
-        
-        # Get freelancer details
-        freelancer = db.users.find_one({"id": contract["freelancer_id"]})
-        if freelancer:
-            contract["freelancer_name"] = freelancer["full_name"]
-            contract["freelancer_profile"] = freelancer.get("profile", {})
-        
-        # Get client details
-        client = db.users.find_one({"id": contract["client_id"]})
-        if client:
-            contract["client_name"] = client["full_name"]
-        
         contract["_id"] = str(contract["_id"])
     
     return contracts
 
-@app.get("/api/contracts/stats")
+@router.get("/api/contracts/stats")
 async def get_contract_stats(current_user = Depends(verify_token)):
     # Get contract statistics based on user role
     if current_user["role"] == "freelancer":
@@ -1169,7 +1855,7 @@ async def get_contract_stats(current_user = Depends(verify_token)):
     
     return result
 
-@app.get("/api/contracts/{contract_id}")
+@router.get("/api/contracts/{contract_id}")
 async def get_contract(contract_id: str, current_user = Depends(verify_token)):
     contract = db.contracts.find_one({"id": contract_id})
     if not contract:
@@ -1206,7 +1892,7 @@ async def get_contract(contract_id: str, current_user = Depends(verify_token)):
     
     return contract
 
-@app.patch("/api/contracts/{contract_id}/status")
+@router.patch("/api/contracts/{contract_id}/status")
 async def update_contract_status(contract_id: str, status_data: dict, current_user = Depends(verify_token)):
     new_status = status_data.get("status")
     if new_status not in ["In Progress", "Completed", "Cancelled"]:
@@ -1230,7 +1916,14 @@ async def update_contract_status(contract_id: str, status_data: dict, current_us
         }}
     )
     
+    # Completed contracts are counted on the freelancer's public profile
+    response_cache.invalidate("freelancer_public_profile", {"freelancer_id": contract["freelancer_id"]})
+    
     # If completed, also update job status
+    if new_status in ("Completed", "Cancelled"):
+        job = db.jobs.find_one({"id": contract["job_id"]}, {"category": 1})
+        invalidate_job_feed(job.get("category") if job else None)
+        job_recommender.remove_job(contract["job_id"])
     if new_status == "Completed":
         db.jobs.update_one(
             {"id": contract["job_id"]},
@@ -1250,31 +1943,14 @@ async def update_contract_status(contract_id: str, status_data: dict, current_us
     
     return {"message": f"Contract status updated to {new_status}"}
 
-@app.post("/api/upload-id-document")
-async def upload_id_document(
-    file: UploadFile = File(...),
-    current_user = Depends(verify_token)
-):
-    # Check if user is freelancer
-    if current_user["role"] != "freelancer":
-        raise HTTPException(status_code=403, detail="Only freelancers can upload ID documents")
-    
-    # Define allowed file types for ID documents
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "application/pdf"]
-    
-    # Save file using utility function
-    file_info = await save_uploaded_file(
-        file=file,
-        user_id=current_user["user_id"],
-        file_type="id_document",
-        subdirectory="id_documents",
-        allowed_types=allowed_types,
-        max_size_mb=5
-    )
+# Upload recording helpers - shared by multipart uploads and finalized direct uploads
+
+def record_id_document(user_id: str, file_info: dict) -> None:
+    """Attach an ID document to the user and notify the verification team"""
     
     # Update user document in database
     db.users.update_one(
-        {"id": current_user["user_id"]},
+        {"id": user_id},
         {
             "$set": {
                 "id_document": file_info,
@@ -1286,7 +1962,7 @@ async def upload_id_document(
     
     # Send verification approval email to sam@afrilance.co.za
     try:
-        user = db.users.find_one({"id": current_user["user_id"]})
+        user = db.users.find_one({"id": user_id})
         if user:
             verification_email_subject = f"New Verification Request - {user['full_name']}"
             verification_email_body = f"""
@@ -1318,7 +1994,7 @@ async def upload_id_document(
                     <div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ffc107;">
                         <h3 style="margin-top: 0; color: #856404;">Action Required:</h3>
                         <p>Please review the uploaded ID document and verify the freelancer's identity.</p>
-                        <p><strong>Document Location:</strong> /app/backend/uploads/id_documents/{file_info['filename']}</p>
+                        <p><strong>Document Location:</strong> {file_info['file_path']}</p>
                     </div>
                     
                     <div style="margin: 30px 0; text-align: center;">
@@ -1345,13 +2021,162 @@ async def upload_id_document(
             )
             
             if email_sent:
-                print(f"✅ Verification email sent to sam@afrilance.co.za for user {user['full_name']}")
+                logger.info("Verification email sent for user %s", user_id)
             else:
-                print(f"❌ Failed to send verification email for user {user['full_name']}")
+                logger.error("Failed to send verification email for user %s", user_id)
                 
     except Exception as e:
-        print(f"❌ Error sending verification email: {str(e)}")
+        logger.error("Error sending verification email for user %s: %s", user_id, e)
         # Don't fail the upload if email fails
+
+def record_profile_picture(user_id: str, file_info: dict) -> None:
+    """Set the user's profile picture"""
+    db.users.update_one(
+        {"id": user_id},
+        {
+            "$set": {
+                "profile_picture": file_info
+            }
+        }
+    )
+    invalidate_freelancer_caches(user_id)
+    user_fanout.submit(user_id)
+
+def record_resume(user_id: str, file_info: dict) -> None:
+    """Set the freelancer's resume"""
+    db.users.update_one(
+        {"id": user_id},
+        {
+            "$set": {
+                "resume": file_info
+            }
+        }
+    )
+
+def record_portfolio_file(user_id: str, file_info: dict) -> None:
+    """Add a file to the freelancer's portfolio"""
+    db.portfolio_items.insert_one({
+        "id": str(uuid.uuid4()),
+        "owner_id": user_id,
+        "kind": "file",
+        "file_info": file_info,
+        "created_at": file_info["uploaded_at"]
+    })
+    refresh_portfolio_stats(db, user_id)
+    invalidate_freelancer_caches(user_id)
+
+def record_project_gallery_item(
+    user_id: str,
+    file_info: dict,
+    title: str,
+    description: str,
+    technologies: List[str],
+    project_url: Optional[str]
+) -> dict:
+    """Add a project gallery item to the freelancer's gallery and return it"""
+    gallery_item = {
+        "id": str(uuid.uuid4()),
+        "title": title,
+        "description": description,
+        "technologies": technologies,
+        "project_url": project_url,
+        "file_info": file_info,
+        "created_at": datetime.utcnow()
+    }
+    
+    db.portfolio_items.insert_one({
+        **gallery_item,
+        "owner_id": user_id,
+        "kind": "project"
+    })
+    refresh_portfolio_stats(db, user_id)
+    invalidate_freelancer_caches(user_id)
+    
+    return gallery_item
+
+# Portfolio reads - items live in db.portfolio_items, never on the user document
+
+# Maximum number of files / projects returned by the public showcase
+PORTFOLIO_SHOWCASE_LIMIT = 100
+
+PORTFOLIO_FILE_FIELDS = {"_id": 0, "file_info": 1}
+PROJECT_GALLERY_FIELDS = {
+    "_id": 0, "id": 1, "title": 1, "description": 1, "technologies": 1,
+    "project_url": 1, "file_info": 1, "created_at": 1
+}
+
+def get_portfolio_files(owner_id: str, limit: int = 0, newest_first: bool = False, database=None) -> List[dict]:
+    """Portfolio files (file_info documents) for a freelancer in upload order"""
+    cursor = (database or db).portfolio_items.find(
+        {"owner_id": owner_id, "kind": "file"}, PORTFOLIO_FILE_FIELDS
+    ).sort("created_at", -1 if newest_first else 1).limit(limit)
+    return [item["file_info"] for item in cursor]
+
+def get_project_gallery(owner_id: str, limit: int = 0, newest_first: bool = False, database=None) -> List[dict]:
+    """Project gallery items for a freelancer in upload order"""
+    return list((database or db).portfolio_items.find(
+        {"owner_id": owner_id, "kind": "project"}, PROJECT_GALLERY_FIELDS
+    ).sort("created_at", -1 if newest_first else 1).limit(limit))
+
+def get_portfolio_previews(owner_ids: List[str], files_limit: int, projects_limit: int, database=None) -> dict:
+    """Newest few files and projects for many freelancers in one aggregation"""
+    if not owner_ids:
+        return {}
+    
+    item = {
+        "id": "$id",
+        "title": "$title",
+        "description": "$description",
+        "technologies": "$technologies",
+        "project_url": "$project_url",
+        "file_info": "$file_info",
+        "created_at": "$created_at"
+    }
+    limit = {"$cond": [{"$eq": ["$kind", "file"]}, files_limit, projects_limit]}
+    pipeline = [{"$match": {"owner_id": {"$in": owner_ids}}}]
+    if mongo_supports((5, 2)):
+        # Each group only ever holds its newest few items
+        pipeline.append({"$group": {
+            "_id": {"owner_id": "$owner_id", "kind": "$kind"},
+            "items": {"$topN": {"n": limit, "sortBy": {"created_at": -1}, "output": item}}
+        }})
+    else:
+        pipeline += [
+            {"$sort": {"created_at": -1}},
+            {"$group": {"_id": {"owner_id": "$owner_id", "kind": "$kind"}, "items": {"$push": item}}},
+            {"$project": {"items": {"$slice": ["$items", max(files_limit, projects_limit)]}}}
+        ]
+    
+    previews = {owner_id: {"portfolio_files": [], "project_gallery": []} for owner_id in owner_ids}
+    for group in (database or db).portfolio_items.aggregate(pipeline):
+        owner_preview = previews[group["_id"]["owner_id"]]
+        if group["_id"]["kind"] == "file":
+            owner_preview["portfolio_files"] = [item["file_info"] for item in group["items"][:files_limit]]
+        else:
+            owner_preview["project_gallery"] = group["items"][:projects_limit]
+    
+    return previews
+
+@router.post("/api/upload-id-document")
+async def upload_id_document(
+    file: UploadFile = File(...),
+    current_user = Depends(verify_token)
+):
+    # Check if user is freelancer
+    policy = get_upload_policy("id_document", current_user)
+    
+    # Save file using utility function
+    file_info = await save_uploaded_file(
+        file=file,
+        user_id=current_user["user_id"],
+        file_type="id_document",
+        subdirectory=policy["subdirectory"],
+        allowed_types=policy["allowed_types"],
+        max_size_mb=policy["max_size_mb"]
+    )
+    
+    # Update user document and notify the verification team
+    record_id_document(current_user["user_id"], file_info)
     
     return {
         "message": "ID document uploaded successfully. Verification team has been notified.",
@@ -1359,43 +2184,35 @@ async def upload_id_document(
         "status": "pending_verification"
     }
 
-@app.post("/api/upload-profile-picture")
+@router.post("/api/upload-profile-picture")
 async def upload_profile_picture(
     file: UploadFile = File(...),
     current_user = Depends(verify_token)
 ):
     """Upload profile picture for any user"""
     
-    # Define allowed file types for profile pictures
-    allowed_types = ["image/jpeg", "image/png", "image/jpg", "image/webp"]
+    policy = get_upload_policy("profile_picture", current_user)
     
     # Save file using utility function
     file_info = await save_uploaded_file(
         file=file,
         user_id=current_user["user_id"],
         file_type="profile_picture",
-        subdirectory="profile_pictures",
-        allowed_types=allowed_types,
-        max_size_mb=2  # Smaller size for profile pictures
+        subdirectory=policy["subdirectory"],
+        allowed_types=policy["allowed_types"],
+        max_size_mb=policy["max_size_mb"]
     )
     
     # Update user profile picture in database
-    db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$set": {
-                "profile_picture": file_info
-            }
-        }
-    )
+    record_profile_picture(current_user["user_id"], file_info)
     
     return {
         "message": "Profile picture uploaded successfully",
         "filename": file_info["filename"],
-        "file_url": f"/uploads/profile_pictures/{file_info['filename']}"
+        "file_url": file_info["file_url"]
     }
 
-@app.post("/api/upload-resume")
+@router.post("/api/upload-resume")
 async def upload_resume(
     file: UploadFile = File(...),
     current_user = Depends(verify_token)
@@ -1403,39 +2220,28 @@ async def upload_resume(
     """Upload resume/CV for freelancers"""
     
     # Check if user is freelancer
-    if current_user["role"] != "freelancer":
-        raise HTTPException(status_code=403, detail="Only freelancers can upload resumes")
-    
-    # Define allowed file types for resumes
-    allowed_types = ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+    policy = get_upload_policy("resume", current_user)
     
     # Save file using utility function
     file_info = await save_uploaded_file(
         file=file,
         user_id=current_user["user_id"],
         file_type="resume",
-        subdirectory="resumes",
-        allowed_types=allowed_types,
-        max_size_mb=10  # Larger size for documents
+        subdirectory=policy["subdirectory"],
+        allowed_types=policy["allowed_types"],
+        max_size_mb=policy["max_size_mb"]
     )
     
     # Update user resume in database
-    db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$set": {
-                "resume": file_info
-            }
-        }
-    )
+    record_resume(current_user["user_id"], file_info)
     
     return {
         "message": "Resume uploaded successfully",
         "filename": file_info["filename"],
-        "file_url": f"/uploads/resumes/{file_info['filename']}"
+        "file_url": file_info["file_url"]
     }
 
-@app.post("/api/upload-portfolio-file")
+@router.post("/api/upload-portfolio-file")
 async def upload_portfolio_file(
     file: UploadFile = File(...),
     current_user = Depends(verify_token)
@@ -1443,44 +2249,28 @@ async def upload_portfolio_file(
     """Upload portfolio files for freelancers"""
     
     # Check if user is freelancer
-    if current_user["role"] != "freelancer":
-        raise HTTPException(status_code=403, detail="Only freelancers can upload portfolio files")
-    
-    # Define allowed file types for portfolio
-    allowed_types = [
-        "image/jpeg", "image/png", "image/jpg", "image/webp", "image/gif",
-        "application/pdf", 
-        "video/mp4", "video/mpeg", "video/quicktime",
-        "application/zip", "application/x-zip-compressed"
-    ]
+    policy = get_upload_policy("portfolio", current_user)
     
     # Save file using utility function
     file_info = await save_uploaded_file(
         file=file,
         user_id=current_user["user_id"],
         file_type="portfolio",
-        subdirectory="portfolios",
-        allowed_types=allowed_types,
-        max_size_mb=50  # Larger size for portfolio files
+        subdirectory=policy["subdirectory"],
+        allowed_types=policy["allowed_types"],
+        max_size_mb=policy["max_size_mb"]
     )
     
     # Add to user's portfolio files in database
-    db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$push": {
-                "portfolio_files": file_info
-            }
-        }
-    )
+    record_portfolio_file(current_user["user_id"], file_info)
     
     return {
         "message": "Portfolio file uploaded successfully",
         "filename": file_info["filename"],
-        "file_url": f"/uploads/portfolios/{file_info['filename']}"
+        "file_url": file_info["file_url"]
     }
 
-@app.post("/api/upload-project-gallery")
+@router.post("/api/upload-project-gallery")
 async def upload_project_gallery(
     file: UploadFile = File(...),
     title: str = Form(...),
@@ -1492,61 +2282,161 @@ async def upload_project_gallery(
     """Upload project gallery item with metadata"""
     
     # Check if user is freelancer
-    if current_user["role"] != "freelancer":
-        raise HTTPException(status_code=403, detail="Only freelancers can upload project gallery items")
-    
-    # Define allowed file types for project gallery
-    allowed_types = [
-        "image/jpeg", "image/png", "image/jpg", "image/webp", "image/gif",
-        "video/mp4", "video/mpeg", "video/quicktime"
-    ]
+    policy = get_upload_policy("project_gallery", current_user)
     
     # Save file using utility function
     file_info = await save_uploaded_file(
         file=file,
         user_id=current_user["user_id"],
         file_type="project_gallery",
-        subdirectory="project_gallery",
-        allowed_types=allowed_types,
-        max_size_mb=25  # Medium size for project media
+        subdirectory=policy["subdirectory"],
+        allowed_types=policy["allowed_types"],
+        max_size_mb=policy["max_size_mb"]
     )
     
     # Parse technologies
     tech_list = [tech.strip() for tech in technologies.split(",") if tech.strip()] if technologies else []
     
-    # Create project gallery item
-    gallery_item = {
-        "id": str(uuid.uuid4()),
-        "title": title,
-        "description": description,
-        "technologies": tech_list,
-        "project_url": project_url,
-        "file_info": file_info,
-        "created_at": datetime.utcnow()
-    }
-    
     # Add to user's project gallery in database
-    db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$push": {
-                "project_gallery": gallery_item
-            }
-        }
+    gallery_item = record_project_gallery_item(
+        current_user["user_id"], file_info, title, description, tech_list, project_url
     )
     
     return {
         "message": "Project gallery item uploaded successfully",
         "project_id": gallery_item["id"],
         "filename": file_info["filename"],
-        "file_url": f"/uploads/project_gallery/{file_info['filename']}"
+        "file_url": file_info["file_url"]
+    }
+
+# Direct-to-storage uploads: presign -> client PUT -> finalize
+
+@router.post("/api/uploads/presign")
+async def presign_upload(request: UploadPresignRequest, current_user = Depends(verify_token)):
+    """Issue an upload URL so the client can send the file straight to storage"""
+    
+    policy = get_upload_policy(request.upload_type, current_user)
+    validate_content_type(request.content_type, policy["allowed_types"])
+    
+    unique_filename = generate_unique_filename(current_user["user_id"], request.upload_type, request.filename)
+    key = f"{policy['subdirectory']}/{unique_filename}"
+    
+    upload_token = create_upload_token(
+        current_user["user_id"], request.upload_type, key, request.filename, request.content_type
+    )
+    
+    # Drivers without native presigning accept the PUT through the API instead
+    upload = storage.presigned_upload(
+        key, request.content_type, PRESIGNED_UPLOAD_EXPIRY_SECONDS, policy["max_size_mb"] * 1024 * 1024
+    )
+    if upload is None:
+        upload = {
+            "url": f"/api/uploads/direct/{upload_token}",
+            "method": "PUT",
+            "fields": {},
+            "headers": {"Content-Type": request.content_type}
+        }
+    
+    return {
+        "upload_url": upload["url"],
+        "method": upload["method"],
+        # POST uploads send these as form fields before the file field
+        "fields": upload["fields"],
+        "headers": upload["headers"],
+        "upload_token": upload_token,
+        "max_size_mb": policy["max_size_mb"],
+        "expires_in": PRESIGNED_UPLOAD_EXPIRY_SECONDS
     }
 
-@app.get("/api/user-files")
+@router.put("/api/uploads/direct/{upload_token}")
+async def direct_upload(upload_token: str, request: Request):
+    """Receive a presigned upload for storage drivers that cannot presign (local filesystem)"""
+    
+    token = decode_upload_token(upload_token)
+    policy = UPLOAD_POLICIES[token["upload_type"]]
+    
+    if request.headers.get("content-type") != token["content_type"]:
+        raise HTTPException(status_code=400, detail="Content-Type does not match the presigned upload")
+    
+    if db.finalized_uploads.find_one({"_id": token["key"]}, {"_id": 1}):
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    
+    file_content = await request.body()
+    if len(file_content) > policy["max_size_mb"] * 1024 * 1024:
+        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {policy['max_size_mb']}MB")
+    
+    storage.save(token["key"], file_content, token["content_type"])
+    
+    return {"message": "File uploaded", "key": token["key"]}
+
+@router.post("/api/uploads/finalize")
+async def finalize_upload(finalize: UploadFinalize, current_user = Depends(verify_token)):
+    """Validate a direct upload that landed in storage and record its file_info"""
+    
+    token = decode_upload_token(finalize.upload_token)
+    if token["user_id"] != current_user["user_id"]:
+        raise HTTPException(status_code=403, detail="Upload token belongs to another user")
+    
+    upload_type = token["upload_type"]
+    policy = get_upload_policy(upload_type, current_user)
+    key = token["key"]
+    
+    if upload_type == "project_gallery" and not (finalize.title and finalize.description):
+        raise HTTPException(status_code=400, detail="Project gallery uploads require a title and description")
+    
+    # Validate what actually arrived in storage
+    stored = storage.stat(key)
+    if not stored:
+        raise HTTPException(status_code=404, detail="Uploaded file not found in storage")
+    
+    if stored["size"] > policy["max_size_mb"] * 1024 * 1024:
+        delete_stored_file({"storage_key": key}, policy["subdirectory"])
+        raise HTTPException(status_code=400, detail=f"File too large. Maximum size is {policy['max_size_mb']}MB")
+    
+    if stored["content_type"] and stored["content_type"] != token["content_type"]:
+        delete_stored_file({"storage_key": key}, policy["subdirectory"])
+        raise HTTPException(status_code=400, detail="Stored content type does not match the presigned upload")
+    
+    # Each upload token finalizes once; a replay would record a second item over the same stored object
+    try:
+        db.finalized_uploads.insert_one({"_id": key, "user_id": current_user["user_id"], "finalized_at": datetime.utcnow()})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Upload already finalized")
+    
+    file_info = build_file_info(key, token["original_name"], token["content_type"], stored["size"])
+    
+    response = {
+        "message": "Upload finalized successfully",
+        "upload_type": upload_type,
+        "filename": file_info["filename"],
+        "file_url": file_info["file_url"]
+    }
+    
+    if upload_type == "id_document":
+        record_id_document(current_user["user_id"], file_info)
+    elif upload_type == "profile_picture":
+        record_profile_picture(current_user["user_id"], file_info)
+    elif upload_type == "resume":
+        record_resume(current_user["user_id"], file_info)
+    elif upload_type == "portfolio":
+        record_portfolio_file(current_user["user_id"], file_info)
+    elif upload_type == "project_gallery":
+        tech_list = [tech.strip() for tech in finalize.technologies if tech.strip()]
+        gallery_item = record_project_gallery_item(
+            current_user["user_id"], file_info, finalize.title, finalize.description, tech_list, finalize.project_url
+        )
+        response["project_id"] = gallery_item["id"]
+    
+    return response
+
+@router.get("/api/user-files")
 async def get_user_files(current_user = Depends(verify_token)):
     """Get all uploaded files for the current user"""
     
-    user = db.users.find_one({"id": current_user["user_id"]})
+    user = db.users.find_one(
+        {"id": current_user["user_id"]},
+        {"id": 1, "profile_picture": 1, "id_document": 1, "resume": 1}
+    )
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -1554,13 +2444,13 @@ async def get_user_files(current_user = Depends(verify_token)):
         "profile_picture": user.get("profile_picture"),
         "id_document": user.get("id_document"),
         "resume": user.get("resume") if current_user["role"] == "freelancer" else None,
-        "portfolio_files": user.get("portfolio_files", []) if current_user["role"] == "freelancer" else [],
-        "project_gallery": user.get("project_gallery", []) if current_user["role"] == "freelancer" else []
+        "portfolio_files": get_portfolio_files(user["id"]) if current_user["role"] == "freelancer" else [],
+        "project_gallery": get_project_gallery(user["id"]) if current_user["role"] == "freelancer" else []
     }
     
     return files_info
 
-@app.delete("/api/delete-portfolio-file/{filename}")
+@router.delete("/api/delete-portfolio-file/{filename}")
 async def delete_portfolio_file(
     filename: str,
     current_user = Depends(verify_token)
@@ -1571,29 +2461,23 @@ async def delete_portfolio_file(
         raise HTTPException(status_code=403, detail="Only freelancers can delete portfolio files")
     
     # Remove from database
-    result = db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$pull": {
-                "portfolio_files": {"filename": filename}
-            }
-        }
+    item = db.portfolio_items.find_one_and_delete(
+        {"owner_id": current_user["user_id"], "kind": "file", "file_info.filename": filename},
+        {"file_info": 1}
     )
     
-    if result.modified_count == 0:
+    if not item:
         raise HTTPException(status_code=404, detail="File not found")
     
-    # Try to delete physical file
-    try:
-        file_path = UPLOAD_DIR / "portfolios" / filename
-        if file_path.exists():
-            file_path.unlink()
-    except Exception as e:
-        print(f"Warning: Could not delete physical file {filename}: {e}")
+    refresh_portfolio_stats(db, current_user["user_id"])
+    invalidate_freelancer_caches(current_user["user_id"])
+    
+    # Try to delete stored file
+    delete_stored_file(item["file_info"], "portfolios")
     
     return {"message": "Portfolio file deleted successfully"}
 
-@app.delete("/api/delete-project-gallery/{project_id}")
+@router.delete("/api/delete-project-gallery/{project_id}")
 async def delete_project_gallery_item(
     project_id: str,
     current_user = Depends(verify_token)
@@ -1604,89 +2488,76 @@ async def delete_project_gallery_item(
         raise HTTPException(status_code=403, detail="Only freelancers can delete project gallery items")
     
     # Find and remove from database
-    user = db.users.find_one({"id": current_user["user_id"]})
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Find the project to get filename for deletion
-    project_to_delete = None
-    for project in user.get("project_gallery", []):
-        if project["id"] == project_id:
-            project_to_delete = project
-            break
+    project_to_delete = db.portfolio_items.find_one_and_delete(
+        {"owner_id": current_user["user_id"], "kind": "project", "id": project_id},
+        {"file_info": 1}
+    )
     
     if not project_to_delete:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    # Remove from database
-    db.users.update_one(
-        {"id": current_user["user_id"]},
-        {
-            "$pull": {
-                "project_gallery": {"id": project_id}
-            }
-        }
-    )
+    refresh_portfolio_stats(db, current_user["user_id"])
+    invalidate_freelancer_caches(current_user["user_id"])
     
-    # Try to delete physical file
-    try:
-        filename = project_to_delete["file_info"]["filename"]
-        file_path = UPLOAD_DIR / "project_gallery" / filename
-        if file_path.exists():
-            file_path.unlink()
-    except Exception as e:
-        print(f"Warning: Could not delete physical file: {e}")
+    # Try to delete stored file
+    delete_stored_file(project_to_delete["file_info"], "project_gallery")
     
     return {"message": "Project gallery item deleted successfully"}
 
 # Enhanced Portfolio Showcase System - Phase 2 Implementation
 
-@app.get("/api/portfolio/showcase/{freelancer_id}")
-async def get_portfolio_showcase(freelancer_id: str):
+@router.get("/api/portfolio/showcase/{freelancer_id}")
+@response_cache.cached("portfolio_showcase", *PUBLIC_CACHE_TTLS["portfolio_showcase"])
+async def get_portfolio_showcase(freelancer_id: str, limit: int = PORTFOLIO_SHOWCASE_LIMIT):
     """Get enhanced portfolio showcase for a freelancer (public endpoint)"""
+    rdb = read_db("portfolio_showcase")
+    
+    limit = min(PORTFOLIO_SHOWCASE_LIMIT, max(1, limit))
     
     # Find the freelancer
-    freelancer = db.users.find_one(
+    freelancer = rdb.users.find_one(
         {"id": freelancer_id, "role": "freelancer"},
-        {"password": 0}  # Exclude password
+        {
+            "id": 1, "full_name": 1, "email": 1, "profile": 1, "is_verified": 1, "profile_picture": 1,
+            "created_at": 1, "portfolio_file_count": 1, "project_count": 1
+        }
     )
     
     if not freelancer:
         raise HTTPException(status_code=404, detail="Freelancer not found")
     
-    # Calculate portfolio statistics
-    portfolio_files = freelancer.get("portfolio_files", [])
-    project_gallery = freelancer.get("project_gallery", [])
+    # Portfolio items, bounded per request
+    portfolio_files = get_portfolio_files(freelancer_id, limit=limit, database=rdb)
+    project_gallery = get_project_gallery(freelancer_id, limit=limit, database=rdb)
+    total_files = freelancer.get("portfolio_file_count", 0)
+    total_projects = freelancer.get("project_count", 0)
     
     # Categorize projects by technology
-    tech_categories = {}
-    total_projects = len(project_gallery)
-    
-    for project in project_gallery:
-        technologies = project.get("technologies", [])
-        for tech in technologies:
-            tech_lower = tech.lower().strip()
-            if tech_lower not in tech_categories:
-                tech_categories[tech_lower] = {
-                    "name": tech,
-                    "count": 0,
-                    "projects": []
-                }
-            tech_categories[tech_lower]["count"] += 1
-            tech_categories[tech_lower]["projects"].append(project["id"])
+    tech_categories = list(rdb.portfolio_items.aggregate([
+        {"$match": {"owner_id": freelancer_id, "kind": "project"}},
+        {"$unwind": "$technologies"},
+        {"$group": {
+            "_id": {"$toLower": "$technologies"},
+            "name": {"$first": "$technologies"},
+            "count": {"$sum": 1},
+            "projects": {"$push": "$id"}
+        }},
+        {"$sort": {"count": -1}}
+    ]))
+    for category in tech_categories:
+        category.pop("_id", None)
     
     # Get recent activity (latest uploads)
-    recent_files = sorted(
-        portfolio_files + [
-            {
-                **project,
+    recent_files = []
+    for item in rdb.portfolio_items.find({"owner_id": freelancer_id}, {"_id": 0}).sort("created_at", -1).limit(10):
+        if item["kind"] == "file":
+            recent_files.append(item["file_info"])
+        else:
+            recent_files.append({
+                **{field: item.get(field) for field in PROJECT_GALLERY_FIELDS if field != "_id"},
                 "type": "project_gallery",
-                "uploaded_at": project["created_at"]
-            } for project in project_gallery
-        ],
-        key=lambda x: x.get("uploaded_at", ""),
-        reverse=True
-    )[:10]
+                "uploaded_at": item["created_at"]
+            })
     
     showcase_data = {
         "freelancer": {
@@ -1699,17 +2570,13 @@ async def get_portfolio_showcase(freelancer_id: str):
             "created_at": freelancer.get("created_at")
         },
         "portfolio_stats": {
-            "total_portfolio_files": len(portfolio_files),
+            "total_portfolio_files": total_files,
             "total_projects": total_projects,
             "total_technologies": len(tech_categories),
-            "portfolio_completion": min(100, (len(portfolio_files) * 20 + total_projects * 30)),
-            "last_updated": max(
-                [f.get("uploaded_at", "") for f in portfolio_files] +
-                [p.get("created_at", "") for p in project_gallery],
-                default=""
-            )
+            "portfolio_completion": min(100, (total_files * 20 + total_projects * 30)),
+            "last_updated": recent_files[0].get("uploaded_at", "") if recent_files else ""
         },
-        "technology_breakdown": list(tech_categories.values())[:10],  # Top 10 technologies
+        "technology_breakdown": tech_categories[:10],  # Top 10 technologies
         "portfolio_files": portfolio_files,
         "project_gallery": project_gallery,
         "recent_activity": recent_files
@@ -1717,57 +2584,37 @@ async def get_portfolio_showcase(freelancer_id: str):
     
     return showcase_data
 
-@app.get("/api/portfolio/featured")
+@router.get("/api/portfolio/featured")
+@response_cache.cached("featured_portfolios", *PUBLIC_CACHE_TTLS["featured_portfolios"])
 async def get_featured_portfolios(limit: int = 12):
     """Get featured portfolios for homepage showcase"""
+    rdb = read_db("featured_portfolios")
     
     # Get verified freelancers with complete portfolios and good ratings
-    pipeline = [
-        {
-            "$match": {
-                "role": "freelancer",
-                "is_verified": True,
-                "$and": [
-                    {"$or": [
-                        {"portfolio_files": {"$exists": True, "$ne": []}},
-                        {"project_gallery": {"$exists": True, "$ne": []}}
-                    ]}
-                ]
-            }
-        },
-        {
-            "$addFields": {
-                "portfolio_score": {
-                    "$add": [
-                        {"$multiply": [{"$size": {"$ifNull": ["$portfolio_files", []]}}, 2]},
-                        {"$multiply": [{"$size": {"$ifNull": ["$project_gallery", []]}}, 5]},
-                        {"$multiply": [{"$ifNull": ["$profile.rating", 3]}, 10]}
-                    ]
-                }
-            }
-        },
-        {"$sort": {"portfolio_score": -1}},
-        {"$limit": limit},
+    # (portfolio_score is materialized, so this walks the (is_verified, portfolio_score) index)
+    featured_freelancers = list(rdb.users.find(
+        {"is_verified": True, "portfolio_score": {"$gt": 0}, "role": "freelancer"},
         {
-            "$project": {
-                "id": 1,
-                "full_name": 1,
-                "profile": 1,
-                "profile_picture": 1,
-                "is_verified": 1,
-                "portfolio_files": {"$slice": ["$portfolio_files", 3]},  # Preview only
-                "project_gallery": {"$slice": ["$project_gallery", 2]},  # Preview only
-                "portfolio_score": 1,
-                "created_at": 1
-            }
+            "id": 1,
+            "full_name": 1,
+            "profile": 1,
+            "profile_picture": 1,
+            "is_verified": 1,
+            "portfolio_file_count": 1,
+            "project_count": 1,
+            "technology_breakdown": 1,
+            "portfolio_score": 1,
+            "created_at": 1
         }
-    ]
+    ).sort("portfolio_score", -1).limit(limit))
     
-    featured_freelancers = list(db.users.aggregate(pipeline))
+    # Attach preview items only
+    previews = get_portfolio_previews([f["id"] for f in featured_freelancers], files_limit=3, projects_limit=2, database=rdb)
     
     # Convert ObjectId to string for JSON serialization
     for freelancer in featured_freelancers:
         freelancer["_id"] = str(freelancer["_id"])
+        freelancer.update(previews[freelancer["id"]])
     
     return {
         "featured_portfolios": featured_freelancers,
@@ -1775,7 +2622,7 @@ async def get_featured_portfolios(limit: int = 12):
         "selection_criteria": "verified_freelancers_with_complete_portfolios"
     }
 
-@app.post("/api/portfolio/category/update")
+@router.post("/api/portfolio/category/update")
 async def update_portfolio_categories(
     categories_data: dict,
     current_user = Depends(verify_token)
@@ -1817,9 +2664,10 @@ async def update_portfolio_categories(
         }
     }
 
-@app.post("/api/portfolio/search/advanced")
+@router.post("/api/portfolio/search/advanced", dependencies=[rate_limited("search_portfolios")])
 async def search_portfolios_advanced(search_data: dict):
     """Advanced portfolio search with filtering capabilities"""
+    rdb = read_db("search_portfolios")
     
     # Extract search parameters
     query = search_data.get("query", "")
@@ -1838,21 +2686,32 @@ async def search_portfolios_advanced(search_data: dict):
     
     # Text search
     if query:
+        project_owner_ids = rdb.portfolio_items.distinct("owner_id", {
+            "kind": "project",
+            "$or": [
+                {"title": {"$regex": query, "$options": "i"}},
+                {"description": {"$regex": query, "$options": "i"}}
+            ]
+        })
         match_conditions["$or"] = [
             {"full_name": {"$regex": query, "$options": "i"}},
             {"profile.bio": {"$regex": query, "$options": "i"}},
             {"profile.skills": {"$elemMatch": {"$regex": query, "$options": "i"}}},
-            {"project_gallery.title": {"$regex": query, "$options": "i"}},
-            {"project_gallery.description": {"$regex": query, "$options": "i"}}
+            {"id": {"$in": project_owner_ids}}
         ]
     
     # Verification filter
     if verified_only:
         match_conditions["is_verified"] = True
     
-    # Location filter
-    if location:
-        match_conditions["profile.location"] = {"$regex": location, "$options": "i"}
+    # Location filter: exact region or radius, regex only for text that isn't a known place
+    try:
+        match_conditions.update(location_filter(
+            location, search_data.get("province"), search_data.get("city"), search_data.get("latitude"),
+            search_data.get("longitude"), search_data.get("radius_km"), text_field="profile.location"
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Rating filter
     if min_rating > 0:
@@ -1870,9 +2729,13 @@ async def search_portfolios_advanced(search_data: dict):
     if technologies:
         tech_conditions = []
         for tech in technologies:
+            tech_owner_ids = rdb.portfolio_items.distinct("owner_id", {
+                "kind": "project",
+                "technologies": {"$elemMatch": {"$regex": tech, "$options": "i"}}
+            })
             tech_conditions.extend([
                 {"profile.skills": {"$elemMatch": {"$regex": tech, "$options": "i"}}},
-                {"project_gallery.technologies": {"$elemMatch": {"$regex": tech, "$options": "i"}}}
+                {"id": {"$in": tech_owner_ids}}
             ])
         if tech_conditions:
             match_conditions["$or"] = match_conditions.get("$or", []) + tech_conditions
@@ -1881,11 +2744,11 @@ async def search_portfolios_advanced(search_data: dict):
         {"$match": match_conditions},
         {
             "$addFields": {
-                "project_count": {"$size": {"$ifNull": ["$project_gallery", []]}},
+                "project_count": {"$ifNull": ["$project_count", 0]},
                 "portfolio_score": {
                     "$add": [
-                        {"$multiply": [{"$size": {"$ifNull": ["$portfolio_files", []]}}, 2]},
-                        {"$multiply": [{"$size": {"$ifNull": ["$project_gallery", []]}}, 3]},
+                        {"$multiply": [{"$ifNull": ["$portfolio_file_count", 0]}, 2]},
+                        {"$multiply": [{"$ifNull": ["$project_count", 0]}, 3]},
                         {"$multiply": [{"$ifNull": ["$profile.rating", 0]}, 10]}
                     ]
                 }
@@ -1899,7 +2762,7 @@ async def search_portfolios_advanced(search_data: dict):
     
     # Get total count for pagination
     count_pipeline = pipeline + [{"$count": "total"}]
-    count_result = list(db.users.aggregate(count_pipeline))
+    count_result = list(rdb.users.aggregate(count_pipeline))
     total = count_result[0]["total"] if count_result else 0
     
     # Add sorting, pagination, and projection
@@ -1914,8 +2777,7 @@ async def search_portfolios_advanced(search_data: dict):
                 "profile": 1,
                 "profile_picture": 1,
                 "is_verified": 1,
-                "portfolio_files": {"$slice": ["$portfolio_files", 3]},
-                "project_gallery": {"$slice": ["$project_gallery", 3]},
+                "portfolio_file_count": 1,
                 "project_count": 1,
                 "portfolio_score": 1,
                 "created_at": 1,
@@ -1924,11 +2786,15 @@ async def search_portfolios_advanced(search_data: dict):
         }
     ])
     
-    results = list(db.users.aggregate(pipeline))
+    results = list(rdb.users.aggregate(pipeline))
+    
+    # Attach preview items only
+    previews = get_portfolio_previews([r["id"] for r in results], files_limit=3, projects_limit=3, database=rdb)
     
     # Convert ObjectId to string for JSON serialization
     for result in results:
         result["_id"] = str(result["_id"])
+        result.update(previews[result["id"]])
     
     return {
         "portfolios": results,
@@ -1942,12 +2808,13 @@ async def search_portfolios_advanced(search_data: dict):
         "results_count": len(results)
     }
 
-@app.get("/api/portfolio/analytics/{freelancer_id}")
+@router.get("/api/portfolio/analytics/{freelancer_id}")
 async def get_portfolio_analytics(
     freelancer_id: str,
     current_user = Depends(verify_token)
 ):
     """Get portfolio analytics for freelancer dashboard"""
+    rdb = read_db("portfolio_analytics")
     
     # Only allow freelancers to view their own analytics or admins to view any
     if current_user["role"] == "freelancer" and current_user["user_id"] != freelancer_id:
@@ -1956,59 +2823,78 @@ async def get_portfolio_analytics(
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     # Get freelancer data
-    freelancer = db.users.find_one({"id": freelancer_id, "role": "freelancer"})
+    freelancer = rdb.users.find_one(
+        {"id": freelancer_id, "role": "freelancer"},
+        {"id": 1, "is_verified": 1, "profile_completed": 1, "created_at": 1}
+    )
     if not freelancer:
         raise HTTPException(status_code=404, detail="Freelancer not found")
     
-    portfolio_files = freelancer.get("portfolio_files", [])
-    project_gallery = freelancer.get("project_gallery", [])
+    document_types = ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+    
+    # Aggregate portfolio items by kind and content type
+    groups = list(rdb.portfolio_items.aggregate([
+        {"$match": {"owner_id": freelancer_id}},
+        {"$group": {
+            "_id": {"kind": "$kind", "content_type": "$file_info.content_type"},
+            "count": {"$sum": 1},
+            "storage": {"$sum": {"$ifNull": ["$file_info.file_size", 0]}},
+            "with_urls": {"$sum": {"$cond": [{"$ifNull": ["$project_url", False]}, 1, 0]}},
+            "technologies": {"$sum": {"$size": {"$ifNull": ["$technologies", []]}}}
+        }}
+    ]))
+    
+    file_groups = [g for g in groups if g["_id"]["kind"] == "file"]
+    project_groups = [g for g in groups if g["_id"]["kind"] == "project"]
+    total_files = sum(g["count"] for g in file_groups)
+    total_projects = sum(g["count"] for g in project_groups)
+    
+    def count_files(predicate):
+        return sum(g["count"] for g in file_groups if predicate(g["_id"].get("content_type") or ""))
     
     # Calculate analytics
     analytics = {
         "overview": {
-            "total_files": len(portfolio_files),
-            "total_projects": len(project_gallery),
+            "total_files": total_files,
+            "total_projects": total_projects,
             "verification_status": freelancer.get("is_verified", False),
             "profile_completion": freelancer.get("profile_completed", False),
             "account_created": freelancer.get("created_at")
         },
         "file_breakdown": {
-            "images": len([f for f in portfolio_files if f.get("content_type", "").startswith("image/")]),
-            "videos": len([f for f in portfolio_files if f.get("content_type", "").startswith("video/")]),
-            "documents": len([f for f in portfolio_files if f.get("content_type", "") in ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]]),
-            "other": len([f for f in portfolio_files if not any([
-                f.get("content_type", "").startswith("image/"),
-                f.get("content_type", "").startswith("video/"),
-                f.get("content_type", "") in ["application/pdf", "application/msword", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
-            ])])
+            "images": count_files(lambda ct: ct.startswith("image/")),
+            "videos": count_files(lambda ct: ct.startswith("video/")),
+            "documents": count_files(lambda ct: ct in document_types),
+            "other": count_files(lambda ct: not (ct.startswith("image/") or ct.startswith("video/") or ct in document_types))
         },
         "project_analytics": {
-            "projects_with_urls": len([p for p in project_gallery if p.get("project_url")]),
-            "avg_technologies_per_project": sum(len(p.get("technologies", [])) for p in project_gallery) / max(1, len(project_gallery)),
+            "projects_with_urls": sum(g["with_urls"] for g in project_groups),
+            "avg_technologies_per_project": sum(g["technologies"] for g in project_groups) / max(1, total_projects),
             "most_used_technologies": {}
         },
         "storage_usage": {
-            "total_storage_mb": sum(f.get("file_size", 0) for f in portfolio_files + [p.get("file_info", {}) for p in project_gallery]) / (1024 * 1024),
+            "total_storage_mb": sum(g["storage"] for g in groups) / (1024 * 1024),
             "storage_by_type": {}
         },
         "recommendations": []
     }
     
     # Technology frequency analysis
-    tech_count = {}
-    for project in project_gallery:
-        for tech in project.get("technologies", []):
-            tech_count[tech] = tech_count.get(tech, 0) + 1
+    tech_counts = rdb.portfolio_items.aggregate([
+        {"$match": {"owner_id": freelancer_id, "kind": "project"}},
+        {"$unwind": "$technologies"},
+        {"$group": {"_id": "$technologies", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 10}
+    ])
     
-    analytics["project_analytics"]["most_used_technologies"] = dict(
-        sorted(tech_count.items(), key=lambda x: x[1], reverse=True)[:10]
-    )
+    analytics["project_analytics"]["most_used_technologies"] = {t["_id"]: t["count"] for t in tech_counts}
     
     # Generate recommendations
     recommendations = []
-    if len(portfolio_files) < 3:
+    if total_files < 3:
         recommendations.append("Upload more portfolio files to showcase your work better")
-    if len(project_gallery) < 2:
+    if total_projects < 2:
         recommendations.append("Add project gallery items with detailed descriptions")
     if not freelancer.get("is_verified"):
         recommendations.append("Complete verification to increase client trust")
@@ -2017,9 +2903,149 @@ async def get_portfolio_analytics(
     
     analytics["recommendations"] = recommendations
     
-    return analytics
+    return analytics
+
+def verification_emails(user: dict, status: str, reason: str, admin_notes: str, admin_name: str) -> tuple:
+    """(user subject, user body, admin subject, admin body) for an approved or rejected verification"""
+    if status == "approved":
+        # Email to user - Approval
+        user_subject = "🎉 Your Afrilance Account Has Been Verified!"
+        user_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <div style="text-align: center; margin-bottom: 30px;">
+                    <h1 style="color: #27ae60; margin-bottom: 10px;">🎉 Congratulations!</h1>
+                    <h2 style="color: #2c3e50;">Your Account Has Been Verified</h2>
+                </div>
+
+                <div style="background-color: #e8f5e8; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <p>Dear {user['full_name']},</p>
+                    <p>Great news! Your Afrilance freelancer account has been successfully verified. You now have access to all premium features and can apply for high-value projects.</p>
+                </div>
+
+                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="color: #2c3e50; margin-top: 0;">What's Next?</h3>
+                    <ul style="color: #555;">
+                        <li>✅ Complete your profile with skills and portfolio</li>
+                        <li>✅ Browse and apply for premium projects</li>
+                        <li>✅ Set your competitive rates</li>
+                        <li>✅ Start building your reputation</li>
+                    </ul>
+                </div>
+
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="https://sa-freelance-hub.preview.emergentagent.com/freelancer-dashboard" 
+                       style="background-color: #27ae60; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; font-weight: bold;">
+                        Go to Your Dashboard
+                    </a>
+                </div>
+
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; color: #666;">
+                    <p>Welcome to the Afrilance community!</p>
+                    <p>Need help? Contact us at support@afrilance.co.za</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+        # Email to admin - Verification Completed
+        admin_subject = f"✅ User Verification Approved - {user['full_name']}"
+        admin_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #27ae60;">✅ User Verification Approved</h2>
+
+                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="margin-top: 0;">User Details:</h3>
+                    <p><strong>Name:</strong> {user['full_name']}</p>
+                    <p><strong>Email:</strong> {user['email']}</p>
+                    <p><strong>User ID:</strong> {user['id']}</p>
+                    <p><strong>Approved by:</strong> {admin_name}</p>
+                    <p><strong>Approval Date:</strong> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                </div>
+
+                {f'<div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3 style="margin-top: 0;">Admin Notes:</h3><p>{admin_notes}</p></div>' if admin_notes else ''}
+
+                <p>The user has been notified of their approval and can now access all verified freelancer features.</p>
+            </div>
+        </body>
+        </html>
+        """
+
+    else:  # rejected
+        # Email to user - Rejection
+        user_subject = "Afrilance Verification Update Required"
+        user_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #e74c3c;">Verification Update Required</h2>
+
+                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <p>Dear {user['full_name']},</p>
+                    <p>Thank you for submitting your verification documents. We need some additional information or updates before we can complete your verification.</p>
+                </div>
+
+                {f'<div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ffc107;"><h3 style="margin-top: 0; color: #856404;">What needs to be updated:</h3><p>{reason}</p></div>' if reason else ''}
+
+                <div style="background-color: #e8f4f8; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="color: #2c3e50; margin-top: 0;">Next Steps:</h3>
+                    <ol style="color: #555;">
+                        <li>Review the feedback above</li>
+                        <li>Update your documents/information as needed</li>
+                        <li>Resubmit for verification</li>
+                        <li>Our team will review within 24-48 hours</li>
+                    </ol>
+                </div>
+
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="https://sa-freelance-hub.preview.emergentagent.com/freelancer-dashboard" 
+                       style="background-color: #3498db; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; font-weight: bold;">
+                        Update Verification
+                    </a>
+                </div>
+
+                <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; color: #666;">
+                    <p>Need help? Contact us at sam@afrilance.co.za</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+        # Email to admin - Verification Rejected
+        admin_subject = f"❌ User Verification Rejected - {user['full_name']}"
+        admin_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2 style="color: #e74c3c;">❌ User Verification Rejected</h2>
+
+                <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
+                    <h3 style="margin-top: 0;">User Details:</h3>
+                    <p><strong>Name:</strong> {user['full_name']}</p>
+                    <p><strong>Email:</strong> {user['email']}</p>
+                    <p><strong>User ID:</strong> {user['id']}</p>
+                    <p><strong>Rejected by:</strong> {admin_name}</p>
+                    <p><strong>Rejection Date:</strong> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}</p>
+                </div>
+
+                {f'<div style="background-color: #f8d7da; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3 style="margin-top: 0; color: #721c24;">Rejection Reason:</h3><p>{reason}</p></div>' if reason else ''}
+
+                {f'<div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3 style="margin-top: 0;">Admin Notes:</h3><p>{admin_notes}</p></div>' if admin_notes else ''}
+
+                <p>The user has been notified and can resubmit their verification documents after addressing the issues.</p>
+            </div>
+        </body>
+        </html>
+        """
+    
+    return user_subject, user_body, admin_subject, admin_body
 
-@app.post("/api/admin/verify-user/{user_id}")
+@router.post("/api/admin/verify-user/{user_id}")
 async def verify_user(
     user_id: str,
     verification_data: dict,
@@ -2058,152 +3084,30 @@ async def verify_user(
         {"$set": update_data}
     )
     
+    # Verification decides whether the freelancer can be featured
+    refresh_portfolio_stats(db, user_id)
+    invalidate_freelancer_caches(user_id)
+    user_fanout.submit(user_id)
+    
+    activity_log.emit(
+        "user_verification", f"Verification {status} for {user['full_name']}",
+        actor_id=current_user["user_id"], user_id=user_id
+    )
+    
     # Send notification emails
     try:
-        if status == "approved":
-            # Email to user - Approval
-            user_subject = "🎉 Your Afrilance Account Has Been Verified!"
-            user_body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <div style="text-align: center; margin-bottom: 30px;">
-                        <h1 style="color: #27ae60; margin-bottom: 10px;">🎉 Congratulations!</h1>
-                        <h2 style="color: #2c3e50;">Your Account Has Been Verified</h2>
-                    </div>
-                    
-                    <div style="background-color: #e8f5e8; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <p>Dear {user['full_name']},</p>
-                        <p>Great news! Your Afrilance freelancer account has been successfully verified. You now have access to all premium features and can apply for high-value projects.</p>
-                    </div>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="color: #2c3e50; margin-top: 0;">What's Next?</h3>
-                        <ul style="color: #555;">
-                            <li>✅ Complete your profile with skills and portfolio</li>
-                            <li>✅ Browse and apply for premium projects</li>
-                            <li>✅ Set your competitive rates</li>
-                            <li>✅ Start building your reputation</li>
-                        </ul>
-                    </div>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <a href="https://sa-freelance-hub.preview.emergentagent.com/freelancer-dashboard" 
-                           style="background-color: #27ae60; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; font-weight: bold;">
-                            Go to Your Dashboard
-                        </a>
-                    </div>
-                    
-                    <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; color: #666;">
-                        <p>Welcome to the Afrilance community!</p>
-                        <p>Need help? Contact us at support@afrilance.co.za</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Email to admin - Verification Completed
-            admin_subject = f"✅ User Verification Approved - {user['full_name']}"
-            admin_body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #27ae60;">✅ User Verification Approved</h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0;">User Details:</h3>
-                        <p><strong>Name:</strong> {user['full_name']}</p>
-                        <p><strong>Email:</strong> {user['email']}</p>
-                        <p><strong>User ID:</strong> {user['id']}</p>
-                        <p><strong>Approved by:</strong> {current_user.get('full_name', current_user['user_id'])}</p>
-                        <p><strong>Approval Date:</strong> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                    </div>
-                    
-                    {f'<div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3 style="margin-top: 0;">Admin Notes:</h3><p>{admin_notes}</p></div>' if admin_notes else ''}
-                    
-                    <p>The user has been notified of their approval and can now access all verified freelancer features.</p>
-                </div>
-            </body>
-            </html>
-            """
-            
-        else:  # rejected
-            # Email to user - Rejection
-            user_subject = "Afrilance Verification Update Required"
-            user_body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #e74c3c;">Verification Update Required</h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <p>Dear {user['full_name']},</p>
-                        <p>Thank you for submitting your verification documents. We need some additional information or updates before we can complete your verification.</p>
-                    </div>
-                    
-                    {f'<div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0; border-left: 4px solid #ffc107;"><h3 style="margin-top: 0; color: #856404;">What needs to be updated:</h3><p>{reason}</p></div>' if reason else ''}
-                    
-                    <div style="background-color: #e8f4f8; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="color: #2c3e50; margin-top: 0;">Next Steps:</h3>
-                        <ol style="color: #555;">
-                            <li>Review the feedback above</li>
-                            <li>Update your documents/information as needed</li>
-                            <li>Resubmit for verification</li>
-                            <li>Our team will review within 24-48 hours</li>
-                        </ol>
-                    </div>
-                    
-                    <div style="text-align: center; margin: 30px 0;">
-                        <a href="https://sa-freelance-hub.preview.emergentagent.com/freelancer-dashboard" 
-                           style="background-color: #3498db; color: white; padding: 15px 30px; text-decoration: none; border-radius: 5px; display: inline-block; font-weight: bold;">
-                            Update Verification
-                        </a>
-                    </div>
-                    
-                    <div style="margin-top: 30px; padding-top: 20px; border-top: 1px solid #ddd; text-align: center; color: #666;">
-                        <p>Need help? Contact us at sam@afrilance.co.za</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Email to admin - Verification Rejected
-            admin_subject = f"❌ User Verification Rejected - {user['full_name']}"
-            admin_body = f"""
-            <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #e74c3c;">❌ User Verification Rejected</h2>
-                    
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px; margin: 20px 0;">
-                        <h3 style="margin-top: 0;">User Details:</h3>
-                        <p><strong>Name:</strong> {user['full_name']}</p>
-                        <p><strong>Email:</strong> {user['email']}</p>
-                        <p><strong>User ID:</strong> {user['id']}</p>
-                        <p><strong>Rejected by:</strong> {current_user.get('full_name', current_user['user_id'])}</p>
-                        <p><strong>Rejection Date:</strong> {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}</p>
-                    </div>
-                    
-                    {f'<div style="background-color: #f8d7da; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3 style="margin-top: 0; color: #721c24;">Rejection Reason:</h3><p>{reason}</p></div>' if reason else ''}
-                    
-                    {f'<div style="background-color: #fff3cd; padding: 20px; border-radius: 8px; margin: 20px 0;"><h3 style="margin-top: 0;">Admin Notes:</h3><p>{admin_notes}</p></div>' if admin_notes else ''}
-                    
-                    <p>The user has been notified and can resubmit their verification documents after addressing the issues.</p>
-                </div>
-            </body>
-            </html>
-            """
+        user_subject, user_body, admin_subject, admin_body = verification_emails(
+            user, status, reason, admin_notes, current_user.get('full_name', current_user['user_id'])
+        )
         
         # Send emails
         user_email_sent = send_email(user['email'], user_subject, user_body)
         admin_email_sent = send_email("sam@afrilance.co.za", admin_subject, admin_body)
         
-        print(f"📧 Verification emails sent - User: {user_email_sent}, Admin: {admin_email_sent}")
+        logger.info("Verification emails sent for user %s - User: %s, Admin: %s", user_id, user_email_sent, admin_email_sent)
         
     except Exception as e:
-        print(f"❌ Error sending verification emails: {str(e)}")
+        logger.error("Error sending verification emails for user %s: %s", user_id, e)
     
     return {
         "message": f"User verification {status} successfully",
@@ -2212,7 +3116,114 @@ async def verify_user(
         "verification_date": update_data["verification_date"]
     }
 
-@app.get("/api/user/verification-status")
+def bulk_moderation_users(user_ids: List[str], projection: dict) -> tuple:
+    """Validated, de-duplicated ids and the matching users by id, read in one query"""
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        raise HTTPException(status_code=400, detail="user_ids must not be empty")
+    if len(user_ids) > BULK_MODERATION_MAX_USERS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MODERATION_MAX_USERS} users per request")
+    users = {user["id"]: user for user in db.users.find({"id": {"$in": user_ids}}, {"_id": 0, "id": 1, **projection})}
+    return user_ids, users
+
+def bulk_update_users(updates: Dict[str, dict]) -> Dict[str, str]:
+    """Apply one update per user id in a single unordered bulk_write; returns the errors by user id"""
+    user_ids = list(updates)
+    if not user_ids:
+        return {}
+    try:
+        db.users.bulk_write([UpdateOne({"id": user_id}, updates[user_id]) for user_id in user_ids], ordered=False)
+    except BulkWriteError as e:
+        return {user_ids[error["index"]]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+    return {}
+
+@router.post("/api/admin/users/bulk-verify")
+async def bulk_verify_users(request: BulkVerificationRequest, current_user = Depends(verify_token)):
+    """Approve or reject many user verifications at once; notification emails are queued"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can verify users")
+    
+    if request.status not in ["approved", "rejected"]:
+        raise HTTPException(status_code=400, detail="Status must be 'approved' or 'rejected'")
+    
+    user_ids, users = bulk_moderation_users(request.user_ids, {"full_name": 1, "email": 1, "verification_status": 1})
+    
+    update_data = {
+        "verification_status": request.status,
+        "is_verified": request.status == "approved",
+        "verification_date": datetime.utcnow(),
+        "verified_by": current_user["user_id"],
+        "verification_reason": request.reason,
+        "admin_notes": request.admin_notes
+    }
+    # Users already in the requested state are left alone and not emailed again
+    changes = [user_id for user_id, user in users.items() if user.get("verification_status") != request.status]
+    errors = bulk_update_users({user_id: {"$set": update_data} for user_id in changes})
+    
+    # Portfolio stats and cached listings are refreshed once for the whole batch
+    changed = [user_id for user_id in changes if user_id not in errors]
+    if changed:
+        refresh_portfolio_stats_many(db, changed)
+        invalidate_freelancer_caches(*changed)
+    
+    admin_name = current_user.get('full_name', current_user['user_id'])
+    results = []
+    verified = []
+    for user_id in user_ids:
+        if user_id not in users:
+            results.append({"user_id": user_id, "result": "not_found"})
+            continue
+        if user_id in errors:
+            results.append({"user_id": user_id, "result": "error", "error": errors[user_id]})
+            continue
+        if user_id not in changes:
+            results.append({"user_id": user_id, "result": "unchanged"})
+            continue
+        
+        user = users[user_id]
+        user_fanout.submit(user_id)
+        activity_log.emit(
+            "user_verification", f"Verification {request.status} for {user['full_name']}",
+            actor_id=current_user["user_id"], user_id=user_id
+        )
+        
+        user_subject, user_body, _, _ = verification_emails(user, request.status, request.reason, request.admin_notes, admin_name)
+        email_queued = email_queue.enqueue(user["email"], user_subject, user_body)
+        results.append({"user_id": user_id, "result": "updated", "email_queued": email_queued})
+        verified.append(user)
+    
+    if verified:
+        # One summary for the admin inbox instead of an email per user
+        rows = "".join(
+            f"<li>{user['full_name']} ({user['email']}) - {user['id']}</li>" for user in verified
+        )
+        admin_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+            <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+                <h2>User Verifications {request.status.title()}</h2>
+                <p><strong>{request.status.title()} by:</strong> {admin_name}</p>
+                <p><strong>Date:</strong> {update_data['verification_date'].strftime('%Y-%m-%d %H:%M:%S')}</p>
+                {f'<p><strong>Reason:</strong> {request.reason}</p>' if request.reason else ''}
+                {f'<p><strong>Admin Notes:</strong> {request.admin_notes}</p>' if request.admin_notes else ''}
+                <ul>{rows}</ul>
+            </div>
+        </body>
+        </html>
+        """
+        email_queue.enqueue(
+            "sam@afrilance.co.za", f"User Verifications {request.status.title()} - {len(verified)} users", admin_body
+        )
+    
+    return {
+        "message": f"{len(verified)} of {len(user_ids)} user verifications {request.status}",
+        "status": request.status,
+        "requested": len(user_ids),
+        "updated": len(verified),
+        "results": results
+    }
+
+@router.get("/api/user/verification-status")
 async def get_verification_status(current_user = Depends(verify_token)):
     """Get current user's verification status"""
     
@@ -2233,7 +3244,7 @@ async def get_verification_status(current_user = Depends(verify_token)):
     
     return verification_info
 
-@app.post("/api/admin/login")
+@router.post("/api/admin/login", dependencies=[rate_limited("admin_login")])
 async def admin_login(user_data: UserLogin):
     """Dedicated admin login endpoint with additional security"""
     
@@ -2292,7 +3303,7 @@ async def admin_login(user_data: UserLogin):
     
     return {"token": token, "user": user_response}
 
-@app.post("/api/admin/register-request")
+@router.post("/api/admin/register-request", dependencies=[rate_limited("admin_register_request")])
 async def admin_register_request(request_data: dict):
     """Handle admin access requests - requires approval"""
     
@@ -2329,6 +3340,7 @@ async def admin_register_request(request_data: dict):
         "email": email,
         "password": hashed_password,
         "full_name": full_name,
+        "search_prefixes": search_prefixes(full_name, email),
         "phone": phone,
         "role": "admin",
         "department": department,
@@ -2342,6 +3354,11 @@ async def admin_register_request(request_data: dict):
     # Save to database
     db.users.insert_one(user_data)
     
+    activity_log.emit(
+        "user_registration", f"Admin access requested by {full_name} ({department})",
+        actor_id=user_id, user_id=user_id
+    )
+    
     # Send approval request email to sam@afrilance.co.za
     try:
         approval_subject = f"🔐 New Admin Access Request - {full_name}"
@@ -2415,12 +3432,12 @@ async def admin_register_request(request_data: dict):
         email_sent = send_email("sam@afrilance.co.za", approval_subject, approval_body)
         
         if email_sent:
-            print(f"✅ Admin approval request sent to sam@afrilance.co.za for {full_name}")
+            logger.info("Admin approval request sent for %s", user_id)
         else:
-            print(f"❌ Failed to send admin approval request for {full_name}")
+            logger.error("Failed to send admin approval request for %s", user_id)
     
     except Exception as e:
-        print(f"❌ Error sending admin approval email: {str(e)}")
+        logger.error("Error sending admin approval email for %s: %s", user_id, e)
     
     return {
         "message": "Admin access request submitted successfully. You will be notified once reviewed.",
@@ -2428,7 +3445,7 @@ async def admin_register_request(request_data: dict):
         "status": "pending_approval"
     }
 
-@app.post("/api/admin/approve-admin/{user_id}")
+@router.post("/api/admin/approve-admin/{user_id}")
 async def approve_admin_request(
     user_id: str,
     approval_data: dict,
@@ -2587,10 +3604,10 @@ async def approve_admin_request(
         
         admin_email_sent = send_email("sam@afrilance.co.za", admin_subject, admin_body)
         
-        print(f"📧 Admin approval emails sent - User: {user_email_sent}, Admin: {admin_email_sent}")
+        logger.info("Admin approval emails sent for %s - User: %s, Admin: %s", user_id, user_email_sent, admin_email_sent)
         
     except Exception as e:
-        print(f"❌ Error sending admin approval emails: {str(e)}")
+        logger.error("Error sending admin approval emails for %s: %s", user_id, e)
     
     return {
         "message": f"Admin request {status} successfully",
@@ -2599,7 +3616,7 @@ async def approve_admin_request(
         "approval_date": update_data["admin_approval_date"]
     }
 
-@app.post("/api/support")
+@router.post("/api/support", dependencies=[rate_limited("support")])
 async def submit_support_ticket(ticket: SupportTicket):
     # Generate sequential ticket number
     ticket_number = get_next_ticket_number()
@@ -2618,6 +3635,11 @@ async def submit_support_ticket(ticket: SupportTicket):
     
     db.support_tickets.insert_one(ticket_data)
     
+    activity_log.emit(
+        "support_ticket", f"Support ticket #{ticket_number} from {ticket.name} - Status: open",
+        ticket_id=ticket_data["id"]
+    )
+    
     # Try to send email but don't block if it fails
     email_sent = False
     try:
@@ -2636,9 +3658,9 @@ async def submit_support_ticket(ticket: SupportTicket):
         if EMAIL_PASS:
             email_sent = send_email("sam@afrilance.co.za", subject, body)
         else:
-            print("Email not configured, skipping email notification")
+            logger.info("Email not configured, skipping support ticket notification")
     except Exception as e:
-        print(f"Email sending failed: {e}")
+        logger.error("Support ticket email failed: %s", e)
         email_sent = False
     
     return {
@@ -2650,7 +3672,7 @@ async def submit_support_ticket(ticket: SupportTicket):
 
 # Wallet Management Endpoints
 
-@app.get("/api/wallet")
+@router.get("/api/wallet")
 async def get_wallet(current_user = Depends(verify_token)):
     """Get wallet information for current user"""
     wallet = db.wallets.find_one({"user_id": current_user["user_id"]})
@@ -2675,7 +3697,7 @@ async def get_wallet(current_user = Depends(verify_token)):
     wallet.pop("_id", None)
     return wallet
 
-@app.post("/api/wallet/withdraw")
+@router.post("/api/wallet/withdraw")
 async def withdraw_funds(withdrawal: WithdrawalRequest, current_user = Depends(verify_token)):
     """Withdraw funds from available balance (Freelancer only)"""
     if current_user["role"] != "freelancer":
@@ -2714,7 +3736,7 @@ async def withdraw_funds(withdrawal: WithdrawalRequest, current_user = Depends(v
         "remaining_balance": wallet["available_balance"] - withdrawal.amount
     }
 
-@app.post("/api/wallet/release-escrow")
+@router.post("/api/wallet/release-escrow")
 async def release_escrow(release: EscrowRelease, current_user = Depends(verify_token)):
     """Release escrow funds to available balance (Admin or Contract completion)"""
     # Only admin can manually release escrow OR system-triggered contract completion
@@ -2768,6 +3790,13 @@ async def release_escrow(release: EscrowRelease, current_user = Depends(verify_t
             }
         }
     )
+    response_cache.invalidate("freelancer_public_profile", {"freelancer_id": contract["freelancer_id"]})
+    
+    activity_log.emit(
+        "escrow_released", f"Escrow released: R{contract_amount:,.2f} for contract {release.contract_id}",
+        actor_id=current_user["user_id"], user_id=contract["freelancer_id"],
+        job_id=contract.get("job_id"), contract_id=release.contract_id
+    )
     
     return {
         "message": "Escrow released successfully",
@@ -2775,12 +3804,14 @@ async def release_escrow(release: EscrowRelease, current_user = Depends(verify_t
         "contract_id": release.contract_id
     }
 
-@app.get("/api/freelancers/featured")
+@router.get("/api/freelancers/featured")
+@response_cache.cached("featured_freelancers", *PUBLIC_CACHE_TTLS["featured_freelancers"])
 async def get_featured_freelancers():
     """Get featured freelancers for homepage"""
+    rdb = read_db("featured_freelancers")
     try:
         # Get verified freelancers with highest ratings
-        freelancers = list(db.users.find(
+        freelancers = list(rdb.users.find(
             {"role": "freelancer", "is_verified": True},
             {"password": 0}  # Exclude password
         ).sort([("rating", -1), ("created_at", -1)]).limit(8))
@@ -2839,11 +3870,12 @@ async def get_featured_freelancers():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching featured freelancers: {str(e)}")
 
-@app.get("/api/freelancers/public")
+@router.get("/api/freelancers/public")
 async def get_public_freelancers():
     """Get all public freelancer profiles (for clients to browse)"""
+    rdb = read_db("public_freelancers")
     try:
-        freelancers = list(db.users.find(
+        freelancers = list(rdb.users.find(
             {"role": "freelancer", "is_verified": True},
             {"password": 0, "id_document": 0}  # Exclude sensitive data
         ).sort([("rating", -1), ("created_at", -1)]))
@@ -2877,10 +3909,12 @@ async def get_public_freelancers():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching public freelancers: {str(e)}")
 
-@app.get("/api/freelancers/{freelancer_id}/public")
+@router.get("/api/freelancers/{freelancer_id}/public")
+@response_cache.cached("freelancer_public_profile", *PUBLIC_CACHE_TTLS["freelancer_public_profile"])
 async def get_freelancer_public_profile(freelancer_id: str):
     """Get a specific freelancer's public profile"""
-    freelancer = db.users.find_one(
+    rdb = read_db("freelancer_public_profile")
+    freelancer = rdb.users.find_one(
         {"id": freelancer_id, "role": "freelancer", "is_verified": True},
         {"password": 0, "id_document": 0}
     )
@@ -2889,7 +3923,7 @@ async def get_freelancer_public_profile(freelancer_id: str):
         raise HTTPException(status_code=404, detail="Freelancer not found")
     
     # Get freelancer's completed projects/reviews
-    contracts = list(db.contracts.find(
+    contracts = list(rdb.contracts.find(
         {"freelancer_id": freelancer_id, "status": "Completed"}
     ))
     
@@ -2904,9 +3938,11 @@ async def get_freelancer_public_profile(freelancer_id: str):
         "is_verified": freelancer["is_verified"]
     }
 
-@app.get("/api/categories/counts")
+@router.get("/api/categories/counts")
+@response_cache.cached("category_counts", *PUBLIC_CACHE_TTLS["category_counts"])
 async def get_category_counts():
     """Get freelancer counts for each category (public endpoint)"""
+    rdb = read_db("category_counts")
     try:
         # Define the categories that match the frontend
         categories = [
@@ -2919,7 +3955,7 @@ async def get_category_counts():
         
         # Count verified freelancers for each category
         for category in categories:
-            count = db.users.count_documents({
+            count = rdb.users.count_documents({
                 "role": "freelancer",
                 "is_verified": True,
                 "profile.category": category
@@ -2927,8 +3963,8 @@ async def get_category_counts():
             category_counts[category] = count
         
         # Also get total counts
-        total_freelancers = db.users.count_documents({"role": "freelancer", "is_verified": True})
-        total_jobs = db.jobs.count_documents({"status": "active"})
+        total_freelancers = rdb.users.count_documents({"role": "freelancer", "is_verified": True})
+        total_jobs = rdb.jobs.count_documents({"status": "active"})
         
         return {
             "category_counts": category_counts,
@@ -2941,7 +3977,7 @@ async def get_category_counts():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching category counts: {str(e)}")
 
-@app.get("/api/wallet/transactions")
+@router.get("/api/wallet/transactions")
 async def get_transaction_history(current_user = Depends(verify_token)):
     """Get transaction history for current user's wallet"""
     wallet = db.wallets.find_one({"user_id": current_user["user_id"]})
@@ -2960,7 +3996,7 @@ async def get_transaction_history(current_user = Depends(verify_token)):
 
 # Phase 2: Advanced Features Endpoints
 
-@app.post("/api/reviews")
+@router.post("/api/reviews")
 async def create_review(review_data: ReviewCreate, current_user = Depends(verify_token)):
     """Create a review for a completed contract"""
     try:
@@ -3028,6 +4064,19 @@ async def create_review(review_data: ReviewCreate, current_user = Depends(verify
                     }
                 }
             )
+            
+            # Rating feeds the featured portfolio score
+            refresh_portfolio_stats(db, reviewed_user_id)
+            invalidate_freelancer_caches(reviewed_user_id)
+            # and is copied onto the user's applications for ranking
+            user_fanout.submit(reviewed_user_id)
+            
+            # Clients' ratings are shown on their open jobs
+            if db.jobs.update_many(
+                {"client_id": reviewed_user_id, "status": "open"},
+                {"$set": {"client_rating": round(avg_rating, 1)}}
+            ).modified_count:
+                response_cache.invalidate("open_jobs")
         
         return {
             "message": "Review created successfully",
@@ -3039,7 +4088,7 @@ async def create_review(review_data: ReviewCreate, current_user = Depends(verify
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating review: {str(e)}")
 
-@app.get("/api/reviews/{user_id}")
+@router.get("/api/reviews/{user_id}")
 async def get_user_reviews(user_id: str, skip: int = 0, limit: int = 10):
     """Get reviews for a specific user"""
     try:
@@ -3107,9 +4156,10 @@ async def get_user_reviews(user_id: str, skip: int = 0, limit: int = 10):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching reviews: {str(e)}")
 
-@app.get("/api/admin/revenue-analytics")
+@router.get("/api/admin/revenue-analytics")
 async def get_revenue_analytics(current_user = Depends(verify_token)):
     """Get comprehensive revenue analytics for admin dashboard"""
+    rdb = read_db("revenue_analytics")
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
@@ -3118,7 +4168,7 @@ async def get_revenue_analytics(current_user = Depends(verify_token)):
         PLATFORM_COMMISSION_RATE = 0.05
         
         # Get all completed contracts
-        completed_contracts = list(db.contracts.find({"status": "Completed"}))
+        completed_contracts = list(rdb.contracts.find({"status": "Completed"}))
         
         # Calculate total revenue metrics
         total_contract_value = sum(contract.get("amount", 0) for contract in completed_contracts)
@@ -3133,7 +4183,7 @@ async def get_revenue_analytics(current_user = Depends(verify_token)):
                 "total_wallets": {"$sum": 1}
             }}
         ]
-        wallet_stats = list(db.wallets.aggregate(wallet_pipeline))
+        wallet_stats = list(rdb.wallets.aggregate(wallet_pipeline))
         wallet_totals = wallet_stats[0] if wallet_stats else {"total_available": 0, "total_escrow": 0, "total_wallets": 0}
         
         # Get transaction analytics
@@ -3145,7 +4195,7 @@ async def get_revenue_analytics(current_user = Depends(verify_token)):
                 "count": {"$sum": 1}
             }}
         ]
-        transaction_stats = list(db.wallets.aggregate(transaction_pipeline))
+        transaction_stats = list(rdb.wallets.aggregate(transaction_pipeline))
         
         # Monthly revenue (last 6 months)
         six_months_ago = datetime.utcnow() - timedelta(days=180)
@@ -3180,7 +4230,7 @@ async def get_revenue_analytics(current_user = Depends(verify_token)):
         top_freelancers = []
         for freelancer_id, stats in sorted(freelancer_revenue.items(), 
                                          key=lambda x: x[1]["total"], reverse=True)[:10]:
-            freelancer = db.users.find_one({"id": freelancer_id}, {"full_name": 1, "email": 1})
+            freelancer = rdb.users.find_one({"id": freelancer_id}, {"full_name": 1, "email": 1})
             if freelancer:
                 top_freelancers.append({
                     "freelancer_id": freelancer_id,
@@ -3212,12 +4262,76 @@ async def get_revenue_analytics(current_user = Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching revenue analytics: {str(e)}")
 
-@app.post("/api/search/jobs/advanced")
-async def advanced_job_search(search_params: AdvancedJobSearch, skip: int = 0, limit: int = 20):
-    """Advanced job search with multiple filters"""
+def search_location_conditions(search_params, text_field: str) -> dict:
+    """Region/radius conditions for a search model, with invalid location parameters reported as 400"""
+    try:
+        return location_filter(
+            search_params.location, search_params.province, search_params.city,
+            search_params.latitude, search_params.longitude, search_params.radius_km, text_field=text_field
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def job_search_filters(search_params: AdvancedJobSearch) -> dict:
+    """The search's filters in a canonical form, used as the facet cache key"""
+    return {
+        # Matched as a case-insensitive regex, so the text is kept exactly as sent
+        "query": search_params.query or "",
+        "category": search_params.category or "all",
+        "budget_min": search_params.budget_min,
+        "budget_max": search_params.budget_max,
+        "budget_type": search_params.budget_type or "all",
+        "skills": tuple(sorted(set(search_params.skills or []))),
+        "location": search_params.location or "",
+        "province": search_params.province,
+        "city": search_params.city,
+        "latitude": search_params.latitude,
+        "longitude": search_params.longitude,
+        "radius_km": search_params.radius_km,
+        "posted_within_days": search_params.posted_within_days
+    }
+
+def job_facet_stages() -> dict:
+    """$facet sub-pipelines counting matching jobs per category, budget type, budget range and posting age"""
+    now = datetime.utcnow()
+    return {
+        "total": [{"$count": "count"}],
+        "categories": [{"$group": {"_id": "$category", "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}],
+        "budget_types": [{"$group": {"_id": "$budget_type", "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}],
+        "budget_ranges": [{"$bucket": {
+            "groupBy": "$budget", "boundaries": JOB_BUDGET_BUCKETS, "default": "other", "output": {"count": {"$sum": 1}}
+        }}],
+        "posted_within_days": [{"$group": {"_id": None, **{
+            str(days): {"$sum": {"$cond": [{"$gte": ["$created_at", now - timedelta(days=days)]}, 1, 0]}}
+            for days in JOB_POSTED_WITHIN_DAYS
+        }}}]
+    }
+
+def format_job_facets(result: dict) -> dict:
+    def counts(buckets: list) -> list:
+        return [{"value": bucket["_id"], "count": bucket["count"]} for bucket in buckets if bucket["_id"] is not None]
+    
+    boundaries = {lower: upper for lower, upper in zip(JOB_BUDGET_BUCKETS, JOB_BUDGET_BUCKETS[1:])}
+    posted = result["posted_within_days"][0] if result["posted_within_days"] else {}
+    return {
+        "categories": counts(result["categories"]),
+        "budget_types": counts(result["budget_types"]),
+        "budget_ranges": [
+            {"min": bucket["_id"], "max": None if boundaries[bucket["_id"]] == float("inf") else boundaries[bucket["_id"]],
+             "count": bucket["count"]}
+            for bucket in result["budget_ranges"] if bucket["_id"] in boundaries
+        ],
+        "posted_within_days": [{"days": days, "count": posted.get(str(days), 0)} for days in JOB_POSTED_WITHIN_DAYS]
+    }
+
+@router.post("/api/search/jobs/advanced", dependencies=[rate_limited("search_jobs")])
+async def advanced_job_search(search_params: AdvancedJobSearch, skip: int = 0, limit: int = 20, facets: bool = False):
+    """Advanced job search with multiple filters; facets=true adds result counts per filter value"""
+    rdb = read_db("search_jobs")
+    location_conditions = search_location_conditions(search_params, "location")
     try:
         # Build query
-        query = {"status": "active"}  # Only show active jobs
+        query = {"status": "open"}  # Only show open jobs
         
         # Text search
         if search_params.query:
@@ -3248,6 +4362,9 @@ async def advanced_job_search(search_params: AdvancedJobSearch, skip: int = 0, l
         if search_params.skills and len(search_params.skills) > 0:
             query["requirements"] = {"$in": search_params.skills}
         
+        # Region or radius filter
+        query.update(location_conditions)
+        
         # Posted within days filter
         if search_params.posted_within_days:
             since_date = datetime.utcnow() - timedelta(days=search_params.posted_within_days)
@@ -3257,25 +4374,54 @@ async def advanced_job_search(search_params: AdvancedJobSearch, skip: int = 0, l
         sort_field = search_params.sort_by or "created_at"
         sort_direction = -1 if search_params.sort_order == "desc" else 1
         
-        # Execute query with pagination
-        jobs_cursor = db.jobs.find(query).sort(sort_field, sort_direction).skip(skip).limit(limit)
-        jobs = list(jobs_cursor)
-        
-        total_count = db.jobs.count_documents(query)
+        facet_counts = None
+        if facets:
+            # Page, total and facet counts in one aggregation; the counts are then reused for this filter set
+            # by later pages and sort orders until they expire
+            computed = {}
+            
+            async def compute_facets():
+                result = next(rdb.jobs.aggregate([
+                    {"$match": query},
+                    {"$facet": {
+                        "page": [{"$sort": {sort_field: sort_direction}}, {"$skip": skip}, {"$limit": limit}],
+                        **job_facet_stages()
+                    }}
+                ], allowDiskUse=True))
+                computed["jobs"] = result["page"]
+                return {
+                    "total": result["total"][0]["count"] if result["total"] else 0,
+                    "facets": format_job_facets(result)
+                }
+            
+            summary = await response_cache.get_or_compute(
+                "job_search_facets", job_search_filters(search_params), compute_facets, JOB_SEARCH_FACETS_TTL
+            )
+            total_count = summary["total"]
+            facet_counts = summary["facets"]
+            jobs = computed.get("jobs")
+            if jobs is None:
+                jobs = list(rdb.jobs.find(query).sort(sort_field, sort_direction).skip(skip).limit(limit))
+        else:
+            # Execute query with pagination
+            jobs_cursor = rdb.jobs.find(query).sort(sort_field, sort_direction).skip(skip).limit(limit)
+            jobs = list(jobs_cursor)
+            
+            total_count = rdb.jobs.count_documents(query)
         
-        # Enrich with client information
+        # Client name and rating are stored on the job
+        fill_user_fields(rdb, jobs, "client_id", JOB_CLIENT_FIELDS)
         for job in jobs:
-            client = db.users.find_one({"id": job["client_id"]}, {"full_name": 1, "email": 1, "rating": 1})
-            if client:
+            if "client_name" in job:
                 job["client_info"] = {
-                    "name": client.get("full_name", "Anonymous"),
-                    "rating": client.get("rating", 0)
+                    "name": job["client_name"] or "Anonymous",
+                    "rating": job.get("client_rating", 0)
                 }
             
             # Remove internal fields
             job.pop("_id", None)
         
-        return {
+        response = {
             "jobs": jobs,
             "total": total_count,
             "page": skip // limit + 1,
@@ -3285,16 +4431,22 @@ async def advanced_job_search(search_params: AdvancedJobSearch, skip: int = 0, l
                 "category": search_params.category,
                 "budget_range": f"{search_params.budget_min or 0}-{search_params.budget_max or 'unlimited'}",
                 "skills": search_params.skills,
+                "location": search_params.location,
                 "posted_within_days": search_params.posted_within_days
             }
         }
+        if facet_counts is not None:
+            response["facets"] = facet_counts
+        return response
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in advanced job search: {str(e)}")
 
-@app.post("/api/search/users/advanced")
+@router.post("/api/search/users/advanced", dependencies=[rate_limited("search_users")])
 async def advanced_user_search(search_params: AdvancedUserSearch, skip: int = 0, limit: int = 20):
     """Advanced user search with multiple filters"""
+    rdb = read_db("search_users")
+    location_conditions = search_location_conditions(search_params, "profile.location")
     try:
         # Build query
         query = {}
@@ -3336,19 +4488,18 @@ async def advanced_user_search(search_params: AdvancedUserSearch, skip: int = 0,
         if search_params.availability and search_params.availability != "all":
             query["profile.availability"] = search_params.availability
         
-        # Location filter
-        if search_params.location:
-            query["profile.location"] = {"$regex": search_params.location, "$options": "i"}
+        # Location filter: exact region or radius, regex only for text that isn't a known place
+        query.update(location_conditions)
         
         # Sort configuration
         sort_field = search_params.sort_by or "rating"
         sort_direction = -1 if search_params.sort_order == "desc" else 1
         
         # Execute query with pagination
-        users_cursor = db.users.find(query, {"password": 0}).sort(sort_field, sort_direction).skip(skip).limit(limit)
+        users_cursor = rdb.users.find(query, {"password": 0}).sort(sort_field, sort_direction).skip(skip).limit(limit)
         users = list(users_cursor)
         
-        total_count = db.users.count_documents(query)
+        total_count = rdb.users.count_documents(query)
         
         # Remove internal fields
         for user in users:
@@ -3374,9 +4525,10 @@ async def advanced_user_search(search_params: AdvancedUserSearch, skip: int = 0,
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error in advanced user search: {str(e)}")
 
-@app.post("/api/search/transactions/advanced")
+@router.post("/api/search/transactions/advanced", dependencies=[rate_limited("search_transactions")])
 async def advanced_transaction_search(search_params: TransactionSearch, current_user = Depends(verify_token), skip: int = 0, limit: int = 20):
     """Advanced transaction search for admin and wallet owners"""
+    rdb = read_db("search_transactions")
     try:
         # Only admins can search all transactions, users can only see their own
         if current_user["role"] != "admin" and search_params.user_id != current_user["user_id"]:
@@ -3455,7 +4607,7 @@ async def advanced_transaction_search(search_params: TransactionSearch, current_
         # Count total before pagination
         count_pipeline = pipeline.copy()
         count_pipeline.append({"$count": "total"})
-        count_result = list(db.wallets.aggregate(count_pipeline))
+        count_result = list(rdb.wallets.aggregate(count_pipeline))
         total_count = count_result[0]["total"] if count_result else 0
         
         # Add pagination
@@ -3465,7 +4617,7 @@ async def advanced_transaction_search(search_params: TransactionSearch, current_
         ])
         
         # Execute pipeline
-        transactions = list(db.wallets.aggregate(pipeline))
+        transactions = list(rdb.wallets.aggregate(pipeline))
         
         return {
             "transactions": transactions,
@@ -3485,28 +4637,29 @@ async def advanced_transaction_search(search_params: TransactionSearch, current_
 
 # Admin Dashboard Enhanced Endpoints
 
-@app.get("/api/admin/stats")
+@router.get("/api/admin/stats")
 async def get_admin_stats(current_user = Depends(verify_token)):
     """Get comprehensive admin dashboard statistics"""
+    rdb = read_db("admin_stats")
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
         # User stats
-        total_users = db.users.count_documents({})
-        total_freelancers = db.users.count_documents({"role": "freelancer"})
-        total_clients = db.users.count_documents({"role": "client"})
-        verified_freelancers = db.users.count_documents({"role": "freelancer", "is_verified": True})
+        total_users = rdb.users.count_documents({})
+        total_freelancers = rdb.users.count_documents({"role": "freelancer"})
+        total_clients = rdb.users.count_documents({"role": "client"})
+        verified_freelancers = rdb.users.count_documents({"role": "freelancer", "is_verified": True})
         
         # Job stats
-        total_jobs = db.jobs.count_documents({})
-        active_jobs = db.jobs.count_documents({"status": "active"})
-        completed_jobs = db.jobs.count_documents({"status": "completed"})
+        total_jobs = rdb.jobs.count_documents({})
+        active_jobs = rdb.jobs.count_documents({"status": "active"})
+        completed_jobs = rdb.jobs.count_documents({"status": "completed"})
         
         # Contract stats
-        total_contracts = db.contracts.count_documents({})
-        in_progress_contracts = db.contracts.count_documents({"status": "In Progress"})
-        completed_contracts = db.contracts.count_documents({"status": "Completed"})
+        total_contracts = rdb.contracts.count_documents({})
+        in_progress_contracts = rdb.contracts.count_documents({"status": "In Progress"})
+        completed_contracts = rdb.contracts.count_documents({"status": "Completed"})
         
         # Revenue stats from wallets
         pipeline = [
@@ -3516,17 +4669,17 @@ async def get_admin_stats(current_user = Depends(verify_token)):
                 "total_escrow": {"$sum": "$escrow_balance"}
             }}
         ]
-        wallet_stats = list(db.wallets.aggregate(pipeline))
+        wallet_stats = list(rdb.wallets.aggregate(pipeline))
         total_revenue = (wallet_stats[0]["total_available"] + wallet_stats[0]["total_escrow"]) if wallet_stats else 0
         
         # Support ticket stats
-        open_tickets = db.support_tickets.count_documents({"status": "open"})
-        total_tickets = db.support_tickets.count_documents({})
+        open_tickets = rdb.support_tickets.count_documents({"status": "open"})
+        total_tickets = rdb.support_tickets.count_documents({})
         
         # Growth metrics (last 30 days)
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        new_users_month = db.users.count_documents({"created_at": {"$gte": thirty_days_ago}})
-        new_jobs_month = db.jobs.count_documents({"created_at": {"$gte": thirty_days_ago}})
+        new_users_month = rdb.users.count_documents({"created_at": {"$gte": thirty_days_ago}})
+        new_jobs_month = rdb.jobs.count_documents({"created_at": {"$gte": thirty_days_ago}})
         
         return {
             "users": {
@@ -3560,7 +4713,80 @@ async def get_admin_stats(current_user = Depends(verify_token)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching admin stats: {str(e)}")
 
-@app.get("/api/admin/users/search")
+@router.get("/api/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    """Prometheus scrape endpoint"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    
+    cache_stats = response_cache.stats()
+    extra = counter_lines(
+        "afrilance_response_cache_events_total", "Public response cache lookups and invalidations", "counter",
+        [({"route": route, "event": event}, count)
+         for route, metrics in sorted(cache_stats.items())
+         for event, count in metrics.items() if event != "entries"]
+    )
+    extra += counter_lines(
+        "afrilance_response_cache_entries", "Cached responses currently held per route", "gauge",
+        [({"route": route}, metrics["entries"]) for route, metrics in sorted(cache_stats.items())]
+    )
+    activity_stats = activity_log.stats()
+    extra += counter_lines(
+        "afrilance_activity_events_total", "Activity log events by outcome", "counter",
+        [({"outcome": "written"}, activity_stats["written"]), ({"outcome": "dropped"}, activity_stats["dropped"])]
+    )
+    extra += counter_lines(
+        "afrilance_activity_events_queued", "Activity log events waiting to be written", "gauge",
+        [({}, activity_stats["queued"])]
+    )
+    fanout_stats = user_fanout.stats()
+    extra += counter_lines(
+        "afrilance_user_fanout_documents_updated_total", "Documents whose copied user fields were rewritten", "counter",
+        [({}, fanout_stats["updated"])]
+    )
+    extra += counter_lines(
+        "afrilance_user_fanout_queued", "Users waiting for their copied fields to be rewritten", "gauge",
+        [({}, fanout_stats["queued"])]
+    )
+    email_stats = email_queue.stats()
+    extra += counter_lines(
+        "afrilance_email_queue_emails_total", "Queued emails by outcome", "counter",
+        [({"outcome": outcome}, email_stats[outcome]) for outcome in ("sent", "failed", "dropped")]
+    )
+    extra += counter_lines(
+        "afrilance_email_queue_queued", "Emails waiting to be sent", "gauge",
+        [({}, email_stats["queued"])]
+    )
+    recommender_stats = job_recommender.stats()
+    extra += counter_lines(
+        "afrilance_job_recommender_jobs", "Open jobs in this worker's recommendation index", "gauge",
+        [({}, recommender_stats["jobs"])]
+    )
+    extra += counter_lines(
+        "afrilance_job_recommender_queries_total", "Recommendation requests served by this worker", "counter",
+        [({}, recommender_stats["queries"])]
+    )
+    extra += counter_lines(
+        "afrilance_rate_limit_requests_total", "Rate limited route decisions by outcome", "counter",
+        [({"route": route, "outcome": outcome}, count)
+         for route, outcomes in sorted(rate_limiter.stats().items())
+         for outcome, count in outcomes.items()]
+    )
+    
+    return PlainTextResponse(request_metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+@router.get("/api/admin/cache-stats")
+async def get_cache_stats(current_user = Depends(verify_token)):
+    """Hit/miss/refresh counters for the public response cache"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "routes": response_cache.stats(),
+        "ttls": {route: {"ttl": ttl, "stale_ttl": stale_ttl} for route, (ttl, stale_ttl) in PUBLIC_CACHE_TTLS.items()}
+    }
+
+@router.get("/api/admin/users/search")
 async def search_users(
     q: str = "",
     role: str = "all",
@@ -3615,7 +4841,7 @@ async def search_users(
         "pages": (total + limit - 1) // limit
     }
 
-@app.patch("/api/admin/users/{user_id}/suspend")
+@router.patch("/api/admin/users/{user_id}/suspend")
 async def suspend_user(user_id: str, current_user = Depends(verify_token)):
     """Suspend or unsuspend a user"""
     if current_user["role"] != "admin":
@@ -3639,13 +4865,73 @@ async def suspend_user(user_id: str, current_user = Depends(verify_token)):
         }
     )
     
+    activity_log.emit(
+        "user_suspension", f"{user['full_name']} {'suspended' if is_suspended else 'unsuspended'} by admin",
+        actor_id=current_user["user_id"], user_id=user_id
+    )
+    
     return {
         "message": f"User {'suspended' if is_suspended else 'unsuspended'} successfully",
         "user_id": user_id,
         "is_suspended": is_suspended
     }
 
-@app.get("/api/admin/support-tickets")
+@router.post("/api/admin/users/bulk-suspend")
+async def bulk_suspend_users(request: BulkSuspensionRequest, current_user = Depends(verify_token)):
+    """Suspend or unsuspend many users at once"""
+    if current_user["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    user_ids, users = bulk_moderation_users(request.user_ids, {"full_name": 1, "is_suspended": 1})
+    
+    if request.suspend:
+        update = {"$set": {
+            "is_suspended": True,
+            "suspended_at": datetime.utcnow(),
+            "suspended_by": current_user["user_id"],
+            "suspension_reason": request.reason
+        }}
+    else:
+        update = {"$set": {"is_suspended": False, "suspended_at": None, "suspended_by": None, "suspension_reason": None}}
+    
+    # Users already in the requested state are left alone
+    changes = [
+        user_id for user_id, user in users.items()
+        if user_id != current_user["user_id"] and bool(user.get("is_suspended", False)) != request.suspend
+    ]
+    errors = bulk_update_users({user_id: update for user_id in changes})
+    # Admins can't suspend themselves
+    if request.suspend and current_user["user_id"] in users:
+        errors[current_user["user_id"]] = "Cannot suspend yourself"
+    
+    action = "suspended" if request.suspend else "unsuspended"
+    results = []
+    updated = 0
+    for user_id in user_ids:
+        if user_id not in users:
+            result = {"result": "not_found"}
+        elif user_id in errors:
+            result = {"result": "error", "error": errors[user_id]}
+        elif user_id not in changes:
+            result = {"result": "unchanged"}
+        else:
+            activity_log.emit(
+                "user_suspension", f"{users[user_id]['full_name']} {action} by admin",
+                actor_id=current_user["user_id"], user_id=user_id
+            )
+            result = {"result": "updated"}
+            updated += 1
+        results.append({"user_id": user_id, **result})
+    
+    return {
+        "message": f"{updated} of {len(user_ids)} users {action}",
+        "is_suspended": request.suspend,
+        "requested": len(user_ids),
+        "updated": updated,
+        "results": results
+    }
+
+@router.get("/api/admin/support-tickets")
 async def get_support_tickets(
     status: str = "all",
     skip: int = 0,
@@ -3679,7 +4965,7 @@ async def get_support_tickets(
         "pages": (total + limit - 1) // limit
     }
 
-@app.patch("/api/admin/support-tickets/{ticket_id}")
+@router.patch("/api/admin/support-tickets/{ticket_id}")
 async def update_support_ticket(
     ticket_id: str,
     update_data: dict,
@@ -3720,7 +5006,7 @@ async def update_support_ticket(
             ticket_creator = db.users.find_one({"email": ticket["email"]})
             if ticket_creator:
                 # Get admin info
-                admin_user = db.users.find_one({"id": current_user["user_id"]})
+                admin_user = display_user(current_user["user_id"])
                 admin_name = admin_user.get("full_name", "Afrilance Support") if admin_user else "Afrilance Support"
                 
                 # Create conversation ID between admin and user
@@ -3732,38 +5018,44 @@ async def update_support_ticket(
                     "id": str(uuid.uuid4()),
                     "conversation_id": conversation_id,
                     "sender_id": current_user["user_id"],
+                    **user_fields(admin_user, MESSAGE_SENDER_FIELDS),
                     "receiver_id": ticket_creator["id"],
+                    "participants": participants,
                     "content": f"Support Ticket #{ticket.get('ticket_number', 'N/A')} - {admin_name}: {update_data['admin_reply']}",
                     "message_type": "support_reply",
                     "ticket_id": ticket_id,
                     "ticket_number": ticket.get('ticket_number'),
-                    "created_at": datetime.utcnow(),
-                    "read": False
+                    "created_at": datetime.utcnow()
                 }
+                message_data["search_keys"] = message_search_keys(participants, message_data["content"])
                 
-                db.messages.insert_one(message_data)
+                message_store.insert(message_data)
                 
                 # Update or create conversation metadata
                 conversation_data = {
                     "conversation_id": conversation_id,
                     "participants": participants,
                     "last_message_id": message_data["id"],
-                    "last_message_at": datetime.utcnow(),
+                    "last_message_at": message_data["created_at"],
                     "last_message_content": f"Support Reply: {update_data['admin_reply'][:100]}",
                     "conversation_type": "support",
                     "ticket_id": ticket_id,
                     "ticket_number": ticket.get('ticket_number'),
-                    "updated_at": datetime.utcnow()
+                    "updated_at": datetime.utcnow(),
+                    f"participant_info.{current_user['user_id']}": user_fields(admin_user, PARTICIPANT_FIELDS),
+                    f"participant_info.{ticket_creator['id']}": user_fields(ticket_creator, PARTICIPANT_FIELDS)
                 }
                 
                 # Upsert conversation
-                db.conversations.update_one(
+                result = db.conversations.update_one(
                     {"conversation_id": conversation_id},
-                    {"$set": conversation_data},
+                    {"$set": conversation_data, "$max": {f"read_watermarks.{current_user['user_id']}": message_data["created_at"]}},
                     upsert=True
                 )
+                if result.upserted_id:
+                    invalidate_messaging_contacts(*participants)
                 
-                print(f"✅ Admin reply sent as direct message to user {ticket_creator['email']}")
+                logger.info("Support reply for ticket %s sent as direct message to user %s", ticket_id, ticket_creator["id"])
                 
                 # Send email notification to user
                 try:
@@ -3799,16 +5091,16 @@ async def update_support_ticket(
                     
                     if EMAIL_PASS:
                         send_email(ticket["email"], user_subject, user_body)
-                        print(f"✅ Email notification sent to {ticket['email']}")
+                        logger.info("Support reply email sent for ticket %s", ticket_id)
                     
                 except Exception as e:
-                    print(f"❌ Failed to send email notification: {e}")
+                    logger.error("Failed to send support reply email for ticket %s: %s", ticket_id, e)
                     
             else:
-                print(f"❌ Could not find user with email {ticket['email']} for direct message")
+                logger.warning("No user with the ticket email for ticket %s, reply not sent as direct message", ticket_id)
                 
         except Exception as e:
-            print(f"❌ Failed to send admin reply as direct message: {e}")
+            logger.error("Failed to send support reply as direct message for ticket %s: %s", ticket_id, e)
     
     update_fields["updated_at"] = datetime.utcnow()
     
@@ -3818,13 +5110,21 @@ async def update_support_ticket(
         {"$set": update_fields}
     )
     
+    changes = [name for name in ("status", "assigned_to", "admin_reply") if name in update_data]
+    activity_log.emit(
+        "support_ticket_updated",
+        f"Support ticket #{ticket.get('ticket_number', 'N/A')} updated ({', '.join(changes) or 'no changes'})"
+        + (f" - Status: {update_data['status']}" if "status" in update_data else ""),
+        actor_id=current_user["user_id"], ticket_id=ticket_id
+    )
+    
     return {
         "message": "Support ticket updated successfully",
         "ticket_id": ticket_id,
         "direct_message_sent": True
     }
 
-@app.get("/api/my-support-tickets")
+@router.get("/api/my-support-tickets")
 async def get_my_support_tickets(current_user = Depends(verify_token)):
     """Get support tickets for the current user"""
     user_info = db.users.find_one({"id": current_user["user_id"]})
@@ -3848,76 +5148,137 @@ async def get_my_support_tickets(current_user = Depends(verify_token)):
         "total": len(tickets)
     }
 
-@app.get("/api/admin/activity-log")
+@router.get("/api/admin/activity-log")
 async def get_activity_log(
     skip: int = 0,
     limit: int = 50,
+    event_type: Optional[str] = None,
+    user_id: Optional[str] = None,
+    actor_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     current_user = Depends(verify_token)
 ):
     """Get platform activity log for admin monitoring"""
     if current_user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    # Create activity log from recent database changes
-    activities = []
-    
-    # Recent user registrations
-    recent_users = list(db.users.find(
-        {}, {"full_name": 1, "role": 1, "created_at": 1, "is_verified": 1}
-    ).sort("created_at", -1).limit(10))
-    
-    for user in recent_users:
-        activities.append({
-            "type": "user_registration",
-            "description": f"New {user['role']} registered: {user['full_name']}",
-            "timestamp": user["created_at"],
-            "user_id": user.get("id"),
-            "icon": "user-plus"
-        })
-    
-    # Recent job posts
-    recent_jobs = list(db.jobs.find(
-        {}, {"title": 1, "created_at": 1, "client_id": 1}
-    ).sort("created_at", -1).limit(10))
-    
-    for job in recent_jobs:
-        client = db.users.find_one({"id": job["client_id"]}, {"full_name": 1})
-        activities.append({
-            "type": "job_posted",
-            "description": f"New job posted: {job['title']} by {client['full_name'] if client else 'Unknown'}",
-            "timestamp": job["created_at"],
-            "job_id": job.get("id"),
-            "icon": "briefcase"
-        })
-    
-    # Recent support tickets
-    recent_tickets = list(db.support_tickets.find(
-        {}, {"name": 1, "created_at": 1, "status": 1}
-    ).sort("created_at", -1).limit(5))
-    
-    for ticket in recent_tickets:
-        activities.append({
-            "type": "support_ticket",
-            "description": f"Support ticket from {ticket['name']} - Status: {ticket['status']}",
-            "timestamp": ticket["created_at"],
-            "ticket_id": ticket.get("id"),
-            "icon": "help-circle"
-        })
+    if event_type and event_type not in ACTIVITY_EVENT_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid event type. Must be one of: {', '.join(ACTIVITY_EVENT_TYPES)}")
     
-    # Sort all activities by timestamp
-    activities.sort(key=lambda x: x["timestamp"], reverse=True)
+    skip = max(skip, 0)
+    limit = min(max(limit, 1), 200)
     
-    # Apply pagination
-    total = len(activities)
-    activities = activities[skip:skip + limit]
+    # Build query
+    query = {}
+    if event_type:
+        query["type"] = event_type
+    if user_id:
+        query["user_id"] = user_id
+    if actor_id:
+        query["actor_id"] = actor_id
+    if date_from or date_to:
+        query["timestamp"] = {}
+        if date_from:
+            query["timestamp"]["$gte"] = date_from
+        if date_to:
+            query["timestamp"]["$lte"] = date_to
+    
+    activities = list(db.activity_events.find(query, {"_id": 0})
+                      .sort("timestamp", -1)
+                      .skip(skip).limit(limit))
+    
+    total = db.activity_events.count_documents(query)
     
     return {
         "activities": activities,
         "total": total,
         "page": skip // limit + 1,
-        "pages": (total + limit - 1) // limit if total > 0 else 1
+        "pages": (total + limit - 1) // limit if total > 0 else 1,
+        "event_types": list(ACTIVITY_EVENT_TYPES)
     }
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Per-worker resources: DB pool, background writers and the SMTP session"""
+    start_logging()
+    open_database()
+    ensure_indexes()
+    response_cache.max_entries = RESPONSE_CACHE_MAX_ENTRIES
+    response_cache.primary_window = SECONDARY_MAX_STALENESS_SECONDS
+    response_cache.start(db, RESPONSE_CACHE_SYNC_SECONDS)
+    activity_log.start(db)
+    user_fanout.start(db)
+    job_recommender.start(db)
+    email_queue.start()
+    start_prefix_backfill(db)
+    if RATE_LIMIT_BACKEND == "mongo":
+        rate_limit_store = MongoBucketStore(db.rate_limit_buckets)
+        rate_limit_store.ensure_indexes()
+        rate_limiter.use_store(rate_limit_store)
+    logger.info("Worker started", extra={"pid": os.getpid(), "mongo_max_pool_size": MONGO_MAX_POOL_SIZE})
+    
+    yield
+    
+    # uvicorn stops accepting connections and drains in-flight requests before this runs
+    activity_log.stop(timeout=GRACEFUL_SHUTDOWN_SECONDS)
+    response_cache.stop(timeout=GRACEFUL_SHUTDOWN_SECONDS)
+    user_fanout.stop(timeout=GRACEFUL_SHUTDOWN_SECONDS)
+    job_recommender.stop(timeout=GRACEFUL_SHUTDOWN_SECONDS)
+    email_queue.stop(timeout=GRACEFUL_SHUTDOWN_SECONDS)
+    email_transport.close()
+    if nplusone_detector:
+        nplusone_detector.write_report(NPLUSONE_REPORT)
+    close_database()
+    logger.info("Worker stopped", extra={"pid": os.getpid()})
+    stop_logging()
+
+def create_app() -> FastAPI:
+    """Build the API application; each worker process calls this once"""
+    app = FastAPI(lifespan=lifespan)
+    
+    # Mount static files for uploads (only the local driver serves files from this process)
+    if storage.name == "local":
+        for subdirectory in UPLOAD_SUBDIRECTORIES:
+            (UPLOAD_DIR / subdirectory).mkdir(parents=True, exist_ok=True)
+        app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Cross-origin scripts can only read the response headers listed here
+        expose_headers=["X-Next-Cursor"],
+    )
+    
+    # Per-route latency, status code and DB round-trip metrics (served at /api/metrics)
+    install_metrics_middleware(app)
+    
+    if nplusone_detector:
+        install_nplusone_middleware(app, nplusone_detector, request_metrics.route_template)
+    
+    # Outermost middleware, so every log line of a request carries its correlation id
+    install_correlation_middleware(app)
+    
+    app.include_router(router)
+    return app
+
+# Module-level app for `uvicorn server:app`
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    
+    # WEB_CONCURRENCY > 1 runs one process per core, each building its own app via create_app()
+    uvicorn.run(
+        "server:create_app",
+        factory=True,
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        workers=WEB_CONCURRENCY,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True
+    )
\ No newline at end of file
@@ -0,0 +1,172 @@
+"""
+Pluggable object storage for uploaded media.
+
+Two drivers are provided:
+
+* ``LocalStorage`` writes under the ``uploads/`` directory and is served by the
+  ``/uploads`` static mount (development / single host).
+* ``S3Storage`` talks to any S3-compatible service (AWS S3, MinIO, moto) through
+  boto3 so every API worker shares the same bucket.
+
+The driver is chosen with ``STORAGE_BACKEND`` (``local`` or ``s3``). The S3 driver
+reads ``S3_BUCKET``, ``S3_ENDPOINT_URL`` (MinIO / moto server), ``S3_REGION`` and
+``S3_PUBLIC_URL`` (CDN base URL); credentials come from the usual AWS variables.
+Browsers POST directly to the bucket with a presigned form whose policy caps the
+size, so its CORS policy must allow POST from the site.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+import boto3
+from botocore.exceptions import ClientError
+
+
+class StorageBackend(ABC):
+    """Interface every storage driver implements. Keys look like ``portfolios/<filename>``."""
+
+    name = "base"
+
+    @abstractmethod
+    def save(self, key: str, data: bytes, content_type: str) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def stat(self, key: str) -> Optional[dict]:
+        """Return ``{"size", "content_type"}`` for a stored object, or None if it does not exist"""
+
+    @abstractmethod
+    def url_for(self, key: str) -> str:
+        """Public URL clients use to fetch the object"""
+
+    @abstractmethod
+    def location(self, key: str) -> str:
+        """Human readable location stored as ``file_path`` on file_info"""
+
+    def presigned_upload(self, key: str, content_type: str, expires_in: int, max_size: int) -> Optional[dict]:
+        """Return ``{"url", "method", "fields", "headers"}`` for a direct client upload of at most
+        ``max_size`` bytes, or None when the driver has no native presigning (the API then accepts
+        the PUT itself)."""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Stores files on the local filesystem of the API host"""
+
+    name = "local"
+
+    def __init__(self, root: Path, url_prefix: str = "/uploads"):
+        self.root = Path(root)
+        self.url_prefix = url_prefix.rstrip("/")
+
+    def _path(self, key: str) -> Path:
+        path = (self.root / key).resolve()
+        if self.root.resolve() not in path.parents:
+            raise ValueError(f"Invalid storage key: {key}")
+        return path
+
+    def save(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as buffer:
+            buffer.write(data)
+
+    def delete(self, key: str) -> None:
+        path = self._path(key)
+        if path.exists():
+            path.unlink()
+
+    def stat(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        return {"size": path.stat().st_size, "content_type": None}
+
+    def url_for(self, key: str) -> str:
+        return f"{self.url_prefix}/{key}"
+
+    def location(self, key: str) -> str:
+        return str(self.root / key)
+
+
+class S3Storage(StorageBackend):
+    """Stores files in an S3-compatible bucket (AWS S3, MinIO, moto)"""
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        public_url: Optional[str] = None,
+        client=None
+    ):
+        self.bucket = bucket
+        self.client = client or boto3.client("s3", endpoint_url=endpoint_url, region_name=region_name)
+        # Fall back to the bucket endpoint when no CDN / public base URL is configured
+        if public_url:
+            self.public_url = public_url.rstrip("/")
+        elif endpoint_url:
+            self.public_url = f"{endpoint_url.rstrip('/')}/{bucket}"
+        else:
+            self.public_url = f"https://{bucket}.s3.amazonaws.com"
+
+    def save(self, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def stat(self, key: str) -> Optional[dict]:
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return {"size": head["ContentLength"], "content_type": head.get("ContentType")}
+
+    def url_for(self, key: str) -> str:
+        return f"{self.public_url}/{key}"
+
+    def location(self, key: str) -> str:
+        return f"s3://{self.bucket}/{key}"
+
+    def presigned_upload(self, key: str, content_type: str, expires_in: int, max_size: int) -> Optional[dict]:
+        # A presigned POST policy lets S3 itself reject bodies over max_size; a presigned PUT can't
+        post = self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+            ExpiresIn=expires_in
+        )
+        return {"url": post["url"], "method": "POST", "fields": post["fields"], "headers": {}}
+
+
+def get_storage(upload_dir: Path) -> StorageBackend:
+    """Build the storage driver selected by the STORAGE_BACKEND environment variable"""
+    backend = os.environ.get("STORAGE_BACKEND", "local").lower()
+
+    if backend == "local":
+        return LocalStorage(upload_dir)
+
+    if backend == "s3":
+        bucket = os.environ.get("S3_BUCKET")
+        if not bucket:
+            raise RuntimeError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+        return S3Storage(
+            bucket=bucket,
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+            region_name=os.environ.get("S3_REGION") or None,
+            public_url=os.environ.get("S3_PUBLIC_URL") or None
+        )
+
+    raise RuntimeError(f"Unknown STORAGE_BACKEND: {backend}")
@@ -0,0 +1,123 @@
+"""
+Prefix typeahead over users for the messaging user search.
+
+Each user stores ``search_prefixes``: the lowercase, accent-free prefixes of
+every word of their name and of their email address. The array is indexed
+(multikey), so each keystroke is an index lookup on exact keys instead of an
+unanchored case-insensitive regex over every user. Multi-word queries must match
+a prefix of every word.
+
+Users registered before the prefixes existed get them from a background
+backfill that every worker starts at boot (``start_prefix_backfill``); it only
+touches users still missing them, so it is a quick no-op once done. A full
+rewrite from current names and emails runs with:
+    python typeahead.py --backfill
+"""
+
+import argparse
+import logging
+import os
+import re
+import threading
+import unicodedata
+from typing import Iterable, List, Optional
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+logger = logging.getLogger(__name__)
+
+MIN_PREFIX_LENGTH = 2
+# Longer query words are matched on their first MAX_PREFIX_LENGTH characters
+MAX_PREFIX_LENGTH = 15
+MAX_EMAIL_PREFIX_LENGTH = 32
+
+
+def _normalize(text: str) -> str:
+    return unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode().lower().strip()
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", _normalize(text))
+
+
+def _prefixes(word: str, longest: int) -> List[str]:
+    return [word[:length] for length in range(MIN_PREFIX_LENGTH, min(len(word), longest) + 1)]
+
+
+def search_prefixes(full_name: Optional[str], email: Optional[str]) -> List[str]:
+    """Index keys for a user: prefixes of each name word and of the whole email address"""
+    keys = set()
+    for word in _words(full_name):
+        keys.update(_prefixes(word, MAX_PREFIX_LENGTH))
+    keys.update(_prefixes(_normalize(email), MAX_EMAIL_PREFIX_LENGTH))
+    return sorted(keys)
+
+
+def prefix_keys(query: str) -> List[str]:
+    """Keys a user must have to match ``query``; empty when the query is too short to look up"""
+    if "@" in query:
+        key = _normalize(query)[:MAX_EMAIL_PREFIX_LENGTH]
+        return [key] if len(key) >= MIN_PREFIX_LENGTH else []
+    return sorted({word[:MAX_PREFIX_LENGTH] for word in _words(query) if len(word) >= MIN_PREFIX_LENGTH})
+
+
+def prefix_query(keys: Iterable[str]) -> dict:
+    keys = list(keys)
+    return {"search_prefixes": keys[0]} if len(keys) == 1 else {"search_prefixes": {"$all": keys}}
+
+
+def ensure_typeahead_indexes(db) -> None:
+    db.users.create_index("search_prefixes")
+
+
+def backfill_search_prefixes(db, batch_size: int = 1000, only_missing: bool = False) -> int:
+    """Write ``search_prefixes`` for every user (or those without any) from their current name and email"""
+    ensure_typeahead_indexes(db)
+    updated = 0
+    ops = []
+    # Equality with None matches missing fields and can use the search_prefixes index
+    query = {"search_prefixes": None} if only_missing else {}
+    for user in db.users.find(query, {"_id": 1, "full_name": 1, "email": 1}).batch_size(batch_size):
+        ops.append(UpdateOne(
+            {"_id": user["_id"]},
+            {"$set": {"search_prefixes": search_prefixes(user.get("full_name"), user.get("email"))}}
+        ))
+        if len(ops) >= batch_size:
+            updated += db.users.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += db.users.bulk_write(ops, ordered=False).modified_count
+    return updated
+
+
+def start_prefix_backfill(db) -> threading.Thread:
+    """Backfill users without prefixes from a background thread, so startup doesn't wait for it"""
+    def run():
+        try:
+            updated = backfill_search_prefixes(db, only_missing=True)
+        except Exception:
+            logger.exception("Search prefix backfill failed")
+            return
+        if updated:
+            logger.info("Backfilled search prefixes", extra={"users": updated})
+
+    thread = threading.Thread(target=run, name="typeahead-backfill", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="User typeahead maintenance")
+    parser.add_argument("--backfill", action="store_true", help="Store search prefixes on existing users and build the index")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ.get('MONGO_URL', 'mongodb://localhost:27017/'))
+    if args.backfill:
+        updated = backfill_search_prefixes(client[os.environ.get('MONGO_DB_NAME', 'afrilance')], args.batch_size)
+        print(f"✅ Added search prefixes to {updated} users")
+    else:
+        parser.print_help()
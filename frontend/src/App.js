@@ -47,6 +47,7 @@ function App() {
   const [user, setUser] = useState(null);
   const [currentPage, setCurrentPage] = useState('landing');
   const [jobs, setJobs] = useState([]);
+  const [jobsCursor, setJobsCursor] = useState(null);
   const [myJobs, setMyJobs] = useState([]);
   const [loading, setLoading] = useState(false);
   const [selectedJob, setSelectedJob] = useState(null);
@@ -147,7 +148,8 @@ function App() {
     }
   }, [user, currentPage]);
 
-  const apiCall = async (endpoint, options = {}) => {
+  // Pass withHeaders: true to get { data, headers } back instead of the parsed body
+  const apiCall = async (endpoint, { withHeaders = false, ...options } = {}) => {
     const token = localStorage.getItem('token');
     const headers = {
       'Content-Type': 'application/json',
@@ -177,7 +179,8 @@ function App() {
         throw new Error(errorDetail);
       }
 
-      return response.json();
+      const data = await response.json();
+      return withHeaders ? { data, headers: response.headers } : data;
     } catch (error) {
       clearTimeout(timeoutId);
       if (error.name === 'AbortError') {
@@ -222,10 +225,13 @@ function App() {
     setCurrentPage('landing');
   };
 
-  const fetchJobs = async () => {
+  // Open jobs arrive a page at a time; X-Next-Cursor is absent on the last page
+  const fetchJobs = async (cursor = null) => {
     try {
-      const data = await apiCall('/api/jobs');
-      setJobs(data);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const { data, headers } = await apiCall(`/api/jobs${query}`, { withHeaders: true });
+      setJobs(previous => (cursor ? [...previous, ...data] : data));
+      setJobsCursor(headers.get('X-Next-Cursor'));
     } catch (error) {
       console.error('Error fetching jobs:', error);
     }
@@ -992,6 +998,14 @@ function App() {
                 </Card>
               ))}
             </div>
+
+            {jobsCursor && (
+              <div className="flex justify-center">
+                <Button variant="outline" onClick={() => fetchJobs(jobsCursor)}>
+                  Load more jobs
+                </Button>
+              </div>
+            )}
           </div>
         )}
 
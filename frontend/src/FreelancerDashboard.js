@@ -37,6 +37,7 @@ const FreelancerDashboard = ({ user, onNavigate, onLogout }) => {
   
   const [recentJobs, setRecentJobs] = useState([]);
   const [availableJobs, setAvailableJobs] = useState([]);
+  const [availableJobsCursor, setAvailableJobsCursor] = useState(null);
   const [myApplications, setMyApplications] = useState([]);
   const [loading, setLoading] = useState(true);
   const [jobsLoading, setJobsLoading] = useState(false);
@@ -88,7 +89,8 @@ const FreelancerDashboard = ({ user, onNavigate, onLogout }) => {
     }
   }, [currentTab]);
 
-  const apiCall = async (endpoint, options = {}) => {
+  // Pass withHeaders: true to get { data, headers } back instead of the parsed body
+  const apiCall = async (endpoint, { withHeaders = false, ...options } = {}) => {
     const token = localStorage.getItem('token');
     const headers = {
       'Content-Type': 'application/json',
@@ -106,7 +108,8 @@ const FreelancerDashboard = ({ user, onNavigate, onLogout }) => {
         throw new Error(error.detail || 'Request failed');
       }
 
-      return response.json();
+      const data = await response.json();
+      return withHeaders ? { data, headers: response.headers } : data;
     } catch (error) {
       console.error('API Error:', error);
       throw error;
@@ -135,11 +138,14 @@ const FreelancerDashboard = ({ user, onNavigate, onLogout }) => {
     }
   };
 
-  const fetchAvailableJobs = async () => {
+  // Open jobs arrive a page at a time; X-Next-Cursor is absent on the last page
+  const fetchAvailableJobs = async (cursor = null) => {
     try {
-      setJobsLoading(true);
-      const jobsData = await apiCall('/api/jobs');
-      setAvailableJobs(jobsData);
+      if (!cursor) setJobsLoading(true);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const { data: jobsData, headers } = await apiCall(`/api/jobs${query}`, { withHeaders: true });
+      setAvailableJobs(previous => (cursor ? [...previous, ...jobsData] : jobsData));
+      setAvailableJobsCursor(headers.get('X-Next-Cursor'));
     } catch (error) {
       console.error('Error fetching available jobs:', error);
     } finally {
@@ -977,6 +983,18 @@ const FreelancerDashboard = ({ user, onNavigate, onLogout }) => {
                 </CardContent>
               </Card>
             )}
+
+            {!jobsLoading && availableJobsCursor && (
+              <div className="flex justify-center">
+                <Button
+                  onClick={() => fetchAvailableJobs(availableJobsCursor)}
+                  variant="outline"
+                  className="border-gray-600 text-gray-300 hover:bg-gray-800"
+                >
+                  Load More Jobs
+                </Button>
+              </div>
+            )}
           </div>
         )}
 
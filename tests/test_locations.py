@@ -0,0 +1,79 @@
+"""
+Location normalization and the region filters of the advanced job search.
+
+MongoDB runs against mongomock, so no services are needed:
+    python -m pytest -q tests/test_locations.py
+"""
+
+import sys
+from pathlib import Path
+
+import mongomock
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from locations import normalize_location  # noqa: E402
+
+
+@pytest.mark.parametrize("text, province, city", [
+    ("Joburg", "GP", "johannesburg"),
+    ("Port Elizabeth, EC", "EC", "gqeberha"),
+    ("George Street, Durban", "KZN", "durban"),
+    ("George, Western Cape", "WC", "george"),
+    ("Umhlanga, George Street, KZN", "KZN", "umhlanga"),
+    ("Cape Town, Gauteng", "WC", "cape-town"),
+    ("Gauteng", "GP", None)
+])
+def test_normalize_location(text, province, city):
+    region = normalize_location(text)
+    assert (region["province"], region["city"]) == (province, city)
+
+
+def test_normalize_location_unknown():
+    assert normalize_location("Atlantis") is None
+    assert normalize_location(None) is None
+
+
+@pytest.fixture
+def api(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+    import server
+    monkeypatch.setattr(server, "MongoClient", mongomock.MongoClient)
+    with TestClient(server.app) as client:
+        server.db.client.drop_database(server.MONGO_DB_NAME)
+        yield client
+
+
+def _post_jobs(api, locations):
+    user = api.post("/api/register", json={
+        "email": "client@example.com", "password": "x", "role": "client", "full_name": "Client", "phone": "1"
+    }).json()
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    for index, location in enumerate(locations):
+        response = api.post("/api/jobs", json={
+            "title": f"Job {index}", "description": "d", "category": "ICT", "budget": 1000,
+            "budget_type": "fixed", "requirements": ["Python"], "location": location
+        }, headers=headers)
+        assert response.status_code == 200
+
+
+def _search(api, **filters):
+    response = api.post("/api/search/jobs/advanced?facets=true", json=filters)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_job_search_region_filters(api):
+    _post_jobs(api, ["George Street, Durban", "Joburg", "Sandton", "George, WC", "Atlantis"])
+
+    durban = _search(api, location="Durban")
+    assert [job["location"] for job in durban["jobs"]] == ["George Street, Durban"]
+    assert durban["facets"]["categories"] == [{"value": "ICT", "count": 1}]
+
+    gauteng = _search(api, province="GP")
+    assert sorted(job["location"] for job in gauteng["jobs"]) == ["Joburg", "Sandton"]
+    assert _search(api, city="george")["total"] == 1
+    assert _search(api, location="Atlantis")["total"] == 1
+    assert _search(api)["total"] == 5
@@ -0,0 +1,98 @@
+"""
+Storage drivers and the presign -> upload -> finalize flow.
+
+S3 runs against moto and MongoDB against mongomock, so no services are needed:
+    python -m pytest -q tests/test_storage.py
+"""
+
+import base64
+import json
+import sys
+from pathlib import Path
+
+import boto3
+import mongomock
+import pytest
+import requests
+from fastapi.testclient import TestClient
+from moto import mock_aws
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from storage import LocalStorage, S3Storage, StorageBackend  # noqa: E402
+
+
+@pytest.fixture
+def s3_storage():
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="media")
+        yield S3Storage("media", region_name="us-east-1", client=client)
+
+
+def test_storage_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(tmp_path)
+    storage.save("portfolios/a.png", b"PNG", "image/png")
+    assert storage.stat("portfolios/a.png")["size"] == 3
+    assert storage.url_for("portfolios/a.png") == "/uploads/portfolios/a.png"
+    storage.delete("portfolios/a.png")
+    assert storage.stat("portfolios/a.png") is None
+    assert storage.presigned_upload("portfolios/b.png", "image/png", 60, 1024) is None
+    with pytest.raises(ValueError):
+        storage.save("../escape.png", b"PNG", "image/png")
+
+
+def test_s3_storage_round_trip(s3_storage):
+    s3_storage.save("portfolios/a.png", b"PNG", "image/png")
+    assert s3_storage.stat("portfolios/a.png") == {"size": 3, "content_type": "image/png"}
+    assert s3_storage.location("portfolios/a.png") == "s3://media/portfolios/a.png"
+    s3_storage.delete("portfolios/a.png")
+    assert s3_storage.stat("portfolios/a.png") is None
+
+
+def test_s3_presigned_post_caps_size(s3_storage):
+    upload = s3_storage.presigned_upload("portfolios/b.jpg", "image/jpeg", 60, 8)
+    assert upload["method"] == "POST"
+    assert ["content-length-range", 1, 8] in _policy_conditions(upload["fields"])
+
+    accepted = requests.post(upload["url"], data=upload["fields"], files={"file": ("b.jpg", b"JPEG")})
+    assert accepted.status_code == 204
+    assert s3_storage.stat("portfolios/b.jpg")["size"] == 4
+
+
+def _policy_conditions(fields: dict) -> list:
+    return json.loads(base64.b64decode(fields["policy"]))["conditions"]
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_ENABLED", "false")
+    import server
+    monkeypatch.setattr(server, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(server, "storage", LocalStorage(tmp_path))
+    with TestClient(server.app) as client:
+        server.db.client.drop_database(server.MONGO_DB_NAME)
+        yield client
+
+
+def test_finalize_is_single_use(api):
+    user = api.post("/api/register", json={
+        "email": "free@example.com", "password": "x", "role": "freelancer", "full_name": "Free", "phone": "1"
+    }).json()
+    headers = {"Authorization": f"Bearer {user['token']}"}
+
+    presign = api.post("/api/uploads/presign", json={
+        "upload_type": "portfolio", "filename": "a.png", "content_type": "image/png"
+    }, headers=headers).json()
+    assert api.put(presign["upload_url"], content=b"PNG", headers=presign["headers"]).status_code == 200
+
+    finalize = {"upload_token": presign["upload_token"]}
+    assert api.post("/api/uploads/finalize", json=finalize, headers=headers).status_code == 200
+    assert api.post("/api/uploads/finalize", json=finalize, headers=headers).status_code == 409
+    assert api.put(presign["upload_url"], content=b"OTHER", headers=presign["headers"]).status_code == 409
+    assert len(api.get("/api/user-files", headers=headers).json()["portfolio_files"]) == 1